@@ -0,0 +1,176 @@
+"""
+Generador de bibliotecas MP3 sintéticas para los benchmarks.
+
+Escribe un árbol de directorios con MP3 de silencio (frames MPEG1 Layer III
+válidos) y tags ID3 (título, artista, álbum y portada opcional), de forma
+determinista a partir de una semilla.
+
+Uso:
+    python bench/make_library.py OUT_DIR --tracks 1000 --depth 2 --per-dir 50
+"""
+import os
+import sys
+import math
+import json
+import time
+import random
+import struct
+import zlib
+import argparse
+
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, APIC
+
+# Frame MPEG1 Layer III, 128 kbps, 44.1 kHz, estéreo, sin CRC: 417 bytes de silencio
+FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+FRAMES_PER_SECOND = 44100 / 1152.0
+
+_WORDS = (
+    "night", "river", "electric", "ghost", "summer", "machine", "silver", "heart",
+    "city", "dream", "fire", "ocean", "shadow", "golden", "neon", "storm",
+    "canción", "corazón", "noche", "señal", "ciudad", "fuego", "mañana", "luz",
+)
+
+
+def make_png(size, seed=0):
+    """PNG RGB de size x size con un degradado (sin dependencias externas)."""
+    w = h = size
+    r0 = (seed * 37) % 256
+    reds = bytes((r0 + x) & 0xFF for x in range(w))
+    blues = bytes(((seed * 11) & 0xFF,)) * w
+    rows = []
+    for y in range(h):
+        pixels = bytearray(w * 3)
+        pixels[0::3] = reds
+        pixels[1::3] = bytes(((y * 255 // max(1, h - 1)) & 0xFF,)) * w
+        pixels[2::3] = blues
+        rows.append(b'\x00' + bytes(pixels)) # filtro None
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + chunk(b'IEND', b''))
+
+
+def make_title(rng, length):
+    """Título de aproximadamente length caracteres a partir de palabras aleatorias."""
+    words = []
+    total = 0
+    while total < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:length].strip().title()
+
+
+def leaf_dir(root, index, depth, fanout):
+    """Ruta del directorio hoja index en un árbol de profundidad depth."""
+    parts = []
+    for level in range(depth):
+        if level == 0:
+            digit = index // (fanout ** (depth - 1))
+        else:
+            digit = (index // (fanout ** (depth - 1 - level))) % fanout
+        parts.append(f"level{level}_{digit:03d}")
+    return os.path.join(root, *parts)
+
+
+def write_track(path, title, artist, album, seconds, cover=None):
+    with open(path, 'wb') as f:
+        f.write(FRAME * max(1, int(seconds * FRAMES_PER_SECOND)))
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=title))
+    tags.add(TPE1(encoding=3, text=artist))
+    tags.add(TALB(encoding=3, text=album))
+    if cover:
+        tags.add(APIC(encoding=3, mime='image/png', type=3, desc='Cover', data=cover))
+    tags.save(path)
+
+
+def generate(root, tracks=1000, depth=2, per_dir=50, fanout=10, title_length=40,
+             cover_size=500, cover_every=1, unique_covers=False, seconds=0.5, seed=1):
+    """
+    Genera la biblioteca y devuelve un dict con la descripción (parámetros y
+    recuento de archivos/directorios/bytes).
+    - per_dir: pistas por directorio hoja (un "álbum" por hoja)
+    - cover_size: lado en píxeles de la portada embebida (0 = sin portadas)
+    - cover_every: portada en una de cada N pistas
+    - unique_covers: una imagen distinta por álbum (si no, todos comparten la misma)
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    leaves = max(1, math.ceil(tracks / per_dir))
+    shared_cover = make_png(cover_size) if cover_size and not unique_covers else None
+
+    written = 0
+    total_bytes = 0
+    dirs = set()
+    for leaf in range(leaves):
+        directory = leaf_dir(root, leaf, depth, fanout)
+        os.makedirs(directory, exist_ok=True)
+        dirs.add(directory)
+
+        cover = shared_cover
+        if cover_size and unique_covers:
+            cover = make_png(cover_size, seed=leaf + 1)
+        artist = make_title(rng, 16)
+        album = make_title(rng, 20)
+
+        for i in range(min(per_dir, tracks - written)):
+            path = os.path.join(directory, f"{i + 1:03d} {make_title(rng, 12)}.mp3")
+            with_cover = cover if (cover_every and i % cover_every == 0) else None
+            write_track(path, make_title(rng, title_length), artist, album, seconds, with_cover)
+            total_bytes += os.path.getsize(path)
+            written += 1
+
+    return {
+        'root': os.path.abspath(root),
+        'tracks': written,
+        'directories': len(dirs),
+        'depth': depth,
+        'per_dir': per_dir,
+        'title_length': title_length,
+        'cover_size': cover_size,
+        'cover_every': cover_every,
+        'unique_covers': unique_covers,
+        'seconds': seconds,
+        'seed': seed,
+        'bytes': total_bytes,
+        'generate_s': round(time.perf_counter() - start, 3),
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument('--tracks', type=int, default=1000, help="Número de pistas")
+    parser.add_argument('--depth', type=int, default=2, help="Niveles de directorio bajo la raíz")
+    parser.add_argument('--per-dir', type=int, default=50, help="Pistas por directorio hoja")
+    parser.add_argument('--fanout', type=int, default=10, help="Subdirectorios por nivel")
+    parser.add_argument('--title-length', type=int, default=40, help="Longitud de los títulos")
+    parser.add_argument('--cover-size', type=int, default=500, help="Lado de la portada en px (0 = sin portada)")
+    parser.add_argument('--cover-every', type=int, default=1, help="Portada en una de cada N pistas")
+    parser.add_argument('--unique-covers', action='store_true', help="Una portada distinta por álbum")
+    parser.add_argument('--seconds', type=float, default=0.5, help="Duración de cada pista")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def generate_from_args(root, args):
+    return generate(root, tracks=args.tracks, depth=args.depth, per_dir=args.per_dir,
+                    fanout=args.fanout, title_length=args.title_length,
+                    cover_size=args.cover_size, cover_every=args.cover_every,
+                    unique_covers=args.unique_covers, seconds=args.seconds, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una biblioteca MP3 sintética")
+    parser.add_argument('out_dir')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    info = generate_from_args(args.out_dir, args)
+    json.dump(info, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Benchmarks sin ventana (drivers dummy de SDL) sobre una biblioteca sintética.
+
+Mide MusicPlayer.update_browser_items (recorriendo todo el árbol, en frío
+y con el índice ya poblado), load_music, PlaylistScreen.render y el frame
+completo de la vista player, además de los bytes por entrada de browser_items
+(tracemalloc). La salida es JSON con tiempos en ms y el pico de RSS.
+
+Uso:
+    python bench/run_bench.py --tracks 1000                  # genera y mide
+    python bench/run_bench.py --library /ruta/a/music        # biblioteca existente
+    python bench/run_bench.py --sizes 100,1000,10000,50000 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import subprocess
+import tracemalloc
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def summary(samples):
+    """p50/p95/p99/media/máximo (ms) de una lista de muestras en segundos."""
+    if not samples:
+        return {'count': 0}
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p):
+        return ms[min(len(ms) - 1, int(round(p / 100.0 * (len(ms) - 1))))]
+
+    return {
+        'count': len(ms),
+        'total_ms': round(sum(ms), 3),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'p50_ms': round(pct(50), 3),
+        'p95_ms': round(pct(95), 3),
+        'p99_ms': round(pct(99), 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+
+def wait_scanner(player, timeout=600):
+    """Espera a que el escáner resuelva todos los títulos del directorio actual."""
+    deadline = time.perf_counter() + timeout
+    while player.scanner.is_busy() and time.perf_counter() < deadline:
+        player.apply_scan_updates()
+        time.sleep(0.001)
+    player.apply_scan_updates()
+
+
+def bench_browse(player, directories):
+    """update_browser_items en cada directorio: listado visible y títulos resueltos."""
+    listed = []
+    resolved = []
+    for path in directories:
+        player.current_path = path
+        start = time.perf_counter()
+        player.update_browser_items()
+        listed.append(time.perf_counter() - start)
+        wait_scanner(player)
+        resolved.append(time.perf_counter() - start)
+    return {
+        'directories': len(directories),
+        'listed': summary(listed),
+        'resolved': summary(resolved),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def bench_load_music(player, timeout=600):
+    """load_music() + recorrido recursivo: primera pista disponible y total."""
+    start = time.perf_counter()
+    player.load_music()
+    call = time.perf_counter() - start
+    first = None
+    deadline = start + timeout
+    while player.is_loading_tree() and time.perf_counter() < deadline:
+        player.update()
+        if first is None and player.playlist:
+            first = time.perf_counter() - start
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    return {
+        'tracks': len(player.playlist),
+        'call_ms': round(call * 1000, 3),
+        'first_track_ms': round(first * 1000, 3) if first is not None else None,
+        'ms': round(elapsed * 1000, 3),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def bench_listing_memory(player, path):
+    """Memoria viva de browser_items (tracemalloc) en el directorio más grande, con títulos."""
+    player.current_path = path
+    player.update_browser_items()
+    wait_scanner(player)
+    tracemalloc.start()
+    try:
+        player.update_browser_items()
+        wait_scanner(player)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    items = len(player.browser_items)
+    return {
+        'items': items,
+        'bytes': current,
+        'peak_bytes': peak,
+        'bytes_per_item': round(current / items, 1) if items else None,
+    }
+
+
+def bench_playlist_render(renderer, player, path, frames):
+    """Desplaza la selección un elemento por frame y mide render() y el frame completo."""
+    import config
+    from playlist import PlaylistScreen
+    from render_state import DamageTracker, SceneTarget
+
+    player.current_path = path
+    player.update_browser_items()
+    wait_scanner(player)
+
+    screen = PlaylistScreen(renderer, player)
+    damage = DamageTracker()
+    scene = SceneTarget(renderer)
+    render_times = []
+    frame_times = []
+    for i in range(frames):
+        config.TEXT_CACHE.begin_frame()
+        frame_start = time.perf_counter()
+        if screen.selected_index >= len(player.browser_items) - 1:
+            screen.selected_index = 0
+            screen.scroll_offset = 0
+        else:
+            screen.move_down()
+        screen.update(damage)
+        if damage.is_dirty():
+            scene.begin(damage.dirty_rect())
+            start = time.perf_counter()
+            screen.render()
+            render_times.append(time.perf_counter() - start)
+            scene.present()
+            damage.frame_done(rendered=True)
+        else:
+            damage.frame_done(rendered=False)
+        frame_times.append(time.perf_counter() - frame_start)
+
+    result = {
+        'items': len(player.browser_items),
+        'render': summary(render_times),
+        'frame': summary(frame_times),
+        'text_cache': config.TEXT_CACHE.stats(),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    screen.cleanup()
+    scene.cleanup()
+    return result
+
+
+def bench_player_frame(renderer, player, path, frames, skip_every):
+    """Frame completo de la vista player, saltando de pista cada skip_every frames."""
+    import config
+    from player_screen import PlayerScreen
+    from render_state import DamageTracker, SceneTarget
+
+    player.current_path = path
+    player.update_browser_items()
+    wait_scanner(player)
+    files = [item['path'] for item in player.browser_items if item['type'] == 'file']
+    if not files:
+        return {'skipped': "sin pistas"}
+
+    player.stop_music()
+    player.playlist = files
+    player.current_track_index = 0
+    player.play_music()
+
+    screen = PlayerScreen(renderer, player)
+    damage = DamageTracker()
+    scene = SceneTarget(renderer)
+    frame_times = []
+    rendered = 0
+    for i in range(frames):
+        config.TEXT_CACHE.begin_frame()
+        start = time.perf_counter()
+        if skip_every and i and i % skip_every == 0:
+            player.next_track()
+        player.update()
+        screen.update(damage)
+        if damage.is_dirty():
+            scene.begin(damage.dirty_rect())
+            screen.render()
+            scene.present()
+            damage.frame_done(rendered=True)
+            rendered += 1
+        else:
+            damage.frame_done(rendered=False)
+        frame_times.append(time.perf_counter() - start)
+
+    result = {
+        'tracks': len(files),
+        'frame': summary(frame_times),
+        'frames_rendered': rendered,
+        'covers': screen.covers.stats(),
+        'thumbnails': screen.thumbnails.stats(),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    player.stop_music()
+    screen.cleanup()
+    scene.cleanup()
+    return result
+
+
+def list_directories(root):
+    """Directorios del árbol (raíz incluida) y el que más pistas tiene."""
+    directories = []
+    largest = (0, root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        directories.append(dirpath)
+        count = sum(1 for name in filenames if name.lower().endswith('.mp3'))
+        if count > largest[0]:
+            largest = (count, dirpath)
+    return directories, largest[1]
+
+
+def run(library, args):
+    """Ejecuta todos los benchmarks en este proceso y devuelve el resultado."""
+    sys.path.insert(0, SRC_DIR)
+    import sdl2
+    import config
+    from player import MusicPlayer
+
+    # load_music busca "music" en el directorio actual
+    workdir = tempfile.mkdtemp(prefix="parasyte-bench-")
+    music = os.path.join(workdir, "music")
+    os.symlink(os.path.abspath(library), music, target_is_directory=True)
+    os.chdir(workdir)
+
+    window, renderer = config.init_sdl2()
+    directories, largest = list_directories(music)
+    results = {}
+    try:
+        start = time.perf_counter()
+        player = MusicPlayer()
+        player.start()
+        results['startup'] = {'ms': round((time.perf_counter() - start) * 1000, 3)}
+
+        results['load_music_cold'] = bench_load_music(player)
+        results['browse_cold'] = bench_browse(player, directories)
+        results['load_music_warm'] = bench_load_music(player)
+        results['browse_warm'] = bench_browse(player, directories)
+        results['index'] = player.get_index_stats()
+        results['listing_memory'] = bench_listing_memory(player, largest)
+
+        results['playlist_render'] = bench_playlist_render(renderer, player, largest, args.frames)
+        results['player_frame'] = bench_player_frame(renderer, player, largest, args.frames, args.skip_every)
+        player.cleanup()
+    finally:
+        config.TEXT_CACHE.cleanup()
+        sdl2.SDL_DestroyRenderer(renderer)
+        sdl2.SDL_DestroyWindow(window)
+        sdl2.SDL_Quit()
+        os.chdir(BENCH_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results['peak_rss_kb'] = peak_rss_kb()
+    return results
+
+
+def environment():
+    import sdl2
+    version = sdl2.SDL_version()
+    sdl2.SDL_GetVersion(version)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'sdl': f"{version.major}.{version.minor}.{version.patch}",
+    }
+
+
+def run_single(args):
+    # Drivers dummy antes de importar sdl2; índice y miniaturas en un directorio aislado
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="parasyte-bench-cache-")
+    os.environ["PARASYTE_CACHE_DIR"] = cache_dir
+
+    generated = None
+    library = args.library
+    try:
+        if not library:
+            sys.path.insert(0, BENCH_DIR)
+            from make_library import generate_from_args
+            generated = tempfile.mkdtemp(prefix="parasyte-bench-lib-")
+            library_info = generate_from_args(generated, args)
+            library = generated
+        else:
+            library_info = {'root': os.path.abspath(library)}
+
+        results = run(library, args)
+        return {
+            'library': library_info,
+            'environment': environment(),
+            'results': results,
+        }
+    finally:
+        if generated and not args.keep:
+            shutil.rmtree(generated, ignore_errors=True)
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_sizes(args, argv):
+    """Un proceso por tamaño de biblioteca (el pico de RSS es por proceso)."""
+    base = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg in ('--sizes', '--output', '--tracks'):
+            skip = True
+            continue
+        if arg.startswith(('--sizes=', '--output=', '--tracks=')):
+            continue
+        base.append(arg)
+
+    runs = []
+    for size in args.sizes.split(','):
+        cmd = [sys.executable, os.path.abspath(__file__), '--tracks', size.strip()] + base
+        print(f"[Bench] {size.strip()} pistas...", file=sys.stderr)
+        out = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+        runs.append(json.loads(out))
+    return {'runs': runs}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sys.path.insert(0, BENCH_DIR)
+    from make_library import add_arguments
+
+    parser = argparse.ArgumentParser(description="Benchmarks sin ventana del reproductor")
+    parser.add_argument('--library', help="Biblioteca existente (si no, se genera una sintética)")
+    parser.add_argument('--sizes', help="Lista de tamaños separados por comas (un proceso por tamaño)")
+    parser.add_argument('--frames', type=int, default=600, help="Frames por benchmark de render")
+    parser.add_argument('--skip-every', type=int, default=30, help="Cambiar de pista cada N frames (vista player)")
+    parser.add_argument('--cache-dir', help="Directorio de índice/miniaturas (por defecto uno temporal)")
+    parser.add_argument('--keep', action='store_true', help="No borrar la biblioteca generada")
+    parser.add_argument('--output', help="Fichero JSON de salida (por defecto stdout)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        report = run_sizes(args, argv)
+    else:
+        # Los mensajes del reproductor van a stderr: stdout queda solo para el JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            report = run_single(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import ctypes
+import ctypes.util
+import select
+import threading
+
+# Canal 0: SND_MIXER_SCHN_FRONT_LEFT (== SND_MIXER_SCHN_MONO en controles mono)
+_CHANNEL = 0
+
+DEFAULT_CONTROLS = ("Master", "PCM", "Headphone", "Speaker", "Digital")
+
+
+class _PollFd(ctypes.Structure):
+    _fields_ = [("fd", ctypes.c_int), ("events", ctypes.c_short), ("revents", ctypes.c_short)]
+
+
+def load_libasound():
+    """Carga libasound o lanza OSError si no está disponible."""
+    name = ctypes.util.find_library("asound") or "libasound.so.2"
+    lib = ctypes.CDLL(name)
+    p = ctypes.c_void_p
+    lib.snd_mixer_open.argtypes = [ctypes.POINTER(p), ctypes.c_int]
+    lib.snd_mixer_attach.argtypes = [p, ctypes.c_char_p]
+    lib.snd_mixer_selem_register.argtypes = [p, p, p]
+    lib.snd_mixer_load.argtypes = [p]
+    lib.snd_mixer_close.argtypes = [p]
+    lib.snd_mixer_handle_events.argtypes = [p]
+    lib.snd_mixer_poll_descriptors_count.argtypes = [p]
+    lib.snd_mixer_poll_descriptors.argtypes = [p, ctypes.POINTER(_PollFd), ctypes.c_uint]
+    lib.snd_mixer_selem_id_malloc.argtypes = [ctypes.POINTER(p)]
+    lib.snd_mixer_selem_id_free.argtypes = [p]
+    lib.snd_mixer_selem_id_set_index.argtypes = [p, ctypes.c_uint]
+    lib.snd_mixer_selem_id_set_name.argtypes = [p, ctypes.c_char_p]
+    lib.snd_mixer_find_selem.argtypes = [p, p]
+    lib.snd_mixer_find_selem.restype = p
+    lib.snd_mixer_selem_has_playback_volume.argtypes = [p]
+    lib.snd_mixer_selem_get_playback_volume_range.argtypes = [p, ctypes.POINTER(ctypes.c_long), ctypes.POINTER(ctypes.c_long)]
+    lib.snd_mixer_selem_get_playback_volume.argtypes = [p, ctypes.c_int, ctypes.POINTER(ctypes.c_long)]
+    lib.snd_mixer_selem_set_playback_volume_all.argtypes = [p, ctypes.c_long]
+    return lib
+
+
+class AlsaMixer:
+    """
+    Control de volumen ALSA en proceso (libasound vía ctypes), sin lanzar amixer.
+    Mantiene un único handle abierto; un hilo espera en los descriptores del
+    mixer y relee el volumen solo cuando ALSA notifica un cambio.
+    Los porcentajes son lineales sobre el rango crudo, igual que "amixer set X N%".
+
+    lib permite inyectar un sustituto de libasound (p.ej. en pruebas) con las
+    mismas funciones snd_mixer_*; los punteros de salida llegan como byref().
+    Lanza OSError si no hay libasound o ningún control de la lista sirve.
+    """
+    def __init__(self, card="default", controls=DEFAULT_CONTROLS, lib=None, watch=True):
+        self.lib = lib or load_libasound()
+        self.card = card
+        self.control = None
+        self.volume = 0
+        self.events = 0 # Cambios notificados por ALSA
+        self._lock = threading.Lock()
+        self._handle = ctypes.c_void_p()
+        self._elem = None
+        self._min = 0
+        self._max = 0
+        self._running = True
+        self._thread = None
+
+        self._open(controls)
+        self.volume = self._read_volume()
+        if watch:
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def _check(self, ret, what):
+        if ret < 0:
+            raise OSError(f"{what} falló ({ret})")
+
+    def _open(self, controls):
+        lib = self.lib
+        self._check(lib.snd_mixer_open(ctypes.byref(self._handle), 0), "snd_mixer_open")
+        try:
+            self._check(lib.snd_mixer_attach(self._handle, self.card.encode()), "snd_mixer_attach")
+            self._check(lib.snd_mixer_selem_register(self._handle, None, None), "snd_mixer_selem_register")
+            self._check(lib.snd_mixer_load(self._handle), "snd_mixer_load")
+
+            sid = ctypes.c_void_p()
+            self._check(lib.snd_mixer_selem_id_malloc(ctypes.byref(sid)), "snd_mixer_selem_id_malloc")
+            try:
+                for name in controls:
+                    lib.snd_mixer_selem_id_set_index(sid, 0)
+                    lib.snd_mixer_selem_id_set_name(sid, name.encode())
+                    elem = lib.snd_mixer_find_selem(self._handle, sid)
+                    if elem and lib.snd_mixer_selem_has_playback_volume(elem):
+                        self._elem = elem
+                        self.control = name
+                        break
+            finally:
+                lib.snd_mixer_selem_id_free(sid)
+
+            if not self._elem:
+                raise OSError(f"Ningún control de volumen ALSA disponible en {self.card}")
+
+            vmin = ctypes.c_long()
+            vmax = ctypes.c_long()
+            lib.snd_mixer_selem_get_playback_volume_range(self._elem, ctypes.byref(vmin), ctypes.byref(vmax))
+            self._min, self._max = vmin.value, vmax.value
+        except Exception:
+            lib.snd_mixer_close(self._handle)
+            self._handle = ctypes.c_void_p()
+            raise
+
+    def _read_volume(self):
+        raw = ctypes.c_long()
+        with self._lock:
+            if not self._handle:
+                return self.volume
+            self.lib.snd_mixer_selem_get_playback_volume(self._elem, _CHANNEL, ctypes.byref(raw))
+        span = self._max - self._min
+        if span <= 0:
+            return 0
+        return int(round((raw.value - self._min) * 100.0 / span))
+
+    def get_volume(self):
+        """Último volumen conocido (0-100); no hace llamadas al sistema."""
+        return self.volume
+
+    def set_volume(self, percent):
+        percent = max(0, min(100, int(percent)))
+        raw = self._min + int(round((self._max - self._min) * percent / 100.0))
+        with self._lock:
+            if not self._handle:
+                return
+            self.lib.snd_mixer_selem_set_playback_volume_all(self._elem, raw)
+        self.volume = percent
+
+    def _poll_fds(self):
+        with self._lock:
+            count = self.lib.snd_mixer_poll_descriptors_count(self._handle)
+            if count <= 0:
+                return []
+            fds = (_PollFd * count)()
+            count = self.lib.snd_mixer_poll_descriptors(self._handle, fds, count)
+        return [(fds[i].fd, fds[i].events) for i in range(max(0, count))]
+
+    def _watch(self):
+        try:
+            fds = self._poll_fds()
+        except Exception as e:
+            print(f"[ALSA] Sin eventos del mixer: {e}")
+            return
+        if not fds:
+            return
+
+        poller = select.poll()
+        for fd, events in fds:
+            poller.register(fd, events or select.POLLIN)
+
+        while self._running:
+            # Timeout para poder salir en close()
+            if not poller.poll(500):
+                continue
+            with self._lock:
+                if not self._handle:
+                    return
+                self.lib.snd_mixer_handle_events(self._handle)
+            self.events += 1
+            self.volume = self._read_volume()
+
+    def close(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        with self._lock:
+            if self._handle:
+                self.lib.snd_mixer_close(self._handle)
+                self._handle = ctypes.c_void_p()
@@ -0,0 +1,54 @@
+# Animaciones por tiempo transcurrido (ticks de SDL, ms): la velocidad no
+# depende de cuántos frames se dibujen, así el FramePacer puede bajar los FPS
+# en reposo sin que nada se mueva más despacio.
+
+MARQUEE_SPEED = 1 / 16   # px por ms (el antiguo 1 px por frame a ~60 fps)
+MARQUEE_PAUSE_MS = 1000  # Pausa en los extremos y al cambiar de texto
+MARQUEE_STEP_MS = 16     # Plazo pedido mientras se mueve (un píxel)
+
+
+class Marquee:
+    """
+    Desplazamiento ping-pong de un texto que no cabe en su ancho. La posición
+    se integra con los ms transcurridos desde el último tick: a 20 o a 60 fps
+    el texto recorre lo mismo en el mismo tiempo, solo con pasos más grandes.
+    """
+    def __init__(self, speed=MARQUEE_SPEED, pause_ms=MARQUEE_PAUSE_MS):
+        self.speed = speed
+        self.pause_ms = pause_ms
+        self.offset = 0        # px desplazados (entero, para dibujar y para el damage)
+        self.active = False    # El texto no cabe y se desplaza
+        self.next_tick = None  # Tick del próximo cambio visible
+        self._pos = 0.0
+        self._direction = 1    # 1: Adelante, -1: Atrás
+        self._moving_at = 0    # Tick desde el que se cuenta el avance (en pausa, el fin de la pausa)
+
+    def reset(self, now):
+        """Vuelve al inicio con la pausa inicial (texto nuevo)."""
+        self._pos = 0.0
+        self.offset = 0
+        self._direction = 1
+        self._moving_at = now + self.pause_ms
+
+    def tick(self, now, overflow):
+        """Avanza hasta now; overflow son los px que no caben (<= 0: no hay marquee)."""
+        if overflow <= 0:
+            self._pos = 0.0
+            self.offset = 0
+            self.active = False
+            self.next_tick = None
+            return
+        self.active = True
+        if now > self._moving_at:
+            self._pos += self._direction * (now - self._moving_at) * self.speed
+            self._moving_at = now
+            if self._pos >= overflow:
+                self._pos = overflow
+                self._direction = -1
+                self._moving_at = now + self.pause_ms # Esperar antes de regresar
+            elif self._pos <= 0:
+                self._pos = 0.0
+                self._direction = 1
+                self._moving_at = now + self.pause_ms # Esperar antes de avanzar
+        self.offset = int(self._pos)
+        self.next_tick = max(self._moving_at, now + MARQUEE_STEP_MS)
@@ -0,0 +1,72 @@
+import unicodedata
+from bisect import bisect_left
+
+
+def normalize(text):
+    """Clave de búsqueda: sin acentos y sin distinguir mayúsculas."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class FilterIndex:
+    """
+    Índice de nombres normalizados de un listado del browser para filtrar
+    mientras se escribe. Primero van los que empiezan por la consulta (rango
+    de una lista ordenada, por bisect) y después los que la contienen. Si la
+    consulta extiende la anterior, solo se buscan subcadenas entre los
+    resultados previos, así cada tecla cuesta menos que la anterior.
+    """
+    def __init__(self, items):
+        self.items = items # BrowserListing
+        self._names = list(items.names)
+        # '..' no se filtra: siempre se sale del filtro para subir de nivel
+        self.keys = [normalize(name) if name != '..' else None for name in self._names]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._sorted = sorted((key, i) for i, key in enumerate(self.keys) if key is not None)
+        self._all = [i for i, key in enumerate(self.keys) if key is not None]
+        self._last = ("", self._all)
+
+    def refresh(self):
+        """
+        Renormaliza solo los nombres que cambiaron (títulos ID3 que llegan del
+        escáner sobre el mismo listado). Devuelve True si hubo cambios.
+        """
+        if len(self.items.names) != len(self._names):
+            # Filas añadidas o borradas (FTP/inotify): se rehace el índice
+            self._names = list(self.items.names)
+            self.keys = [normalize(name) if name != '..' else None for name in self._names]
+            self._rebuild()
+            return True
+        changed = False
+        for i, name in enumerate(self.items.names):
+            if name != self._names[i]:
+                self._names[i] = name
+                self.keys[i] = normalize(name) if name != '..' else None
+                changed = True
+        if changed:
+            self._rebuild()
+        return changed
+
+    def query(self, text):
+        """Devuelve la lista de items que coinciden con text (prefijo primero)."""
+        q = normalize(text)
+        if not q:
+            self._last = ("", self._all)
+            return [self.items[i] for i in self._all]
+
+        lo = bisect_left(self._sorted, (q,))
+        hi = bisect_left(self._sorted, (q + "\uffff",))
+        prefix = sorted(i for _, i in self._sorted[lo:hi])
+
+        last_q, last_matches = self._last
+        candidates = last_matches if last_q and q.startswith(last_q) else self._all
+        prefix_set = set(prefix)
+        keys = self.keys
+        substring = [i for i in candidates if i not in prefix_set and q in keys[i]]
+
+        self._last = (q, sorted(prefix + substring))
+        return [self.items[i] for i in prefix + substring]
@@ -0,0 +1,156 @@
+import os
+from bisect import bisect_left
+
+# Tipos de fila (un byte por entrada en BrowserListing.kinds)
+KIND_DIR = 0
+KIND_FILE = 1
+KIND_PARENT = 2 # '..'
+
+_TYPE_NAMES = ('dir', 'file', 'dir')
+
+
+class BrowserItem:
+    """
+    Fila de un BrowserListing con la misma interfaz que el antiguo dict
+    (item['name'], item['type'], item['path']). Se crea al pedirla y solo
+    guarda el listado y el índice; la ruta se compone bajo demanda.
+    """
+    __slots__ = ('listing', 'index')
+
+    def __init__(self, listing, index):
+        self.listing = listing
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == 'name':
+            return self.listing.names[self.index]
+        if key == 'type':
+            return _TYPE_NAMES[self.listing.kinds[self.index]]
+        if key == 'path':
+            return self.listing.path(self.index)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if not isinstance(other, BrowserItem):
+            return NotImplemented
+        return self.listing is other.listing and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.listing), self.index))
+
+    def __repr__(self):
+        return f"BrowserItem({self['type']}, {self['name']!r})"
+
+
+class BrowserListing:
+    """
+    Contenido de un directorio del browser en arrays paralelos: el directorio
+    base se guarda una vez, los nombres en listas y el tipo de cada fila en un
+    bytearray. Sin el dict y la ruta absoluta por entrada, la estructura pasa
+    de ~330 a ~18 bytes por fila (más el texto de los nombres).
+
+    names es el texto mostrado (título ID3 o nombre de archivo) y _files el
+    nombre en disco; mientras no llega el título ambos son el mismo objeto.
+    No se usa sys.intern: dentro de un directorio casi no hay nombres
+    repetidos y la tabla de internado costaría más de lo que ahorra.
+    """
+    def __init__(self, base, parent=None):
+        self.base = base
+        self.parent = parent
+        self.names = []
+        self._files = []
+        self.kinds = bytearray()
+        if parent is not None:
+            self.names.append('..')
+            self._files.append('..')
+            self.kinds.append(KIND_PARENT)
+
+    def add(self, name, kind, title=None):
+        """Añade una fila; name es el nombre en disco dentro de base."""
+        self._files.append(name)
+        self.names.append(title or name)
+        self.kinds.append(kind)
+        return len(self.kinds) - 1
+
+    def set_title(self, index, title):
+        self.names[index] = title
+
+    def _range(self, kind):
+        """Rango [lo, hi) de las filas de kind (las carpetas van antes que los archivos)."""
+        lo = 1 if self.parent is not None else 0
+        split = lo
+        while split < len(self.kinds) and self.kinds[split] == KIND_DIR:
+            split += 1
+        return (lo, split) if kind == KIND_DIR else (split, len(self.kinds))
+
+    def find(self, name, kind):
+        """Índice de la fila con ese nombre en disco, o -1."""
+        lo, hi = self._range(kind)
+        i = bisect_left(self._files, name, lo, hi)
+        return i if i < hi and self._files[i] == name else -1
+
+    def insert(self, name, kind, title=None):
+        """
+        Inserta una fila en su posición ordenada (cambios incrementales desde
+        FTP/inotify). Si ya existe solo actualiza el título. Devuelve el índice.
+        """
+        lo, hi = self._range(kind)
+        i = bisect_left(self._files, name, lo, hi)
+        if i < hi and self._files[i] == name:
+            if title:
+                self.names[i] = title
+            return i
+        self._files.insert(i, name)
+        self.names.insert(i, title or name)
+        self.kinds.insert(i, kind)
+        return i
+
+    def remove(self, name, kind):
+        """Quita la fila con ese nombre en disco; devuelve su índice o -1."""
+        i = self.find(name, kind)
+        if i >= 0:
+            del self._files[i]
+            del self.names[i]
+            del self.kinds[i]
+        return i
+
+    def path(self, index):
+        if self.kinds[index] == KIND_PARENT:
+            return self.parent
+        return os.path.join(self.base, self._files[index])
+
+    def file_paths(self):
+        """Rutas absolutas de los archivos, en orden."""
+        base = self.base
+        files = self._files
+        return [os.path.join(base, files[i]) for i, kind in enumerate(self.kinds) if kind == KIND_FILE]
+
+    def index(self, item):
+        if isinstance(item, BrowserItem) and item.listing is self:
+            return item.index
+        raise ValueError("item no pertenece a este listado")
+
+    def __contains__(self, item):
+        return isinstance(item, BrowserItem) and item.listing is self and item.index < len(self.kinds)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [BrowserItem(self, i) for i in range(*index.indices(len(self.kinds)))]
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError(index)
+        return BrowserItem(self, index)
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield BrowserItem(self, i)
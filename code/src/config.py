@@ -19,6 +19,7 @@ import sdl2
 import sdl2.sdlmixer as mix
 import sdl2.sdlttf as ttf
 import ctypes
+from text_cache import TextTextureCache
 
 # Configuración de directorios
 if hasattr(sys, '_MEIPASS'):
@@ -63,7 +64,7 @@ BUTTON_DDOWN = profile_config.get("BUTTON_DDOWN", 15) # Default 15 if not presen
 
 
 def init_sdl2():
-    global WINDOW, RENDERER, FONT_LARGE, FONT_MEDIUM, FONT_SMALL
+    global WINDOW, RENDERER, FONT_LARGE, FONT_MEDIUM, FONT_SMALL, TEXT_CACHE
     
     # Inicializar SDL2
     if sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO | sdl2.SDL_INIT_AUDIO | sdl2.SDL_INIT_JOYSTICK) != 0:
@@ -121,6 +122,9 @@ def init_sdl2():
     
     # Nota: Si el usuario redimensiona la ventana, esto debe actualizarse en el bucle de eventos (main.py).
     
+    # Caché compartida de texturas de texto (render_text y filas de la playlist)
+    TEXT_CACHE = TextTextureCache(RENDERER)
+
     # Cargar fuentes
     FONT_LARGE = load_font(24)
     FONT_MEDIUM = load_font(27)
@@ -140,7 +144,10 @@ TEXT_COLOR = sdl2.SDL_Color(255, 255, 255, 255)
 def load_font(size):
     font_path = os.path.join(ASSETS_DIR, 'PublicPixel.ttf')
     if os.path.exists(font_path):
-        return ttf.TTF_OpenFont(font_path.encode('utf-8'), size)
+        font = ttf.TTF_OpenFont(font_path.encode('utf-8'), size)
+        if font and TEXT_CACHE:
+            TEXT_CACHE.register_font(font, size)
+        return font
     # Fallback si no existe la fuente (podríamos intentar cargar una del sistema o error)
     print(f"Warning: Font not found at {font_path}")
     return None
@@ -149,5 +156,7 @@ FONT_LARGE = None
 FONT_MEDIUM = None
 FONT_SMALL = None
 
+TEXT_CACHE = None
+
 # Botones
 BUTTON_SIZE = (100, 100)
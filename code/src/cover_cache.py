@@ -0,0 +1,196 @@
+import time
+import threading
+from collections import OrderedDict, deque
+import sdl2
+from player import read_cover_bytes
+
+PREFETCH_WAIT = 0.25 # s máximos esperando al hilo por una portada antes de decodificarla aquí
+
+
+class CoverTextureCache:
+    """
+    Caché LRU de texturas de portada con presupuesto de memoria.
+    Las portadas de la pista anterior/siguiente se preparan en un hilo
+    (metadatos + miniatura en disco -> SDL_Surface) y el hilo principal solo
+    sube la superficie a textura, así next_track()/prev_track() cambian la
+    portada sin decodificar nada en el frame.
+
+    _textures solo lo modifica el hilo principal, pero siempre con el lock:
+    el hilo de prefetch lo consulta para no decodificar lo que ya está.
+    """
+    def __init__(self, renderer, metadata, thumbnails, max_bytes=8 * 1024 * 1024):
+        self.renderer = renderer
+        self.metadata = metadata
+        self.thumbnails = thumbnails
+        self.max_bytes = max_bytes
+        self._textures = OrderedDict() # clave -> (texture, bytes)
+        self.bytes_used = 0
+        self._pinned = None # clave de la portada en pantalla (nunca se expulsa)
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+        # Prefetch en segundo plano
+        self._cond = threading.Condition()
+        self._requests = deque()  # rutas pendientes
+        self._inflight = set()    # claves decodificándose o en _ready, aún sin subir
+        self._failed = set()      # claves cuya imagen no se pudo decodificar (no se reintentan)
+        self._ready = deque()     # (clave, surface) listos para subir
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def key_for(meta):
+        """Identidad de la imagen: hash del contenido o, sin él, ruta + mtime."""
+        return meta.cover_hash or (meta.path, meta.mtime)
+
+    def get(self, meta):
+        """Textura de la portada de meta (o None si no tiene). Fija la portada como visible."""
+        if not meta or not meta.has_cover:
+            return None
+        key = self.key_for(meta)
+        self._pinned = key
+
+        # El hilo ya la está decodificando: esperarla (con límite) en lugar de
+        # repetir el trabajo; si tarda demasiado se decodifica aquí
+        waited = False
+        with self._cond:
+            deadline = time.perf_counter() + PREFETCH_WAIT
+            while key in self._inflight and not any(k == key for k, _ in self._ready):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                waited = True
+            if key in self._failed:
+                return None
+
+        # Una superficie prefetcheada puede estar esperando a subirse
+        self.pump(max_uploads=len(self._ready) if waited else 2)
+
+        with self._cond:
+            entry = self._textures.get(key)
+            if entry:
+                self._textures.move_to_end(key)
+        if entry:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        try:
+            surface = self.thumbnails.load(meta.cover_hash, lambda: read_cover_bytes(meta))
+        except Exception as e:
+            print(f"[Covers] Error decodificando la portada de {meta.path}: {e}")
+            surface = None
+        if not surface:
+            with self._cond:
+                self._failed.add(key)
+            return None
+        return self._upload(key, surface)
+
+    def prefetch(self, paths):
+        """Prepara en segundo plano las portadas de las rutas dadas (p.ej. anterior/siguiente)."""
+        with self._cond:
+            self._requests.clear()
+            self._requests.extend(p for p in paths if p)
+            self._cond.notify()
+
+    def pump(self, max_uploads=2):
+        """Sube a textura las superficies listas (hilo principal)."""
+        uploaded = 0
+        while self._ready and uploaded < max_uploads:
+            with self._cond:
+                key, surface = self._ready.popleft()
+                self._inflight.discard(key)
+            if key in self._textures:
+                sdl2.SDL_FreeSurface(surface)
+                continue
+            if self._upload(key, surface):
+                self.prefetched += 1
+            uploaded += 1
+
+    def _upload(self, key, surface):
+        texture = sdl2.SDL_CreateTextureFromSurface(self.renderer, surface)
+        size = surface.contents.w * surface.contents.h * 4
+        sdl2.SDL_FreeSurface(surface)
+        if not texture:
+            return None
+        with self._cond:
+            self._textures[key] = (texture, size)
+        self.bytes_used += size
+        self._evict()
+        return texture
+
+    def _evict(self):
+        for key in list(self._textures):
+            if self.bytes_used <= self.max_bytes:
+                break
+            if key == self._pinned:
+                continue
+            with self._cond:
+                texture, size = self._textures.pop(key)
+            sdl2.SDL_DestroyTexture(texture)
+            self.bytes_used -= size
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._requests:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                path = self._requests.popleft()
+
+            key = None # Clave marcada en _inflight por este hilo
+            surface = None
+            try:
+                meta = self.metadata.get(path)
+                if not meta or not meta.has_cover:
+                    continue
+                with self._cond:
+                    candidate = self.key_for(meta)
+                    if candidate in self._textures or candidate in self._inflight or candidate in self._failed:
+                        continue
+                    key = candidate
+                    self._inflight.add(key)
+                surface = self.thumbnails.load(meta.cover_hash, lambda: read_cover_bytes(meta))
+            except Exception as e:
+                # Una imagen corrupta no puede tumbar el hilo para el resto de la sesión
+                print(f"[Covers] Error preparando la portada de {path}: {e}")
+            finally:
+                # Despierta a get() si estaba esperando esta clave
+                if key is not None:
+                    with self._cond:
+                        if surface:
+                            self._ready.append((key, surface))
+                        else:
+                            self._inflight.discard(key)
+                            self._failed.add(key)
+                        self._cond.notify_all()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'textures': len(self._textures),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'prefetched': self.prefetched,
+            'failed': len(self._failed),
+            'hit_rate': (self.hits / total) if total else 0.0,
+        }
+
+    def cleanup(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        while self._ready:
+            _, surface = self._ready.popleft()
+            sdl2.SDL_FreeSurface(surface)
+        with self._cond:
+            textures, self._textures = self._textures, OrderedDict()
+        for texture, _ in textures.values():
+            sdl2.SDL_DestroyTexture(texture)
+        self.bytes_used = 0
@@ -0,0 +1,116 @@
+import struct
+from collections import namedtuple
+
+# Retardo del decodificador MP3 (muestras) que se suma al del encoder
+DECODER_DELAY = 529
+
+GaplessInfo = namedtuple('GaplessInfo', [
+    'delay', 'padding', 'sample_rate', 'frames', 'samples_per_frame'
+])
+
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000), # MPEG1
+    2: (22050, 24000, 16000), # MPEG2
+    0: (11025, 12000, 8000),  # MPEG2.5
+}
+
+
+def _id3v2_size(head):
+    if len(head) < 10 or head[:3] != b'ID3':
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    size += 10
+    if head[5] & 0x10: # Footer
+        size += 10
+    return size
+
+
+def read_gapless_info(path):
+    """
+    Lee el retardo/relleno del encoder desde la cabecera Xing/Info + LAME
+    del primer frame MP3. Devuelve GaplessInfo o None si no hay cabecera.
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(10)
+            f.seek(_id3v2_size(head))
+            data = f.read(4096)
+    except OSError:
+        return None
+
+    # Buscar el primer frame sync
+    i = 0
+    while i < len(data) - 4:
+        if data[i] == 0xFF and (data[i + 1] & 0xE0) == 0xE0:
+            break
+        i += 1
+    else:
+        return None
+
+    b1 = data[i + 1]
+    b2 = data[i + 2]
+    b3 = data[i + 3]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    sr_index = (b2 >> 2) & 0x03
+    mono = ((b3 >> 6) & 0x03) == 3
+    if version not in _SAMPLE_RATES or layer != 1 or sr_index == 3: # layer 1 = Layer III
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][sr_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # Offset de la cabecera Xing/Info (tras la side info)
+    if version == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    p = i + 4 + side_info
+    if data[p:p + 4] not in (b'Xing', b'Info'):
+        return None
+
+    flags = struct.unpack('>I', data[p + 4:p + 8])[0]
+    p += 8
+    frames = 0
+    if flags & 0x1:
+        frames = struct.unpack('>I', data[p:p + 4])[0]
+        p += 4
+    if flags & 0x2:
+        p += 4   # bytes
+    if flags & 0x4:
+        p += 100 # TOC
+    if flags & 0x8:
+        p += 4   # calidad
+
+    # Tag LAME: 9 bytes de versión del encoder; retardo/relleno en el byte 21
+    encoder = data[p:p + 4]
+    if encoder not in (b'LAME', b'Lavf', b'Lavc', b'GOGO') or len(data) < p + 24:
+        return None
+    d0, d1, d2 = data[p + 21], data[p + 22], data[p + 23]
+    delay = (d0 << 4) | (d1 >> 4)
+    padding = ((d1 & 0x0F) << 8) | d2
+
+    return GaplessInfo(delay, padding, sample_rate, frames, samples_per_frame)
+
+
+def trim_points(info, decoded_duration):
+    """
+    Calcula (inicio, fin) en segundos a recortar para reproducir sin huecos,
+    o None si no hace falta. Si la duración que informa el decodificador ya
+    coincide con la duración exacta, el decodificador recorta por sí mismo
+    (p.ej. mpg123 con gapless) y no se toca nada.
+    """
+    if not info or not info.frames or decoded_duration is None or decoded_duration <= 0:
+        return None
+
+    total = info.frames * info.samples_per_frame
+    exact = (total - info.delay - info.padding) / info.sample_rate
+    untrimmed = total / info.sample_rate
+    if abs(decoded_duration - exact) <= abs(decoded_duration - untrimmed):
+        return None
+
+    start = (info.delay + DECODER_DELAY) / info.sample_rate
+    end = start + exact
+    return start, end
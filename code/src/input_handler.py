@@ -8,6 +8,7 @@ class InputHandler:
         self.log_file = log_file
         self.joysticks = {}
         self.mode = "player"
+        self.text = "" # Último texto escrito (modo filtro)
         self._init_joysticks()
         
     def set_mode(self, mode):
@@ -37,6 +38,8 @@ class InputHandler:
 
     def handle_input(self, event):
         # Event es un objeto SDL_Event
+        if self.mode == "filter":
+            return self._handle_filter_input(event)
         
         # Teclado
         if event.type == sdl2.SDL_KEYDOWN:
@@ -80,12 +83,17 @@ class InputHandler:
                 self.player.set_volume(current_vol - 0.1)
             elif keycode == sdl2.SDLK_p:
                 return "TOGGLE_PLAYLIST"
+            elif keycode == sdl2.SDLK_F3:
+                return "TOGGLE_PROFILER"
+            elif keycode == sdl2.SDLK_SLASH:
+                if self.mode == "playlist": return "FILTER_OPEN"
             # Mapeo adicional para teclado similar a botones Y/X
             elif keycode == sdl2.SDLK_y: # Equivalente a Botón Y
                 if self.mode == "playlist": return "PLAY_DIR"
                 self.player.prev_track()
                 return "PREV_TRACK"
             elif keycode == sdl2.SDLK_x: # Equivalente a Botón X
+                if self.mode == "playlist": return "PLAY_TREE"
                 if self.mode == "player": 
                     self.player.next_track() 
                     return "NEXT_TRACK" 
@@ -112,7 +120,8 @@ class InputHandler:
                 if self.mode == "playlist": return "PLAY_DIR"
                 self.player.prev_track()
                 return "PREV_TRACK"
-            elif button == config.BUTTON_X: # X -> Next Track (Player)
+            elif button == config.BUTTON_X: # X -> Next Track (Player) / Play árbol (Playlist)
+                if self.mode == "playlist": return "PLAY_TREE"
                 if self.mode == "player":
                     self.player.next_track()
                     return "NEXT_TRACK"
@@ -160,6 +169,62 @@ class InputHandler:
                 self.player.set_volume(current_vol - 0.1)
 
         return None
+
+    def _handle_filter_input(self, event):
+        """
+        Modo filtro de la playlist: el teclado escribe (SDL_TEXTINPUT) y el
+        gamepad elige letras con izquierda/derecha, Y añade y X borra.
+        """
+        if event.type == sdl2.SDL_TEXTINPUT:
+            self.text = event.text.text.decode('utf-8', 'ignore')
+            return "FILTER_TEXT"
+
+        if event.type == sdl2.SDL_KEYDOWN:
+            keycode = event.key.keysym.sym
+            if keycode == sdl2.SDLK_ESCAPE:
+                return "FILTER_CLOSE"
+            elif keycode == sdl2.SDLK_BACKSPACE:
+                return "FILTER_BACKSPACE"
+            elif keycode == sdl2.SDLK_UP:
+                return "NAV_UP"
+            elif keycode == sdl2.SDLK_DOWN:
+                return "NAV_DOWN"
+            elif keycode == sdl2.SDLK_RETURN:
+                return "SELECT_ITEM"
+            elif keycode == sdl2.SDLK_LEFT:
+                return "FILTER_PICK_PREV"
+            elif keycode == sdl2.SDLK_RIGHT:
+                return "FILTER_PICK_NEXT"
+
+        elif event.type == sdl2.SDL_JOYBUTTONDOWN:
+            button = event.jbutton.button
+            if button == 8: # Select
+                return "QUIT"
+            elif button == config.BUTTON_B:
+                return "SELECT_ITEM"
+            elif button == config.BUTTON_A:
+                return "FILTER_CLOSE"
+            elif button == config.BUTTON_Y:
+                return "FILTER_PICK_ADD"
+            elif button == config.BUTTON_X:
+                return "FILTER_BACKSPACE"
+            elif button == config.BUTTON_DUP:
+                return "NAV_UP"
+            elif button == config.BUTTON_DDOWN:
+                return "NAV_DOWN"
+
+        elif event.type == sdl2.SDL_JOYHATMOTION:
+            value = event.jhat.value
+            if value == sdl2.SDL_HAT_UP:
+                return "NAV_UP"
+            elif value == sdl2.SDL_HAT_DOWN:
+                return "NAV_DOWN"
+            elif value == sdl2.SDL_HAT_LEFT:
+                return "FILTER_PICK_PREV"
+            elif value == sdl2.SDL_HAT_RIGHT:
+                return "FILTER_PICK_NEXT"
+
+        return None
         
     def cleanup(self):
         for joystick in self.joysticks.values():
@@ -0,0 +1,439 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+
+# Registro de metadatos de una pista (inmutable, se puede compartir entre hilos)
+TrackMetadata = namedtuple('TrackMetadata', [
+    'path', 'mtime', 'size', 'title', 'artist', 'album', 'duration', 'has_cover',
+    'cover_offset', 'cover_size', 'cover_hash'
+])
+# Compatibilidad: los campos de portada son opcionales al construir el registro
+TrackMetadata.__new__.__defaults__ = (-1, 0, None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    duration REAL,
+    has_cover INTEGER,
+    cover_offset INTEGER,
+    cover_size INTEGER,
+    cover_hash TEXT,
+    indexed_at REAL
+);
+CREATE INDEX IF NOT EXISTS tracks_dir ON tracks(dir);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    scanned_at REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    PRIMARY KEY (dir, name)
+);
+"""
+
+_TRACK_COLUMNS = ', '.join(TrackMetadata._fields)
+
+
+def _under(column):
+    """Condición SQL: column está dentro del directorio dado (prefijo exacto, con separador)."""
+    return f"substr({column}, 1, ?) = ?"
+
+
+def _subtree(path):
+    """Parámetros para _under(): longitud y prefijo 'path/'."""
+    prefix = path + os.sep
+    return (len(prefix), prefix)
+
+
+def _entry_names(path):
+    """{(nombre, is_dir)} de path tal como lo registra el índice (directorios y .mp3)."""
+    names = set()
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    names.add((entry.name, 1))
+                elif entry.name.lower().endswith('.mp3'):
+                    names.add((entry.name, 0))
+            except OSError:
+                continue
+    return names
+
+
+def default_cache_dir():
+    """Directorio de cachés persistentes (PARASYTE_CACHE_DIR o ~/.parasyte)."""
+    return os.environ.get("PARASYTE_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".parasyte")
+
+
+def default_index_path():
+    """Ruta por defecto de la base de datos."""
+    return os.path.join(default_cache_dir(), "library.db")
+
+
+class LibraryIndex:
+    """
+    Índice persistente (SQLite) de la biblioteca musical.
+    Guarda tags, duración, offset/hash de la portada y qué contiene cada
+    directorio. Una pista solo se vuelve a extraer cuando su stat()
+    (mtime/tamaño) cambia, y un directorio solo se vuelve a listar cuando
+    cambia su mtime.
+    """
+    def __init__(self, db_path=None, extractor=None):
+        self.db_path = db_path or default_index_path()
+        self.extractor = extractor # callable(path, stat_result) -> TrackMetadata
+        self._lock = threading.RLock()
+        self._conn = None
+        self.walk_hits = 0   # Directorios recorridos desde el índice (walk_entries)
+        self.walk_scans = 0  # Directorios que hubo que leer del disco
+        self._open()
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            # WAL + synchronous NORMAL: menos fsync sobre la SD
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"[Index] No se pudo abrir {self.db_path}: {e}. Se usa índice en memoria.")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # --- Pistas ---
+
+    def lookup(self, path, st=None):
+        """Devuelve el registro indexado si sigue vigente según stat(), o None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_TRACK_COLUMNS} FROM tracks WHERE path = ?", (path,)).fetchone()
+        if not row:
+            return None
+        meta = TrackMetadata(*row)
+        if st is not None and (meta.mtime != st.st_mtime_ns or meta.size != st.st_size):
+            return None
+        return meta
+
+    def store(self, meta):
+        with self._lock:
+            self._store(meta)
+            self._conn.commit()
+
+    def _store(self, meta):
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO tracks (dir, indexed_at, {_TRACK_COLUMNS}) "
+            f"VALUES (?, ?, {', '.join('?' * len(TrackMetadata._fields))})",
+            (os.path.dirname(meta.path), time.time()) + tuple(meta))
+
+    def _extract(self, path, st):
+        meta = self.extractor(path, st) if self.extractor else None
+        if meta is None:
+            meta = TrackMetadata(path, st.st_mtime_ns, st.st_size,
+                                 os.path.basename(path), None, None, 0.0, False)
+        return meta
+
+    # --- Directorios ---
+
+    def list_directory(self, path):
+        """
+        Devuelve (dirs, files) del directorio, ordenados alfabéticamente.
+        dirs es una lista de nombres; files una lista de TrackMetadata.
+        Si el mtime del directorio no cambió, no se vuelve a listar (solo stat()
+        de cada pista).
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        listing = self.cached_listing(path, st)
+        if listing is not None:
+            return listing
+        return self._rescan_directory(path, st)
+
+    def cached_listing(self, path, st=None):
+        """
+        Listado del directorio solo desde el índice, o None si no está
+        indexado, cambió su mtime, falta alguna pista o el stat() de alguna
+        no coincide con el guardado.
+        """
+        path = os.path.abspath(path)
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+            if not row or row[0] != st.st_mtime_ns:
+                return None
+            names = self._conn.execute(
+                "SELECT name, is_dir FROM entries WHERE dir = ?", (path,)).fetchall()
+            tracks = {m.path: m for m in (TrackMetadata(*r) for r in self._conn.execute(
+                f"SELECT {_TRACK_COLUMNS} FROM tracks WHERE dir = ?", (path,)))}
+
+        dirs = sorted(n for n, is_dir in names if is_dir)
+        files = []
+        for name in sorted(n for n, is_dir in names if not is_dir):
+            meta = tracks.get(os.path.join(path, name))
+            if meta is None:
+                return None
+            # Tags reescritos en el sitio: cambia el archivo, no el mtime del directorio
+            try:
+                fst = os.stat(meta.path)
+            except OSError:
+                return None
+            if fst.st_mtime_ns != meta.mtime or fst.st_size != meta.size:
+                return None
+            files.append(meta)
+        return dirs, files
+
+    def walk_entries(self, path, st):
+        """
+        (dirs, files) por nombre, ordenados, para recorrer árboles (walk_mp3 y
+        el watcher de inotify). Si el mtime del directorio (st) no cambió sale
+        del índice, sin leer el directorio; si no, se lee con scandir y se
+        guarda para la próxima vez. No hace stat() de las pistas ni lee tags:
+        cached_listing() sigue exigiendo sus registros para servir el listado.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == st.st_mtime_ns:
+                names = self._conn.execute(
+                    "SELECT name, is_dir FROM entries WHERE dir = ?", (path,)).fetchall()
+                self.walk_hits += 1
+                return (sorted(n for n, is_dir in names if is_dir),
+                        sorted(n for n, is_dir in names if not is_dir))
+
+        names = _entry_names(path)
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE dir = ?", (path,))
+            self._conn.executemany("INSERT INTO entries (dir, name, is_dir) VALUES (?, ?, ?)",
+                                   [(path, n, is_dir) for n, is_dir in names])
+            self._conn.execute("INSERT OR REPLACE INTO dirs (path, mtime, scanned_at) VALUES (?, ?, ?)",
+                               (path, st.st_mtime_ns, time.time()))
+            self._conn.commit()
+            self.walk_scans += 1
+        return (sorted(n for n, is_dir in names if is_dir),
+                sorted(n for n, is_dir in names if not is_dir))
+
+    def _rescan_directory(self, path, st):
+        dirs = []
+        file_entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.name.lower().endswith('.mp3'):
+                        file_entries.append((entry.name, entry.stat()))
+                except OSError:
+                    continue
+
+        dirs.sort()
+        file_entries.sort(key=lambda e: e[0])
+
+        with self._lock:
+            known = {m.path: m for m in (TrackMetadata(*r) for r in self._conn.execute(
+                f"SELECT {_TRACK_COLUMNS} FROM tracks WHERE dir = ?", (path,)))}
+
+        files = []
+        changed = []
+        for name, fst in file_entries:
+            full_path = os.path.join(path, name)
+            meta = known.get(full_path)
+            if meta is None or meta.mtime != fst.st_mtime_ns or meta.size != fst.st_size:
+                meta = self._extract(full_path, fst)
+                changed.append(meta)
+            files.append(meta)
+
+        with self._lock:
+            present = set(m.path for m in files)
+            gone = [p for p in known if p not in present]
+            self._conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in gone])
+            for meta in changed:
+                self._store(meta)
+            self._conn.execute("DELETE FROM entries WHERE dir = ?", (path,))
+            self._conn.executemany(
+                "INSERT INTO entries (dir, name, is_dir) VALUES (?, ?, ?)",
+                [(path, d, 1) for d in dirs] + [(path, os.path.basename(m.path), 0) for m in files])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime, scanned_at) VALUES (?, ?, ?)",
+                (path, st.st_mtime_ns, time.time()))
+            self._conn.commit()
+
+        return dirs, files
+
+    # --- Cambios incrementales (FTP / inotify) ---
+    # Cada evento actualiza solo las filas afectadas y vuelve a sellar el mtime
+    # del directorio padre, así su listado sigue sirviéndose desde el índice
+    # sin re-escanearlo. Solo se sella si el listado indexado coincide con el
+    # disco: lo que llegó por otra vía sin aviso fuerza un re-escaneo.
+
+    def file_changed(self, path):
+        """Archivo creado o modificado: extrae sus tags y lo añade al listado. Devuelve el registro."""
+        path = os.path.abspath(path)
+        if not path.lower().endswith('.mp3'):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        meta = self.lookup(path, st) or self._extract(path, st)
+        parent = os.path.dirname(path)
+        with self._lock:
+            self._store(meta)
+            self._conn.execute("INSERT OR IGNORE INTO entries (dir, name, is_dir) VALUES (?, ?, 0)",
+                               (parent, os.path.basename(path)))
+            self._touch_dir(parent)
+            self._conn.commit()
+        return meta
+
+    def dir_created(self, path, empty=False):
+        """
+        Directorio nuevo. Con empty=True (MKD de FTP) se registra ya como
+        listado vacío y los archivos que lleguen después lo completan.
+        """
+        path = os.path.abspath(path)
+        parent = os.path.dirname(path)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO entries (dir, name, is_dir) VALUES (?, ?, 1)",
+                               (parent, os.path.basename(path)))
+            if empty:
+                self._conn.execute("DELETE FROM entries WHERE dir = ?", (path,))
+                self._conn.execute("INSERT OR REPLACE INTO dirs (path, mtime, scanned_at) VALUES (?, ?, ?)",
+                                   (path, 0, time.time()))
+                self._touch_dir(path)
+            self._touch_dir(parent)
+            self._conn.commit()
+
+    def removed(self, path):
+        """Archivo o directorio borrado (con todo su subárbol)."""
+        path = os.path.abspath(path)
+        sub = _subtree(path)
+        with self._lock:
+            self._conn.execute(f"DELETE FROM tracks WHERE path = ? OR {_under('path')}", (path,) + sub)
+            self._conn.execute(f"DELETE FROM entries WHERE dir = ? OR {_under('dir')}", (path,) + sub)
+            self._conn.execute(f"DELETE FROM dirs WHERE path = ? OR {_under('path')}", (path,) + sub)
+            self._conn.execute("DELETE FROM entries WHERE dir = ? AND name = ?",
+                               (os.path.dirname(path), os.path.basename(path)))
+            self._touch_dir(os.path.dirname(path))
+            self._conn.commit()
+
+    def moved(self, src, dest):
+        """Renombrado o movido: reescribe las rutas en lugar de volver a extraer los tags."""
+        src = os.path.abspath(src)
+        dest = os.path.abspath(dest)
+        try:
+            is_dir = os.path.isdir(dest)
+        except OSError:
+            return
+        if not is_dir and not dest.lower().endswith('.mp3'):
+            self.removed(src)
+            return
+        sub = _subtree(src)
+        with self._lock:
+            # El mismo movimiento puede llegar dos veces (hook del FTP e inotify):
+            # si ya no queda nada bajo src, solo se asegura la entrada de dest
+            known = self._conn.execute(
+                f"SELECT 1 FROM tracks WHERE path = ? OR {_under('path')} "
+                f"UNION ALL SELECT 1 FROM dirs WHERE path = ? OR {_under('path')} LIMIT 1",
+                (src,) + sub + (src,) + sub).fetchone()
+            if known:
+                self._move_rows(src, dest, sub)
+            self._conn.execute("DELETE FROM entries WHERE dir = ? AND name = ?",
+                               (os.path.dirname(src), os.path.basename(src)))
+            self._conn.execute("INSERT OR IGNORE INTO entries (dir, name, is_dir) VALUES (?, ?, ?)",
+                               (os.path.dirname(dest), os.path.basename(dest), 1 if is_dir else 0))
+            self._touch_dir(os.path.dirname(src))
+            self._touch_dir(os.path.dirname(dest))
+            self._conn.commit()
+
+    def _move_rows(self, src, dest, sub):
+        cut = len(src) + 1 # substr() de SQLite empieza en 1
+        self._conn.execute(f"DELETE FROM tracks WHERE path = ? OR {_under('path')}",
+                           (dest,) + _subtree(dest))
+        self._conn.execute("UPDATE tracks SET path = ?, dir = ? WHERE path = ?",
+                           (dest, os.path.dirname(dest), src))
+        self._conn.execute("UPDATE tracks SET path = ? || substr(path, ?), dir = ? || substr(dir, ?) "
+                           f"WHERE {_under('path')}", (dest, cut, dest, cut) + sub)
+        self._conn.execute("UPDATE OR REPLACE dirs SET path = ? || substr(path, ?) "
+                           f"WHERE path = ? OR {_under('path')}", (dest, cut, src) + sub)
+        self._conn.execute("UPDATE OR REPLACE entries SET dir = ? || substr(dir, ?) "
+                           f"WHERE dir = ? OR {_under('dir')}", (dest, cut, src) + sub)
+
+    def _touch_dir(self, path):
+        # Solo si el directorio ya estaba indexado (si no, se listará al visitarlo)
+        if not self._conn.execute("SELECT 1 FROM dirs WHERE path = ?", (path,)).fetchone():
+            return
+        try:
+            mtime = os.stat(path).st_mtime_ns # Antes de listar: un cambio posterior no queda sellado
+            on_disk = _entry_names(path)
+        except OSError:
+            on_disk = None
+        indexed = set(self._conn.execute("SELECT name, is_dir FROM entries WHERE dir = ?", (path,)))
+        if on_disk is not None and indexed == on_disk:
+            self._conn.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, path))
+        else:
+            # Algo cambió sin evento (copia sin aviso, evento aún en cola): re-escanear al visitarlo
+            self._conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+
+    # --- Estadísticas ---
+
+    def stats(self, verify=False):
+        """
+        Tamaño y antigüedad del índice. Con verify=True se hace stat() de cada
+        pista para contar filas obsoletas (cambiadas) o huérfanas (borradas).
+        """
+        with self._lock:
+            tracks = self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            dirs, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(scanned_at) FROM dirs").fetchone()
+            rows = self._conn.execute("SELECT path, mtime, size FROM tracks").fetchall() if verify else []
+
+        try:
+            db_bytes = os.path.getsize(self.db_path)
+        except OSError:
+            db_bytes = 0
+
+        result = {
+            'tracks': tracks,
+            'dirs': dirs,
+            'db_bytes': db_bytes,
+            'oldest_scan_age': (time.time() - oldest) if oldest else None,
+            'walk_from_index': self.walk_hits,
+            'walk_scanned': self.walk_scans,
+        }
+
+        if verify:
+            stale = 0
+            missing = 0
+            for path, mtime, size in rows:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    missing += 1
+                    continue
+                if st.st_mtime_ns != mtime or st.st_size != size:
+                    stale += 1
+            result['stale'] = stale
+            result['missing'] = missing
+
+        return result
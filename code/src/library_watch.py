@@ -0,0 +1,318 @@
+import os
+import sys
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+from collections import deque, namedtuple
+
+# Evento ligero para el hilo principal. kind: 'file' | 'dir' | 'removed' | 'moved'
+LibraryChange = namedtuple('LibraryChange', ['kind', 'path', 'dest', 'is_dir', 'title'])
+LibraryChange.__new__.__defaults__ = (None, False, None)
+
+
+class LibraryChanges:
+    """
+    Cambios de la biblioteca notificados desde fuera del hilo principal
+    (hooks del servidor FTP y watcher de inotify). El trabajo de disco (tags,
+    índice SQLite) se hace en el hilo que notifica; el hilo principal solo
+    recibe eventos ligeros en drain() para tocar el listado del browser y la
+    playlist. Nunca se re-escanea un árbol: cada evento afecta a una ruta.
+    """
+    def __init__(self, library, metadata):
+        self.library = library
+        self.metadata = metadata
+        self.on_change = None   # callable() para despertar el bucle principal
+        self.watcher = None
+        self.received = 0
+        self._events = deque()  # append/popleft son atómicos entre hilos
+        self._aliases = []      # (ruta real, raíz tal como la usa el player)
+
+    def _normalize(self, path):
+        # El FTP entrega rutas resueltas (realpath); el player usa las de la
+        # raíz aunque sea un enlace simbólico (p. ej. /roms -> /storage/roms)
+        path = os.path.abspath(path)
+        for real, root in self._aliases:
+            if path == real or path.startswith(real + os.sep):
+                return root + path[len(real):]
+        return path
+
+    def _post(self, change):
+        self.received += 1
+        self._events.append(change)
+        if self.on_change:
+            self.on_change()
+
+    # --- Hilos que notifican ---
+
+    def file_changed(self, path):
+        """Archivo subido, copiado o modificado."""
+        meta = self.library.file_changed(self._normalize(path))
+        if meta is None:
+            return
+        self.metadata.invalidate(meta.path)
+        self._post(LibraryChange('file', meta.path, title=meta.title))
+
+    def dir_created(self, path, empty=False):
+        path = self._normalize(path)
+        self.library.dir_created(path, empty=empty)
+        self._post(LibraryChange('dir', path, is_dir=True))
+
+    def removed(self, path):
+        path = self._normalize(path)
+        self.library.removed(path)
+        self.metadata.invalidate(path)
+        self._post(LibraryChange('removed', path))
+
+    def moved(self, src, dest):
+        src = self._normalize(src)
+        dest = self._normalize(dest)
+        is_dir = os.path.isdir(dest)
+        if not is_dir and not dest.lower().endswith('.mp3'):
+            # Renombrado a algo que no es mp3: para la biblioteca es un borrado
+            self.removed(src)
+            return
+        self.library.moved(src, dest)
+        self.metadata.invalidate(src)
+        title = None
+        if not is_dir:
+            meta = self.library.lookup(dest)
+            title = meta.title if meta else None
+        self._post(LibraryChange('moved', src, dest, is_dir, title))
+
+    # --- Hilo principal ---
+
+    def pending(self):
+        return bool(self._events)
+
+    def drain(self):
+        out = []
+        while self._events:
+            try:
+                out.append(self._events.popleft())
+            except IndexError:
+                break
+        return out
+
+    def watch(self, roots):
+        """Vigila roots con inotify (Linux) para copias que no pasan por el FTP."""
+        self.stop()
+        self._aliases = [(os.path.realpath(r), os.path.abspath(r)) for r in roots
+                         if os.path.realpath(r) != os.path.abspath(r)]
+        try:
+            # Subdirectorios desde el índice: el arranque no vuelve a leer el árbol
+            self.watcher = InotifyWatcher(roots, self, lister=self.library.walk_entries)
+        except OSError as e:
+            print(f"[Watch] inotify no disponible ({e}); solo se notan los cambios por FTP")
+
+    def stop(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'watched_dirs': self.watcher.watch_count() if self.watcher else 0,
+        }
+
+
+# --- inotify (ctypes sobre libc) ---
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+_EVENT = struct.Struct('iIII') # wd, mask, cookie, len
+
+
+def load_libc():
+    """libc con inotify_init1, o OSError si la plataforma no lo tiene."""
+    if not sys.platform.startswith('linux'):
+        raise OSError("no es Linux")
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError("libc sin inotify")
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Vigila recursivamente los directorios de la biblioteca con inotify en un
+    hilo propio y traduce cada evento a una llamada de LibraryChanges.
+    Los archivos se notan al cerrarse tras escribir (IN_CLOSE_WRITE), no al
+    crearse, para no indexar copias a medias.
+    """
+    def __init__(self, roots, changes, libc=None, lister=None):
+        self.libc = libc or load_libc()
+        self.changes = changes
+        self.lister = lister # callable(path, stat_result) -> (dirs, files), p. ej. LibraryIndex.walk_entries
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._wd = {} # wd -> ruta del directorio (solo lo toca el hilo del watcher)
+        self._stop_r, self._stop_w = os.pipe()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def watch_count(self):
+        return len(self._wd)
+
+    def _add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                print(f"[Watch] Límite de inotify alcanzado (fs.inotify.max_user_watches) en {path}")
+            return False
+        self._wd[wd] = path
+        return True
+
+    def _add_tree(self, root, files=None):
+        """Vigila root y sus subdirectorios (solo directorios, sin stat de archivos)."""
+        stack = [root]
+        while stack and self._running:
+            path = stack.pop()
+            if not self._add_watch(path):
+                continue
+            if self.lister:
+                # Tras el watch: un cambio de aquí en adelante llega como evento
+                try:
+                    dirs, names = self.lister(path, os.stat(path))
+                except OSError:
+                    continue
+                stack.extend(os.path.join(path, name) for name in dirs)
+                if files is not None:
+                    files.extend(os.path.join(path, name) for name in names)
+                continue
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif files is not None and entry.name.lower().endswith('.mp3'):
+                                files.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _run(self):
+        for root in self.roots:
+            self._add_tree(root)
+        print(f"[Watch] Vigilando {len(self._wd)} directorios")
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        poller.register(self._stop_r, select.POLLIN)
+        while self._running:
+            try:
+                ready = poller.poll()
+            except InterruptedError:
+                continue
+            if any(fd == self._stop_r for fd, _ in ready):
+                break
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                print(f"[Watch] Error leyendo eventos: {e}")
+                break
+            try:
+                self._dispatch(self._parse(data))
+            except Exception as e:
+                print(f"[Watch] Error aplicando cambios: {e}")
+        os.close(self.fd)
+        os.close(self._stop_r)
+
+    def _parse(self, data):
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def _dispatch(self, events):
+        moves = {} # cookie -> ruta de origen (IN_MOVED_FROM sin su IN_MOVED_TO todavía)
+        for wd, mask, cookie, name in events:
+            if mask & IN_Q_OVERFLOW:
+                print("[Watch] Cola de inotify desbordada: algunos cambios se verán al visitar el directorio")
+                continue
+            if mask & IN_IGNORED:
+                self._wd.pop(wd, None)
+                continue
+            base = self._wd.get(wd)
+            if base is None or not name:
+                continue
+            path = os.path.join(base, name)
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_MOVED_FROM:
+                moves[cookie] = path
+            elif mask & IN_MOVED_TO:
+                src = moves.pop(cookie, None)
+                if src:
+                    self.changes.moved(src, path)
+                    if is_dir:
+                        self._rename_watches(src, path)
+                elif is_dir:
+                    self._new_dir(path)
+                else:
+                    self.changes.file_changed(path)
+            elif mask & IN_CREATE:
+                if is_dir:
+                    self._new_dir(path)
+            elif mask & IN_CLOSE_WRITE:
+                self.changes.file_changed(path)
+            elif mask & IN_DELETE:
+                self.changes.removed(path)
+
+        # Movidos fuera de la biblioteca
+        for src in moves.values():
+            self.changes.removed(src)
+
+    def _new_dir(self, path):
+        # Lo que se escribió antes de tener el watch no generó eventos: se
+        # recoge recorriendo solo el directorio nuevo
+        files = []
+        self._add_tree(path, files)
+        self.changes.dir_created(path)
+        for file_path in files:
+            self.changes.file_changed(file_path)
+
+    def _rename_watches(self, src, dest):
+        prefix = src + os.sep
+        for wd, path in list(self._wd.items()):
+            if path == src or path.startswith(prefix):
+                self._wd[wd] = dest + path[len(src):]
+
+    def stop(self):
+        self._running = False
+        try:
+            os.write(self._stop_w, b'x')
+        except OSError:
+            pass
+        self._thread.join(timeout=2.0)
+        os.close(self._stop_w)
@@ -1,7 +1,11 @@
+import time
+_T0 = time.perf_counter() # Referencia del arranque (antes de importar SDL)
+
 import sys
 import os
 import platform
 import ctypes
+from startup import StartupTimer
 import config
 
 
@@ -23,63 +27,19 @@ if hasattr(sys, '_MEIPASS') and profile_config.get("FIX_SDL2_PATH", False):
 
 
 import sdl2
-import sdl2.ext
-import sdl2.sdlimage as img
 import sdl2.sdlmixer as mix
 import sdl2.sdlttf as ttf
 
-from player import MusicPlayer, draw_button
+from player import MusicPlayer
 from input_handler import InputHandler
 from playlist import PlaylistScreen
-from server import start_servers
-
-def load_texture(renderer, path):
-    if not os.path.exists(path):
-        print(f"Error: Archivo no encontrado {path}")
-        return None
-        
-    # Cargar superficie
-    surface = img.IMG_Load(path.encode('utf-8'))
-    if not surface:
-        print(f"Error cargando imagen {path}: {img.IMG_GetError()}")
-        return None
-        
-    # Crear textura
-    texture = sdl2.SDL_CreateTextureFromSurface(renderer, surface)
-    sdl2.SDL_FreeSurface(surface)
-    
-    if not texture:
-        print(f"Error creando textura para {path}: {sdl2.SDL_GetError()}")
-        return None
-        
-    return texture
-
-def render_text(renderer, font, text, color, x, y, centered=False):
-    if not font:
-        return
-        
-    if not text:
-        return
-
-    surface = ttf.TTF_RenderUTF8_Blended(font, text.encode('utf-8'), color)
-    if not surface:
-        return
-        
-    texture = sdl2.SDL_CreateTextureFromSurface(renderer, surface)
-    
-    # Obtener dimensiones
-    w = surface.contents.w
-    h = surface.contents.h
-    
-    sdl2.SDL_FreeSurface(surface)
-    
-    dest_rect = sdl2.SDL_Rect(x, y, w, h)
-    
-    if centered:
-        dest_rect.x = x - (w // 2)
-        
-    sdl2.SDL_RenderCopy(renderer, texture, None, ctypes.byref(dest_rect))
-    sdl2.SDL_DestroyTexture(texture)
+from player_screen import PlayerScreen
+from render_state import DamageTracker, SceneTarget
+from profiler import FrameProfiler, format_report
+from scheduler import TimerScheduler, FramePacer
+from remote import RemoteControl, RemoteError, player_state
+from session import SessionStore, capture, session_key
+# server (pyftpdlib, asyncio) se importa después del primer frame
 
 def _screen_power(on):
     """Enciende o apaga la pantalla física en Linux (consola r36t)."""
@@ -128,76 +88,219 @@ def _screen_power(on):
     except Exception as e:
         print(f"Error controlando pantalla: {e}")
 
+def _draw_profiler_overlay(renderer, lines):
+    """Overlay de tiempos por frame en la esquina superior izquierda."""
+    x, y, w, h = PROFILER_OVERLAY_RECT
+    sdl2.SDL_SetRenderDrawBlendMode(renderer, sdl2.SDL_BLENDMODE_BLEND)
+    sdl2.SDL_SetRenderDrawColor(renderer, 0, 0, 0, 180)
+    sdl2.SDL_RenderFillRect(renderer, sdl2.SDL_Rect(x, y, w, h))
+    sdl2.SDL_SetRenderDrawBlendMode(renderer, sdl2.SDL_BLENDMODE_NONE)
+    for i, line in enumerate(lines):
+        config.TEXT_CACHE.draw(config.FONT_SMALL, line, config.WHITE, x + 6, y + 4 + i * 22)
+
+PROFILER_OVERLAY_RECT = (0, 0, 700, 96)
+PROFILER_OVERLAY_REFRESH_MS = 250 # Refresco del texto (evita una textura nueva por frame)
+STATS_REFRESH_MS = 1000 # Cada cuánto el bucle publica el snapshot de 'stats' (como mucho)
+
+IDLE_MAX_WAIT_MS = 1000 # Despertar como mucho una vez por segundo sin plazos
+
+# FPS máximos de las animaciones por vista: (con interacción, en reposo).
+# PARASYTE_FPS="60,20" fija los mismos para todas las vistas.
+VIEW_FPS = {"player": (60, 20), "playlist": (60, 30)}
+
+def _view_fps():
+    value = os.environ.get("PARASYTE_FPS")
+    if not value:
+        return VIEW_FPS
+    try:
+        active, idle = (max(1, int(v)) for v in value.split(","))
+    except ValueError:
+        print(f"PARASYTE_FPS no válido ({value}), se usa {VIEW_FPS}")
+        return VIEW_FPS
+    return {view: (active, idle) for view in VIEW_FPS}
+
+def _wait_events(timeout_ms):
+    """Duerme hasta el primer evento (o timeout) y devuelve todos los pendientes."""
+    events = []
+    event = sdl2.SDL_Event()
+    if sdl2.SDL_WaitEventTimeout(ctypes.byref(event), int(timeout_ms)) == 0:
+        return events
+    events.append(event)
+    event = sdl2.SDL_Event()
+    while sdl2.SDL_PollEvent(ctypes.byref(event)) != 0:
+        events.append(event)
+        event = sdl2.SDL_Event()
+    return events
+
+def _start_servers(remote, player):
+    """FTP, Telnet y el socket JSON opcional (después del primer frame)."""
+    from server import start_servers, RemoteJSONServer
+
+    ftp_server, telnet_server = start_servers(remote=remote)
+    # Subidas por FTP (e inotify) -> índice, browser y playlist, sin re-escanear
+    if ftp_server:
+        ftp_server.changes = player.changes
+    remote_server = None
+    if os.environ.get("PARASYTE_REMOTE_PORT"):
+        remote_server = RemoteJSONServer(remote, int(os.environ["PARASYTE_REMOTE_PORT"]))
+        remote_server.start()
+    return ftp_server, telnet_server, remote_server
+
 def main():
+    # Arranque en dos tramos: lo imprescindible para el primer frame y, una
+    # vez presentado, el arranque del player, la playlist, la biblioteca y los servidores
+    startup = StartupTimer(_T0)
+    startup.mark('imports')
+
     # Inicializar SDL2 via config
     window, renderer = config.init_sdl2()
     if not window or not renderer:
         print("Fallo crítico inicializando SDL2. Saliendo.")
         return
+    startup.mark('sdl')
+
+    # Control remoto: telnet (y el socket JSON opcional) encolan comandos que
+    # se ejecutan en este hilo, al principio del frame siguiente
+    remote = RemoteControl()
 
-    # Iniciar servidores (FTP y Telnet)
-    ftp_server, telnet_server = start_servers()
+    # SDL activa la entrada de texto por defecto: solo se usa en el filtro de la playlist
+    sdl2.SDL_StopTextInput()
 
-    player = MusicPlayer()
+    player = MusicPlayer() # Solo estado en memoria: volumen, índice y listado van en start()
     input_handler = InputHandler(player)
-    playlist_screen = PlaylistScreen(renderer, player)
+    startup.mark('player')
     
     current_view = "player" # player | playlist
     
-    # Cargar música automáticamente
-    player.load_music()
-    
-    # Cargar assets (Texturas)
-    background_tex = None
-    album_cover_tex = None
-    btn_prev_tex = None
-    btn_play_tex = None
-    btn_next_tex = None
-    
-    bg_path = os.path.join(config.ASSETS_DIR, 'bk1.jpg')
-    cover_path = os.path.join(config.ASSETS_DIR, 'sl1.jpg')
-    
-    path_b = os.path.join(config.ASSETS_DIR, 'b.jpg')
-    path_p = os.path.join(config.ASSETS_DIR, 'p.jpg')
-    path_pause = os.path.join(config.ASSETS_DIR, 'pause.jpg')
-    path_f = os.path.join(config.ASSETS_DIR, 'f.jpg')
-    
-    background_tex = load_texture(renderer, bg_path)
-    album_cover_tex = load_texture(renderer, cover_path)
-    btn_prev_tex = load_texture(renderer, path_b)
-    btn_play_tex = load_texture(renderer, path_p)
-    btn_pause_tex = load_texture(renderer, path_pause)
-    btn_next_tex = load_texture(renderer, path_f)
-
-    # Definir áreas de botones
-    center_x = config.WIDTH // 2
-    y_pos = 610
-    spacing = 110
-    
-    btn_w, btn_h = config.BUTTON_SIZE
-    
-    rect_prev = (center_x - spacing - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
-    rect_play = (center_x - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
-    rect_next = (center_x + spacing - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
+    player_screen = PlayerScreen(renderer, player)
+
+    # Solo se redibuja cuando cambia algo (ver render_state.py)
+    damage = DamageTracker()
+    scene = SceneTarget(renderer)
+    startup.mark('player_screen')
+
+    # Primer frame: la vista del reproductor tal cual, antes de lo demás
+    damage.update('view', current_view)
+    damage.update('profiler', None)
+    player_screen.update(damage)
+    scene.begin(damage.dirty_rect())
+    player_screen.render()
+    scene.present()
+    damage.frame_done(rendered=True)
+    startup.mark('first_frame')
+    startup.first_frame()
+
+    # Volumen del sistema, índice SQLite y listado del directorio actual
+    player.start()
+    player.changes.on_change = remote.wake
+    startup.mark('player_start')
+
+    # Reanudar la sesión anterior (playlist, pista y posición) sin recorrer la biblioteca
+    session = SessionStore()
+    saved = session.load()
+    restored = saved is not None and player.restore_session(saved)
+    startup.mark('session')
+
+    playlist_screen = PlaylistScreen(renderer, player)
+    if restored:
+        playlist_screen.restore_position(saved['selected_index'], saved['scroll_offset'])
+    startup.mark('playlist_screen')
+
+    # Cargar música automáticamente (listado inicial + recorrido en segundo plano)
+    player.load_music(walk=not restored)
+    startup.mark('library')
+
+    ftp_server, telnet_server, remote_server = _start_servers(remote, player)
+    startup.mark('servers')
+    startup.report("Arranque completo")
+
+    # Profiler de frames: overlay con F3 (o PARASYTE_PROFILER=1) y 'stats' por telnet
+    profiler = FrameProfiler()
+    show_profiler = os.environ.get("PARASYTE_PROFILER") == "1"
+    profiler_lines = ()
+    profiler_refresh = 0
+
+    # Bucle por eventos: se duerme hasta el siguiente evento o plazo
+    scheduler = TimerScheduler()
+    pacer = FramePacer(_view_fps())
+
+    # 'stats' de telnet: el bucle arma las secciones (lee estructuras que solo
+    # toca este hilo) y publica la tupla nueva; el hilo de telnet solo la lee
+    published_stats = [None] # (secciones, tick en que se armaron)
+    stats_refresh = 0
+
+    def collect_stats():
+        """Secciones de 'stats' (hilo principal)."""
+        sections = {
+            'frame': profiler.snapshot(),
+            'damage': dict(damage.stats(), player_layer_rebuilds=player_screen.layer.rebuilds,
+                           playlist_layer_rebuilds=playlist_screen.layer.rebuilds),
+            'metadata': player.get_metadata_stats(),
+            'text_cache': config.TEXT_CACHE.stats(),
+            'covers': player_screen.covers.stats(),
+            'thumbnails': player_screen.thumbnails.stats(),
+            'scheduler': dict(scheduler.stats(sdl2.SDL_GetTicks()),
+                              target_fps=pacer.fps(current_view, sdl2.SDL_GetTicks())),
+            'remote': remote.stats(),
+            'library_changes': player.changes.stats(),
+            'startup': startup.stats(),
+            'session': session.stats(),
+        }
+        if ftp_server and ftp_server.running:
+            sections['ftp'] = ftp_server.stats()
+        gaps = list(player.transition_gaps)
+        if gaps:
+            sections['gapless'] = {'transitions': len(gaps), 'last_ms': gaps[-1], 'max_ms': max(gaps)}
+        return sections
+
+    def stats_report():
+        """Hilo de telnet: formatea el último snapshot publicado, sin tocar el bucle."""
+        snapshot = published_stats[0] # Como mucho ~2 s de antigüedad (el bucle despierta cada segundo)
+        if snapshot is None:
+            return "Stats not available yet."
+        sections, built_at = snapshot
+        return format_report(dict(sections, snapshot={'age_ms': sdl2.SDL_GetTicks() - built_at}))
+
+    if telnet_server:
+        telnet_server.stats_provider = stats_report
+
+    def handle_remote(cmd, args):
+        """Ejecuta un comando remoto (hilo principal) y devuelve el estado resultante."""
+        if cmd == 'play':
+            if not player.is_playing:
+                player.play_music()
+        elif cmd == 'pause':
+            player.pause_music()
+        elif cmd == 'toggle':
+            player.toggle_play_pause()
+        elif cmd == 'stop':
+            player.stop_music()
+        elif cmd == 'next':
+            player.next_track()
+            player_screen.highlight("next")
+        elif cmd == 'prev':
+            player.prev_track()
+            player_screen.highlight("prev")
+        elif cmd == 'seek':
+            value, relative = args
+            if relative:
+                position = player.get_position()
+                if position < 0:
+                    raise RemoteError("posición actual desconocida")
+                value += position
+            if not player.seek(value):
+                raise RemoteError("no se puede saltar en la pista actual")
+        elif cmd == 'volume':
+            value, relative = args
+            percent = player.volume_target + value if relative else value
+            player.set_volume(percent / 100.0)
+        elif cmd == 'enqueue':
+            player.enqueue(args)
+        return player_state(player)
 
     running = True
-    event = sdl2.SDL_Event()
-    
-    # Variables para marquee
-    marquee_offset = 0
-    marquee_direction = 1 # 1: Adelante, -1: Atrás
-    marquee_wait = 0 # Contador para pausas
-    last_track_name = ""
-    
-    # Textura de portada por defecto
-    default_cover_tex = album_cover_tex
-    current_cover_tex = default_cover_tex
+    last_session_key = session_key(player)
     
-    # Variables para animación de botones
-    btn_highlight_time = 0
-    btn_highlight_target = None # "prev" o "next"
-    manual_transition = False
-
     # Variables para pantalla negra (screensaver)
     last_input_time = sdl2.SDL_GetTicks()
     screensaver_active = False
@@ -207,8 +310,23 @@ def main():
     is_linux_arm64 = (platform.system() == "Linux" and platform.machine() in ("aarch64", "arm64", "armv7l"))
 
     while running:
+        timeout = scheduler.timeout(sdl2.SDL_GetTicks(), IDLE_MAX_WAIT_MS)
+        frame_ms = pacer.frame_ms(current_view, sdl2.SDL_GetTicks())
+        events = _wait_events(timeout)
+        scheduler.note_wakeup(sdl2.SDL_GetTicks(), by_event=bool(events))
+        scheduler.pop_due(sdl2.SDL_GetTicks())
+
+        # Solo los despertares a la cadencia de animación cuentan para FPS/perdidos
+        profiler.begin_frame(paced=timeout <= frame_ms + 1, budget_ms=frame_ms)
+        config.TEXT_CACHE.begin_frame()
+
         # Procesar eventos
-        while sdl2.SDL_PollEvent(ctypes.byref(event)) != 0:
+        for event in events:
+            if remote.is_wake_event(event):
+                continue # Solo despierta el bucle: la cola se vacía abajo
+            if player.is_music_finished_event(event):
+                player.handle_music_finished(event)
+                continue
             if event.type == sdl2.SDL_QUIT:
                 running = False
                 break
@@ -225,12 +343,21 @@ def main():
                     scale_y = new_h / config.HEIGHT
                     
                     sdl2.SDL_RenderSetScale(renderer, ctypes.c_float(scale_x), ctypes.c_float(scale_y))
+
+                # La ventana cambió o se expuso: su contenido ya no es válido
+                damage.mark_all()
+
+            elif event.type in (sdl2.SDL_RENDER_TARGETS_RESET, sdl2.SDL_RENDER_DEVICE_RESET):
+                damage.mark_all()
+                player_screen.layer.invalidate()
+                playlist_screen.layer.invalidate()
                 
             action = input_handler.handle_input(event)
 
             # Detectar cualquier input para el screensaver
             if event.type in (sdl2.SDL_KEYDOWN, sdl2.SDL_JOYBUTTONDOWN, sdl2.SDL_JOYHATMOTION, sdl2.SDL_MOUSEBUTTONDOWN):
                 last_input_time = sdl2.SDL_GetTicks()
+                pacer.note_input(last_input_time)
                 if screensaver_active:
                     screensaver_active = False
                     # Encender pantalla si estaba apagada
@@ -251,6 +378,30 @@ def main():
                     current_view = "player"
                     input_handler.set_mode("player")
                     print("Regresando a pantalla Player")
+            elif action == "TOGGLE_PROFILER":
+                show_profiler = not show_profiler
+                profiler_refresh = 0
+
+            # Filtro incremental de la playlist
+            elif action in ("FILTER_OPEN", "NAV_LEFT"):
+                if current_view == "playlist":
+                    playlist_screen.open_filter()
+                    input_handler.set_mode("filter")
+                    sdl2.SDL_StartTextInput()
+            elif action == "FILTER_CLOSE":
+                playlist_screen.close_filter()
+                input_handler.set_mode("playlist")
+                sdl2.SDL_StopTextInput()
+            elif action == "FILTER_TEXT":
+                playlist_screen.filter_append(input_handler.text)
+            elif action == "FILTER_BACKSPACE":
+                playlist_screen.filter_backspace()
+            elif action == "FILTER_PICK_PREV":
+                playlist_screen.picker_move(-1)
+            elif action == "FILTER_PICK_NEXT":
+                playlist_screen.picker_move(1)
+            elif action == "FILTER_PICK_ADD":
+                playlist_screen.picker_add()
             
             # Navegación en Playlist
             elif action == "NAV_UP":
@@ -262,17 +413,29 @@ def main():
             elif action == "PLAY_DIR":
                 if current_view == "playlist":
                     # Reproducir todo el directorio actual
-                    files = [item['path'] for item in player.browser_items if item['type'] == 'file']
+                    files = player.browser_items.file_paths()
                     if files:
-                        player.stop_music()
-                        player.playlist = files
-                        player.current_track_index = 0
-                        player.play_music()
+                        player.play_from_directory()
                         current_view = "player"
                         input_handler.set_mode("player")
+            elif action == "PLAY_TREE":
+                if current_view == "playlist":
+                    # Reproducir recursivamente el directorio actual (o la carpeta seleccionada)
+                    item = playlist_screen.get_selected_item()
+                    root = player.current_path
+                    if item and item['type'] == 'dir' and item['name'] != '..':
+                        root = item['path']
+                    player.play_tree(root)
+                    current_view = "player"
+                    input_handler.set_mode("player")
             elif action == "SELECT_ITEM":
                 if current_view == "playlist":
                     item = playlist_screen.get_selected_item()
+                    if input_handler.mode == "filter":
+                        # Elegir un resultado cierra el filtro
+                        playlist_screen.close_filter()
+                        input_handler.set_mode("playlist")
+                        sdl2.SDL_StopTextInput()
                     if item:
                         if item['type'] == 'dir':
                             player.current_path = item['path']
@@ -281,7 +444,7 @@ def main():
                         elif item['type'] == 'file':
                             # Reproducir archivo seleccionado pero cargando todo el contexto del directorio
                             # para permitir navegación (Next/Prev)
-                            files = [i['path'] for i in player.browser_items if i['type'] == 'file']
+                            files = player.browser_items.file_paths()
                             
                             target_path = item['path']
                             start_index = 0
@@ -289,6 +452,7 @@ def main():
                             if target_path in files:
                                 start_index = files.index(target_path)
                             
+                            player.cancel_tree()
                             player.stop_music()
                             player.playlist = files
                             player.current_track_index = start_index
@@ -312,41 +476,40 @@ def main():
             # O mejor: InputHandler devuelve "NEXT_TRACK" / "PREV_TRACK"
             
             if action == "NEXT_TRACK":
-                 btn_highlight_target = "next"
-                 btn_highlight_time = 1 # ~16ms (1 frame), closest to 4ms
-                 manual_transition = True
+                 player_screen.highlight("next")
             elif action == "PREV_TRACK":
-                 btn_highlight_target = "prev"
-                 btn_highlight_time = 1 # ~16ms
-                 manual_transition = True
+                 player_screen.highlight("prev")
             
             # Clics del mouse para botones en pantalla (solo en vista player)
             if current_view == "player" and event.type == sdl2.SDL_MOUSEBUTTONDOWN:
                 if event.button.button == sdl2.SDL_BUTTON_LEFT:
-                    x, y = event.button.x, event.button.y
-                    pt = sdl2.SDL_Point(x, y)
+                    button = player_screen.button_at(event.button.x, event.button.y)
                     
                     # Chequear botones
-                    r_play = sdl2.SDL_Rect(*rect_play)
-                    if sdl2.SDL_PointInRect(pt, r_play):
+                    if button == "play":
                         player.toggle_play_pause()
-                        
-                    r_prev = sdl2.SDL_Rect(*rect_prev)
-                    if sdl2.SDL_PointInRect(pt, r_prev):
+                    elif button == "prev":
                         player.prev_track()
-                        btn_highlight_target = "prev"
-                        btn_highlight_time = 1 # ~16ms
-                        manual_transition = True
-                        
-                    r_next = sdl2.SDL_Rect(*rect_next)
-                    if sdl2.SDL_PointInRect(pt, r_next):
+                        player_screen.highlight("prev")
+                    elif button == "next":
                         player.next_track()
-                        btn_highlight_target = "next"
-                        btn_highlight_time = 1 # ~16ms
-                        manual_transition = True
+                        player_screen.highlight("next")
+
+        remote.process(handle_remote)
+        profiler.mark('events')
 
         # Renderizado
         player.update()
+        remote.publish(player_state(player))
+        if player.is_playing and startup.first_audio_ms is None:
+            startup.first_audio()
+        # Sesión: se guarda al pausar, cambiar de pista, de playlist o de carpeta
+        key = session_key(player)
+        if key != last_session_key and not player.is_loading_tree():
+            last_session_key = key
+            session.save(capture(player, playlist_screen))
+        if ftp_server:
+            ftp_server.set_playing(player.is_playing)
 
         # Verificar timeout de screensaver
         current_ticks = sdl2.SDL_GetTicks()
@@ -360,215 +523,96 @@ def main():
             _screen_power(False)
             screen_off = True
 
-        sdl2.SDL_SetRenderDrawColor(renderer, 0, 0, 0, 255)
-        sdl2.SDL_RenderClear(renderer)
-
+        # Estado del frame: cada vista registra sus entradas y marca lo que cambió
+        damage.update('view', "screensaver" if screensaver_active else current_view)
         if screensaver_active:
-            # Pantalla negra - solo renderizar negro y presentar
-            sdl2.SDL_RenderPresent(renderer)
-            sdl2.SDL_Delay(16)
-            continue
-
-        if current_view == "player":
-            # Fondo
-            if background_tex:
-                sdl2.SDL_RenderCopy(renderer, background_tex, None, None)
-            else:
-                sdl2.SDL_SetRenderDrawColor(renderer, 30, 30, 30, 255)
-                sdl2.SDL_RenderClear(renderer)
-                
-            # Información de la canción
-            track_name = player.get_current_track_name() or "No hay musica seleccionada"
-            
-            # Actualizar portada y marquee si cambia la canción
-            if track_name != last_track_name:
-                # Si no hubo acción manual reciente (manual_transition is False), asumir auto-advance (Next)
-                if not manual_transition:
-                    btn_highlight_target = "next"
-                    btn_highlight_time = 1 # ~16ms
-                
-                # Resetear flag manual
-                manual_transition = False
-
-                last_track_name = track_name
-                marquee_offset = 0
-                marquee_direction = 1
-                marquee_wait = 60 # Espera inicial
-                
-                # Intentar cargar portada del MP3
-                cover_data = player.get_current_track_cover()
-                if cover_data:
-                    # Crear RWops desde memoria
-                    rw = sdl2.SDL_RWFromConstMem(cover_data, len(cover_data))
-                    surface = img.IMG_Load_RW(rw, 1) # 1 = auto-close RWops
-                    if surface:
-                        if current_cover_tex and current_cover_tex != default_cover_tex:
-                            sdl2.SDL_DestroyTexture(current_cover_tex)
-                        current_cover_tex = sdl2.SDL_CreateTextureFromSurface(renderer, surface)
-                        sdl2.SDL_FreeSurface(surface)
-                    else:
-                        current_cover_tex = default_cover_tex
-                else:
-                    # Volver a default si no hay cover
-                    if current_cover_tex and current_cover_tex != default_cover_tex:
-                         sdl2.SDL_DestroyTexture(current_cover_tex)
-                    current_cover_tex = default_cover_tex
-
-            # Portada del álbum
-            if current_cover_tex:
-                cover_rect = sdl2.SDL_Rect(config.WIDTH // 2 - 180, 30, 360, 360)
-                
-                # Marco
-                border_width = 10
-                border_rect = sdl2.SDL_Rect(
-                    cover_rect.x - border_width,
-                    cover_rect.y - border_width,
-                    cover_rect.w + (border_width * 2),
-                    cover_rect.h + (border_width * 2)
-                )
-                
-                # Color del marco #17031D -> R=23, G=3, B=29
-                sdl2.SDL_SetRenderDrawColor(renderer, 23, 3, 29, 255)
-                sdl2.SDL_RenderFillRect(renderer, ctypes.byref(border_rect))
-                
-                sdl2.SDL_RenderCopy(renderer, current_cover_tex, None, ctypes.byref(cover_rect))
-            else:
-                # Placeholder portada
-                rect = sdl2.SDL_Rect(config.WIDTH // 2 - 150, 70, 300, 300)
-                sdl2.SDL_SetRenderDrawColor(renderer, 100, 100, 100, 255)
-                sdl2.SDL_RenderFillRect(renderer, ctypes.byref(rect))
-            
-            
-            max_width = int(config.WIDTH * 0.8)
-            text_x = config.WIDTH // 2
-
-            text_y = 420
-            
-            # Medir ancho del texto
-            if config.FONT_MEDIUM:
-                w_ptr = ctypes.c_int()
-                h_ptr = ctypes.c_int()
-                ttf.TTF_SizeUTF8(config.FONT_MEDIUM, track_name.encode('utf-8'), ctypes.byref(w_ptr), ctypes.byref(h_ptr))
-                text_w = w_ptr.value
-                
-                if text_w > max_width:
-                    # Cálculo del overflow (cuánto sobra)
-                    overflow = text_w - max_width
-                    
-                    # Lógica de Ping-Pong
-                    if marquee_wait > 0:
-                        marquee_wait -= 1
-                    else:
-                        marquee_offset += marquee_direction
-                        
-                        # Si llegamos al final (texto desplazado a la izquierda)
-                        if marquee_offset >= overflow:
-                            marquee_offset = overflow
-                            marquee_direction = -1
-                            marquee_wait = 60 # Esperar 1 segundo antes de regresar
-                        
-                        # Si regresamos al inicio
-                        elif marquee_offset <= 0:
-                            marquee_offset = 0
-                            marquee_direction = 1
-                            marquee_wait = 60 # Esperar 1 segundo antes de avanzar
-                            
-                    # Renderizado con Clip
-                    # El texto se dibuja en start_visible - marquee_offset
-                    # marquee_offset va de 0 a overflow
-                    
-                    start_visible = (config.WIDTH - max_width) // 2
-                    draw_x = start_visible - marquee_offset
-                    
-                    # Definir clip rect
-                    clip_rect = sdl2.SDL_Rect(start_visible, text_y, max_width, h_ptr.value)
-                    sdl2.SDL_RenderSetClipRect(renderer, ctypes.byref(clip_rect))
-                    
-                    render_text(renderer, config.FONT_MEDIUM, track_name, config.WHITE, draw_x, text_y, centered=False)
-                    
-                    sdl2.SDL_RenderSetClipRect(renderer, None) # Quitar clip
-                    
-                else:
-                    # Renderizado normal centrado
-                    marquee_offset = 0
-                    render_text(renderer, config.FONT_MEDIUM, track_name, config.WHITE, text_x, text_y, centered=True)
-            
-            status_text = player.get_status_text()
-            volume_text = f"Volumen: {int(player.get_volume() * 100)}%"
-            
-            render_text(renderer, config.FONT_SMALL, status_text, config.GRAY, config.WIDTH // 2, 470, centered=True)
-            render_text(renderer, config.FONT_SMALL, volume_text, config.GRAY, config.WIDTH // 2, 510, centered=True)
-            
-            # Botones
-            
-            # Highlight PREV
-            if btn_highlight_target == "prev":
-                 highlight_rect = sdl2.SDL_Rect(
-                    rect_prev[0] - 6,
-                    rect_prev[1] - 6,
-                    rect_prev[2] + 12,
-                    rect_prev[3] + 12
-                 )
-                 sdl2.SDL_SetRenderDrawColor(renderer, 248, 187, 68, 255) # F8BB44
-                 sdl2.SDL_RenderFillRect(renderer, ctypes.byref(highlight_rect))
-
-            draw_button(renderer, rect_prev, btn_prev_tex)
-            
-            # Decidir qué textura usar para el botón Play/Pause
-            current_play_tex = btn_play_tex
-            if player.is_playing:
-                current_play_tex = btn_pause_tex
-            
-            draw_button(renderer, rect_play, current_play_tex)
-            
-            # Highlight NEXT
-            if btn_highlight_target == "next":
-                 highlight_rect = sdl2.SDL_Rect(
-                    rect_next[0] - 6,
-                    rect_next[1] - 6,
-                    rect_next[2] + 12,
-                    rect_next[3] + 12
-                 )
-                 sdl2.SDL_SetRenderDrawColor(renderer, 248, 187, 68, 255) # F8BB44
-                 sdl2.SDL_RenderFillRect(renderer, ctypes.byref(highlight_rect))
-
-            draw_button(renderer, rect_next, btn_next_tex)
-            
-            # Instrucciones
-            #render_text(renderer, config.FONT_SMALL, "Controles: Espacio (Play/Pause) | Flechas (Navegar/Volumen)", config.LIGHT_GRAY, config.WIDTH // 2, 650, centered=True)
-        
+            pass
+        elif current_view == "player":
+            player_screen.update(damage)
         elif current_view == "playlist":
-            playlist_screen.render()
-
-        sdl2.SDL_RenderPresent(renderer)
-        
-        # Decrementar tiempo de highlight (al final del frame para que sea visible al menos 1 frame)
-        if btn_highlight_time > 0:
-            btn_highlight_time -= 1
+            playlist_screen.update(damage)
+
+        if show_profiler and not screensaver_active:
+            if current_ticks >= profiler_refresh:
+                profiler_lines = tuple(profiler.overlay_lines()) + (
+                    f"Despertares {scheduler.wakeups_per_second(current_ticks):.1f}/s",)
+                profiler_refresh = current_ticks + PROFILER_OVERLAY_REFRESH_MS
+            damage.update('profiler', profiler_lines, PROFILER_OVERLAY_RECT)
         else:
-            btn_highlight_target = None
-            
-        sdl2.SDL_Delay(16) # ~60 FPS cap
+            damage.update('profiler', None)
+        profiler.add('cover', player_screen.last_cover_ms if current_view == "player" else 0.0)
+        profiler.mark('update')
+
+        if damage.is_dirty():
+            scene.begin(damage.dirty_rect())
+
+            if screensaver_active:
+                # Pantalla negra: basta con el clear de begin()
+                pass
+            elif current_view == "player":
+                player_screen.render()
+            elif current_view == "playlist":
+                playlist_screen.render()
+
+            if show_profiler and not screensaver_active:
+                _draw_profiler_overlay(renderer, profiler_lines)
+            profiler.mark('render')
+
+            scene.present()
+            profiler.mark('present')
+            damage.frame_done(rendered=True)
+            pacer.note_frame(sdl2.SDL_GetTicks())
+        else:
+            # Nada cambió: ni RenderClear ni RenderPresent
+            damage.frame_done(rendered=False)
+        
+        profiler.add('text', config.TEXT_CACHE.frame_render_ms)
+        profiler.end_frame()
+
+        # Plazos del siguiente despertar
+        now = sdl2.SDL_GetTicks()
+        animating = not screensaver_active
+        scheduler.schedule('player', player.next_deadline(now))
+        view_deadline = (player_screen.next_deadline() if current_view == "player"
+                         else playlist_screen.next_deadline()) if animating else None
+        scheduler.schedule('view', pacer.pace(current_view, now, view_deadline))
+        scheduler.schedule('profiler', profiler_refresh if show_profiler and animating else None)
+        scheduler.schedule('screensaver', None if screensaver_active else last_input_time + SCREENSAVER_TIMEOUT)
+        scheduler.schedule('screen_off', last_input_time + SCREEN_OFF_TIMEOUT
+                           if is_linux_arm64 and not screen_off else None)
+
+        # Snapshot de 'stats' para telnet (sin despertares propios: va con los frames)
+        if telnet_server and now >= stats_refresh:
+            published_stats[0] = (collect_stats(), now)
+            stats_refresh = now + STATS_REFRESH_MS
 
     # Limpieza
     # Asegurar que la pantalla quede encendida al salir
     if screen_off and is_linux_arm64:
         _screen_power(True)
-    
+
+    session.flush(capture(player, playlist_screen))
     player.stop_music()
     
     # Detener servidores
     if ftp_server: ftp_server.stop()
     if telnet_server: telnet_server.stop()
+    if remote_server: remote_server.stop()
     
     input_handler.cleanup()
     playlist_screen.cleanup()
+    player_screen.cleanup()
+    player.cleanup()
     
-    if background_tex: sdl2.SDL_DestroyTexture(background_tex)
-    if album_cover_tex: sdl2.SDL_DestroyTexture(album_cover_tex)
-    if btn_prev_tex: sdl2.SDL_DestroyTexture(btn_prev_tex)
-    if btn_play_tex: sdl2.SDL_DestroyTexture(btn_play_tex)
-    if btn_next_tex: sdl2.SDL_DestroyTexture(btn_next_tex)
+    scene.cleanup()
+    config.TEXT_CACHE.cleanup()
+
+    stats = damage.stats()
+    print(f"Frames renderizados: {stats['frames_rendered']}, saltados: {stats['frames_skipped']}")
+    frame = profiler.snapshot()
+    print(f"Frame p50/p95/p99: {frame['p50_ms']:.2f}/{frame['p95_ms']:.2f}/{frame['p99_ms']:.2f} ms, perdidos: {frame['dropped']}")
+    wake = scheduler.stats(sdl2.SDL_GetTicks())
+    print(f"Despertares: {wake['wakeups']} ({wake['event_wakeups']} por evento), {wake['wakeups_per_sec']:.1f}/s en los últimos 10 s")
     
     sdl2.SDL_DestroyRenderer(renderer)
     sdl2.SDL_DestroyWindow(window)
@@ -1,102 +1,348 @@
 import os
 import sys
-import glob
+import time
 import ctypes
+import hashlib
+import threading
+from collections import OrderedDict, deque
 import sdl2
 import sdl2.sdlmixer as mix
 from volume_control import VolumeControl
-from mutagen.mp3 import MP3
-from mutagen.easyid3 import EasyID3
+from library_index import LibraryIndex, TrackMetadata
+from scanner import DirectoryScanner, TreeWalker, scan_names
+from browser_listing import BrowserListing, KIND_DIR, KIND_FILE
+from library_watch import LibraryChanges
+from gapless import read_gapless_info, trim_points
+
+# Volumen: como mucho una escritura al mixer del sistema por intervalo, y
+# rampa de la ganancia de SDL_mixer para evitar saltos bruscos
+VOLUME_WRITE_INTERVAL = 0.15 # s
+VOLUME_RAMP = 0.06           # s
+VOLUME_SYNC_HOLD = 3.0       # s tras un cambio propio sin adoptar lecturas del sistema (amixer cachea 2 s)
+
+# Plazos de update() para el bucle por eventos (ms)
+SCAN_POLL_MS = 50     # Títulos del escáner pendientes de aplicar
+TRACK_POLL_MS = 250   # Fin de pista cuando no se conoce la duración
+TRACK_MAX_WAIT_MS = 1000
+
+# Rutas del recorrido recursivo que se añaden a la playlist por update()
+WALK_BATCH = 500
+
+
+def read_track_metadata(path, st=None):
+    """Lee los tags de un MP3 con un único parseo de mutagen."""
+    # mutagen se importa al leer el primer tag (desde el escáner), no al arrancar
+    from mutagen.mp3 import MP3
+    if st is None:
+        st = os.stat(path)
+
+    title = artist = album = None
+    duration = 0.0
+    has_cover = False
+    cover_offset = -1
+    cover_size = 0
+    cover_hash = None
+    try:
+        audio = MP3(path)
+        if audio.info:
+            duration = float(audio.info.length)
+        tags = audio.tags
+        if tags:
+            if 'TIT2' in tags and tags['TIT2'].text:
+                title = str(tags['TIT2'].text[0])
+            if 'TPE1' in tags and tags['TPE1'].text:
+                artist = str(tags['TPE1'].text[0])
+            if 'TALB' in tags and tags['TALB'].text:
+                album = str(tags['TALB'].text[0])
+            pictures = tags.getall('APIC')
+            if pictures:
+                has_cover = True
+                data = pictures[0].data
+                cover_size = len(data)
+                cover_hash = hashlib.sha1(data).hexdigest()
+                cover_offset = _find_cover_offset(path, data, getattr(tags, 'size', 0))
+    except Exception:
+        pass
+
+    return TrackMetadata(path, st.st_mtime_ns, st.st_size,
+                         title or os.path.basename(path), artist, album,
+                         duration, has_cover, cover_offset, cover_size, cover_hash)
+
+
+def _find_cover_offset(path, data, tag_size):
+    """
+    Posición de los bytes de la portada dentro del archivo (-1 si no se
+    encuentra, p.ej. con tags unsynchronised). Permite leer la portada
+    luego con un seek() sin volver a parsear el ID3.
+    """
+    if tag_size <= 0:
+        return -1
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read(tag_size)
+        offset = raw.find(data[:64])
+        if offset >= 0 and raw[offset:offset + len(data)] == data:
+            return offset
+    except OSError:
+        pass
+    return -1
+
+
+def read_cover_bytes(meta):
+    """Lee la portada usando el offset indexado; si no hay offset, parsea el ID3."""
+    if not meta or not meta.has_cover:
+        return None
+    if meta.cover_offset >= 0 and meta.cover_size > 0:
+        try:
+            with open(meta.path, 'rb') as f:
+                f.seek(meta.cover_offset)
+                data = f.read(meta.cover_size)
+            if len(data) == meta.cover_size:
+                return data
+        except OSError:
+            pass
+    from mutagen.id3 import ID3
+    try:
+        # Solo leer el tag ID3 (no hace falta escanear frames de audio)
+        tags = ID3(meta.path)
+        # Buscar tags APIC (Attached Picture)
+        for tag in tags.getall('APIC'):
+            return tag.data
+    except Exception:
+        pass
+    return None
+
+
+class MetadataCache:
+    """
+    Caché LRU de metadatos por ruta.
+    Una entrada se invalida cuando cambia el mtime o el tamaño del archivo.
+    Para no hacer stat() en cada frame, una entrada validada recientemente
+    (menos de revalidate_interval segundos) se devuelve directamente.
+    Si se pasa un LibraryIndex, se consulta antes de parsear el archivo.
+    """
+    def __init__(self, max_entries=2048, revalidate_interval=2.0, index=None):
+        self.index = index
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self._entries = OrderedDict() # path -> (TrackMetadata, checked_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and now - entry[1] < self.revalidate_interval:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0].mtime == st.st_mtime_ns and entry[0].size == st.st_size:
+                self._entries[path] = (entry[0], now)
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Consultar el índice y, si no sirve, parsear fuera del lock (puede tardar en la SD)
+        meta = self.index.lookup(path, st) if self.index else None
+        if meta is None:
+            meta = read_track_metadata(path, st)
+            if self.index:
+                self.index.store(meta)
+
+        with self._lock:
+            self._entries[path] = (meta, now)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return meta
+
+    def invalidate(self, path):
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
+
 
 class MusicPlayer:
+    """
+    El constructor solo prepara estado en memoria, lo justo para dibujar el
+    primer frame; start() hace el resto (volumen del sistema, índice SQLite,
+    listado del directorio) y main.py lo llama después de presentarlo.
+    """
     def __init__(self):
         self.playlist = []
         self.current_track_index = 0
         self.is_paused = False
         self.is_playing = False
+        self.volume_control = None # Se abre en start()
+        self.volume = 0
+
+        # Tubería de volumen: objetivo inmediato (en pantalla), escritura al
+        # sistema agrupada y rampa de ganancia aplicada en update()
+        self.volume_target = None        # 0-100 (None hasta leer el del sistema en start())
+        self._volume_pending = False     # Hay un objetivo sin escribir al sistema
+        self._volume_last_write = 0.0
+        self._ramp = None                # (inicio, ganancia inicial, ganancia final)
+        self.current_music = None
+        self.repeat_mode = 0 # 0: No repeat, 1: Repeat all, 2: Repeat one
+
+        # Precarga de la siguiente pista (reproducción sin huecos)
+        self._preload = None         # (path, Mix_Music, GaplessInfo) listo para usar
+        self._preload_gen = 0
+        self._preload_lock = threading.Lock()
+        self._preload_cond = threading.Condition(self._preload_lock)
+        self._preload_discard = []   # Mix_Music obsoletos (se liberan en el hilo principal)
+        self._preload_request = None # (path, gen) pendiente para el hilo de precarga
+        self._preload_running = True
+        self._preload_thread = None  # Un único hilo de precarga, se crea con la primera
+        self._trim_end = None        # Posición (s) donde termina el audio útil, si hay que recortar
+        self._end_detected = None    # perf_counter al detectar el fin de pista
+        self._resume_at = None       # (path, s) de una sesión restaurada, se aplica al reproducir
+
+        # Fin de pista: SDL_mixer llama al hook desde su hilo de audio y este
+        # solo publica un evento SDL; el bucle principal avanza de pista al
+        # recibirlo, sin sondear Mix_PlayingMusic() en cada frame
+        self._music_gen = 0          # Sube con cada pista iniciada: descarta avisos de pistas anteriores
+        self._halting = False        # Mix_HaltMusic intencionado: el hook no avisa
+        self._finished_at = None     # perf_counter del último aviso del hook
+        self._music_finished_cb = None
+        self.finished_event_type = sdl2.SDL_RegisterEvents(1)
+        if self.finished_event_type == 0xFFFFFFFF:
+            self.finished_event_type = None
+            print("Sin eventos de usuario libres: el fin de pista se detecta por sondeo")
+        else:
+            # Guardar la referencia: si el CFUNCTYPE se recolectara, SDL llamaría a memoria liberada
+            self._music_finished_cb = mix.music_finished(self._music_finished_hook)
+            mix.Mix_HookMusicFinished(self._music_finished_cb)
+        self.transition_gaps = deque(maxlen=50) # ms entre fin de pista e inicio de la siguiente
+
+        # Playlist recursiva en streaming (ver enqueue_tree)
+        self._walker = None
+        self._walker_autoplay = False
+
+        # Caché de metadatos en memoria (evita parsear el MP3 en cada frame y en
+        # cada visita a un directorio); el índice persistente se le une en start()
+        self.library = None
+        self.metadata = MetadataCache()
+        self.scanner = None
+        self.changes = None
+
+        # Explorador de archivos
+        self.current_path = os.getcwd()
+        self.browser_items = BrowserListing(self.current_path)
+        self.browser_version = 0 # Se incrementa cuando cambia el contenido del browser
+
+    def start(self):
+        """Arranque diferido: lo que no hace falta para el primer frame."""
         self.volume_control = VolumeControl()
         initial_vol = self.volume_control.get_volume()
         if initial_vol == 0:
             initial_vol = 40
             self.volume_control.set_volume(initial_vol)
         self.volume = initial_vol / 100.0 * 128 # Sincronizar inicial
-        self.current_music = None
-        self.repeat_mode = 0 # 0: No repeat, 1: Repeat all, 2: Repeat one
-        
-        # Explorador de archivos
-        self.current_path = os.getcwd()
-        self.browser_items = []
+        self.volume_target = initial_vol
+
+        # Índice persistente de la biblioteca detrás de la caché de metadatos
+        self.library = LibraryIndex(extractor=read_track_metadata)
+        self.metadata.index = self.library
+        # Resolución de títulos del browser en segundo plano
+        self.scanner = DirectoryScanner(self.metadata, self.library)
+        # Cambios incrementales de la biblioteca (subidas por FTP, inotify)
+        self.changes = LibraryChanges(self.library, self.metadata)
         self.update_browser_items()
 
     def update_browser_items(self):
-        self.browser_items = []
+        self.browser_version += 1
+        parent = os.path.dirname(self.current_path)
+        # Opción para subir de directorio si no estamos en la raíz
+        listing = BrowserListing(self.current_path, parent if parent and parent != self.current_path else None)
+        self.browser_items = listing
         try:
-            # Listar todo el contenido
-            items = os.listdir(self.current_path)
-            
-            # Separar en carpetas y archivos
-            dirs = []
-            files = []
-            
-            for item in items:
-                full_path = os.path.join(self.current_path, item)
-                if os.path.isdir(full_path):
-                    dirs.append(item)
-                elif item.lower().endswith('.mp3'):
-                    files.append(item)
-            
-            # Ordenar alfabéticamente cada lista
-            dirs.sort()
-            files.sort()
-            
-            # Opción para subir de directorio si no estamos en la raíz
-            parent = os.path.dirname(self.current_path)
-            if parent and parent != self.current_path:
-                self.browser_items.append({
-                    'name': '..',
-                    'type': 'dir',
-                    'path': parent
-                })
+            # Si el índice está al día, el listado ya trae los títulos
+            cached = self.library.cached_listing(self.current_path)
+            if cached is not None:
+                dirs, files = cached
+                names = [os.path.basename(meta.path) for meta in files]
+                titles = [meta.title for meta in files]
+                self.scanner.cancel()
+            else:
+                # Fase 1: solo nombres (os.scandir) para poder dibujar ya
+                dirs, names = scan_names(self.current_path)
+                titles = None
 
             # Agregar carpetas primero
             for item in dirs:
-                full_path = os.path.join(self.current_path, item)
-                self.browser_items.append({
-                    'name': item,
-                    'type': 'dir',
-                    'path': full_path
-                })
+                listing.add(item, KIND_DIR)
                 
             # Agregar archivos después
-            for item in files:
-                full_path = os.path.join(self.current_path, item)
-                
-                display_name = item
-                try:
-                    audio = MP3(full_path, ID3=EasyID3)
-                    if 'title' in audio:
-                        display_name = audio['title'][0]
-                except:
-                    pass
-                
-                self.browser_items.append({
-                    'name': display_name,
-                    'type': 'file',
-                    'path': full_path
-                })
+            jobs = []
+            for i, item in enumerate(names):
+                index = listing.add(item, KIND_FILE, titles[i] if titles else None)
+                if titles is None:
+                    jobs.append((index, item))
+
+            # Fase 2: títulos ID3 en el hilo de trabajo. El orden es por nombre de
+            # archivo, así que aplicar un título no mueve ninguna fila.
+            if jobs:
+                self.scanner.resolve(self.current_path, jobs)
                 
         except Exception as e:
+            self.scanner.cancel()
             print(f"Error listando directorio {self.current_path}: {e}")
 
-    def load_music(self):
-        # Buscar archivos mp3 (Comportamiento original preservado para inicio automático o búsqueda general)
-        self.playlist = []
-        
+    def apply_scan_updates(self):
+        """Aplica los títulos resueltos en segundo plano (hilo principal)."""
+        updates = self.scanner.drain()
+        for index, title in updates:
+            if index < len(self.browser_items):
+                self.browser_items.set_title(index, title)
+        if updates:
+            self.browser_version += 1
+
+    def load_music(self, walk=True):
+        """
+        walk=False: la playlist y el browser ya vienen de una sesión restaurada
+        (restore_session); solo se vigilan las raíces, sin listar ni recorrer.
+        """
         # Prioridad: ../music (Solicitado)
         # Fallback: music, .
         search_dirs = ["music", "/storage/roms/music"]
         if hasattr(sys, '_MEIPASS') and os.name == 'nt':
             search_dirs = ["C:\\Users\\sivan\\source\\repos\\r36tmax\\music"]
+
+        if not walk:
+            roots = [os.path.abspath(d) for d in search_dirs if os.path.exists(d)]
+            if roots:
+                self.changes.watch(roots)
+            return
+
+        # Buscar archivos mp3 (Comportamiento original preservado para inicio automático o búsqueda general)
+        self.playlist = []
         
         # Intentar establecer un directorio inicial lógico para el browser
         for d in search_dirs:
@@ -105,26 +351,181 @@ class MusicPlayer:
                 self.update_browser_items()
                 break
 
-        for d in search_dirs:
-            if os.path.exists(d):
-                # Usar os.path.join para compatibilidad de SO
-                pattern = os.path.join(d, "*.mp3")
-                for file in glob.glob(pattern):
-                    abs_path = os.path.abspath(file)
-                    if abs_path not in self.playlist:
-                        self.playlist.append(abs_path)
-
-
-        if self.playlist:
-            self.current_track_index = 0
-            print(f"Cargadas {len(self.playlist)} canciones. (Buscado en: {', '.join(search_dirs)})")
+        # Recorrido recursivo en segundo plano: la playlist crece en update()
+        roots = [os.path.abspath(d) for d in search_dirs if os.path.exists(d)]
+        if roots:
+            self.enqueue_tree(roots, autoplay=False)
+            self.changes.watch(roots)
         else:
             print(f"No se encontraron archivos .mp3 en: {', '.join(search_dirs)}")
 
+    def enqueue_tree(self, roots, autoplay=False):
+        """
+        Sustituye la playlist por los mp3 de los árboles roots (recursivo).
+        Las rutas llegan por lotes desde un hilo; con autoplay la reproducción
+        empieza en cuanto aparece el primer archivo.
+        """
+        self.cancel_tree()
+        self.playlist = []
+        self.current_track_index = 0
+        # Las carpetas que no cambiaron se listan desde el índice, sin scandir
+        self._walker = TreeWalker(roots, lister=self.library.walk_entries)
+        self._walker_autoplay = autoplay
+
+    def restore_session(self, state):
+        """
+        Reanuda una sesión guardada (session.py): playlist, pista, posición,
+        repeat y carpeta del browser. Devuelve False si no sirve (p. ej. la
+        pista ya no existe); entonces se arranca con load_music() normal.
+        """
+        try:
+            playlist = list(state['playlist'])
+            index = int(state['index'])
+            position = float(state.get('position', 0.0))
+            browser_path = state.get('browser_path')
+        except (KeyError, TypeError, ValueError):
+            return False
+        if not playlist or not 0 <= index < len(playlist) or not os.path.isfile(playlist[index]):
+            return False
+        self.playlist = playlist
+        self.current_track_index = index
+        self.repeat_mode = state.get('repeat_mode', 0) if state.get('repeat_mode') in (0, 1, 2) else 0
+        if not browser_path or not os.path.isdir(browser_path):
+            browser_path = os.path.dirname(playlist[index])
+        self.current_path = browser_path
+        self.update_browser_items() # Un directorio, normalmente ya en el índice
+        self._resume_at = (playlist[index], position)
+        if state.get('playing'):
+            self.play_music()
+        return True
+
+    def session_position(self):
+        """Posición a guardar en la sesión: la actual o la que queda pendiente de reanudar."""
+        if self.is_playing or self.is_paused:
+            return self.get_position()
+        if self._resume_at and self.playlist and 0 <= self.current_track_index < len(self.playlist) \
+                and self._resume_at[0] == self.playlist[self.current_track_index]:
+            return self._resume_at[1]
+        return 0.0
+
+    def play_tree(self, root):
+        """Reproduce recursivamente todo el árbol bajo root (Artista/Álbum/pista)."""
+        self.stop_music()
+        self.enqueue_tree([root], autoplay=True)
+        print(f"Reproduciendo árbol: {root}")
+
+    def cancel_tree(self):
+        if self._walker:
+            self._walker.cancel()
+            self._walker = None
+        self._walker_autoplay = False
+
+    def is_loading_tree(self):
+        return self._walker is not None
+
+    def _apply_tree_walk(self):
+        """Añade a la playlist las rutas encontradas por el recorrido (hilo principal)."""
+        walker = self._walker
+        if not walker:
+            return
+        paths = walker.drain(WALK_BATCH)
+        if paths:
+            first = not self.playlist
+            self.playlist.extend(paths)
+            if first and self._walker_autoplay:
+                self._walker_autoplay = False
+                self.play_music()
+            elif self.is_playing:
+                # La siguiente pista puede acabar de aparecer
+                self._schedule_preload()
+        if not walker.is_busy():
+            self._walker = None
+            self._walker_autoplay = False
+            roots = ', '.join(walker.roots)
+            if self.playlist:
+                print(f"Cargadas {len(self.playlist)} canciones. (Buscado en: {roots})")
+            else:
+                print(f"No se encontraron archivos .mp3 en: {roots}")
+
+    def _apply_library_changes(self):
+        """Aplica al browser y a la playlist los cambios notificados (hilo principal)."""
+        changes = self.changes.drain()
+        if not changes:
+            return
+        listing_changed = False
+        for change in changes:
+            if change.kind in ('file', 'dir'):
+                listing_changed |= self._listing_insert(change.path, change.is_dir, change.title)
+            elif change.kind == 'removed':
+                listing_changed |= self._listing_remove(change.path)
+                self._playlist_replace(change.path, None)
+            elif change.kind == 'moved':
+                listing_changed |= self._listing_remove(change.path)
+                listing_changed |= self._listing_insert(change.dest, change.is_dir, change.title)
+                self._playlist_replace(change.path, change.dest)
+        if listing_changed:
+            self.browser_version += 1
+
+    def _listing_insert(self, path, is_dir, title=None):
+        if os.path.dirname(path) != self.current_path:
+            return False
+        if self.scanner.is_busy():
+            # El escáner tiene índices de fila pendientes: se rehace el listado
+            # de este directorio (solo nombres; los títulos siguen llegando)
+            self.update_browser_items()
+            return True
+        self.browser_items.insert(os.path.basename(path), KIND_DIR if is_dir else KIND_FILE, title)
+        return True
+
+    def _listing_remove(self, path):
+        current = self.current_path
+        if current == path or current.startswith(path + os.sep):
+            # Se borró (o movió) el directorio que se está viendo: subir al primero que exista
+            while current and not os.path.isdir(current):
+                parent = os.path.dirname(current)
+                if parent == current:
+                    break
+                current = parent
+            self.current_path = current
+            self.update_browser_items()
+            return True
+        if os.path.dirname(path) != current:
+            return False
+        if self.scanner.is_busy():
+            self.update_browser_items()
+            return True
+        name = os.path.basename(path)
+        return self.browser_items.remove(name, KIND_FILE) >= 0 or \
+            self.browser_items.remove(name, KIND_DIR) >= 0
+
+    def _playlist_replace(self, path, dest):
+        """Quita (dest=None) o renombra path, y lo que cuelga de él, en la playlist."""
+        if self._walker:
+            return # El recorrido en curso todavía está añadiendo rutas
+        prefix = path + os.sep
+        playlist = []
+        current = None
+        for i, track in enumerate(self.playlist):
+            if track == path or track.startswith(prefix):
+                if dest is not None:
+                    track = dest + track[len(path):]
+                elif i != self.current_track_index:
+                    continue # La pista en curso se conserva: sigue sonando
+            if i == self.current_track_index:
+                current = len(playlist)
+            playlist.append(track)
+        if playlist == self.playlist:
+            return
+        self.playlist = playlist
+        self.current_track_index = current if current is not None else 0
+        if self.is_playing or self.is_paused:
+            self._schedule_preload()
+
     def play_from_directory(self):
         """Carga y reproduce todos los mp3 del directorio actual del browser"""
-        new_playlist = [item['path'] for item in self.browser_items if item['type'] == 'file']
+        new_playlist = self.browser_items.file_paths()
         if new_playlist:
+            self.cancel_tree()
             self.stop_music()
             self.playlist = new_playlist
             self.current_track_index = 0
@@ -134,6 +535,10 @@ class MusicPlayer:
             print("No hay archivos mp3 en este directorio")
 
     def play_music(self):
+        if not self.playlist and self._walker:
+            # Aún recorriendo el árbol: empezar con el primer archivo que aparezca
+            self._walker_autoplay = True
+            return
         if self.playlist:
             if self.is_paused:
                 mix.Mix_ResumeMusic()
@@ -141,25 +546,172 @@ class MusicPlayer:
                 self.is_playing = True
             else:
                 try:
-                    if self.current_music:
-                        mix.Mix_FreeMusic(self.current_music)
-                    
-                    track_path = self.playlist[self.current_track_index].encode('utf-8')
-                    self.current_music = mix.Mix_LoadMUS(track_path)
+                    track_path = self.playlist[self.current_track_index]
+
+                    # Usar la pista precargada si coincide; si no, cargar ahora
+                    music, info = self._take_preloaded(track_path)
+                    preloaded = music is not None
+                    if not preloaded:
+                        music = mix.Mix_LoadMUS(track_path.encode('utf-8'))
+                        info = read_gapless_info(track_path)
                     
-                    if not self.current_music:
+                    if not music:
                         print(f"Error cargando música: {mix.Mix_GetError()}")
                         return
 
+                    if self.current_music:
+                        mix.Mix_FreeMusic(self.current_music)
+                    self.current_music = music
+
                     mix.Mix_PlayMusic(self.current_music, 1)
+                    # Después de PlayMusic: un aviso tardío de la pista anterior lleva la generación vieja
+                    self._music_gen += 1
                     self.is_playing = True
                     self.is_paused = False
                     # Aplicar volumen inicial
                     mix.Mix_VolumeMusic(int(self.volume))
+
+                    self._apply_trim(info)
+                    resume, self._resume_at = self._resume_at, None
+                    if resume and resume[0] == track_path and resume[1] > 0:
+                        self.seek(resume[1])
+                    self._log_transition(preloaded)
+                    self._schedule_preload()
                     
                 except Exception as e:
                     print(f"Error al reproducir: {e}")
 
+    # --- Precarga / gapless ---
+
+    def _finish_target_index(self):
+        """Índice que sonará al terminar la pista actual según el modo repeat (o None)."""
+        if not self.playlist:
+            return None
+        if self.repeat_mode == 2: # Repeat one
+            return self.current_track_index
+        if self.repeat_mode == 1: # Repeat all
+            return (self.current_track_index + 1) % len(self.playlist)
+        if self.current_track_index < len(self.playlist) - 1:
+            return self.current_track_index + 1
+        return None
+
+    def _schedule_preload(self):
+        target = self._finish_target_index()
+        path = self.playlist[target] if target is not None else None
+
+        with self._preload_cond:
+            if self._preload and self._preload[0] == path:
+                return
+            if self._preload:
+                self._preload_discard.append(self._preload[1])
+                self._preload = None
+            self._preload_gen += 1
+            # Solo cuenta la última petición: una anterior sin empezar se descarta
+            self._preload_request = (path, self._preload_gen) if path else None
+            if path and self._preload_thread is None and self._preload_running:
+                self._preload_thread = threading.Thread(target=self._preload_worker, daemon=True)
+                self._preload_thread.start()
+            self._preload_cond.notify()
+
+    def _preload_worker(self):
+        # Abre el Mix_Music fuera del hilo de UI (lectura de la SD); cleanup() lo
+        # espera antes de cerrar el audio, así ningún Mix_Music le sobrevive
+        while True:
+            with self._preload_cond:
+                while self._preload_running and self._preload_request is None:
+                    self._preload_cond.wait()
+                if not self._preload_running:
+                    return
+                path, gen = self._preload_request
+                self._preload_request = None
+            music = mix.Mix_LoadMUS(path.encode('utf-8'))
+            info = read_gapless_info(path) if music else None
+            with self._preload_cond:
+                if not music:
+                    continue
+                if gen != self._preload_gen or not self._preload_running:
+                    self._preload_discard.append(music)
+                else:
+                    self._preload = (path, music, info)
+
+    def _take_preloaded(self, path):
+        with self._preload_lock:
+            if self._preload and self._preload[0] == path:
+                _, music, info = self._preload
+                self._preload = None
+                return music, info
+        return None, None
+
+    def _free_discarded_preloads(self):
+        with self._preload_lock:
+            discard = self._preload_discard
+            self._preload_discard = []
+        for music in discard:
+            mix.Mix_FreeMusic(music)
+
+    def _apply_trim(self, info):
+        """Recorta el retardo/relleno del encoder (LAME/Xing) si el decodificador no lo hace."""
+        self._trim_end = None
+        if not info:
+            return
+        try:
+            duration = mix.Mix_MusicDuration(self.current_music) # SDL_mixer >= 2.6
+        except Exception:
+            return
+        trim = trim_points(info, duration)
+        if trim:
+            mix.Mix_SetMusicPosition(trim[0])
+            self._trim_end = trim[1]
+
+    def _music_position(self):
+        try:
+            return mix.Mix_GetMusicPosition(self.current_music) # SDL_mixer >= 2.6
+        except Exception:
+            self._trim_end = None
+            return -1
+
+    def _log_transition(self, preloaded):
+        if self._end_detected is None:
+            return
+        gap_ms = (time.perf_counter() - self._end_detected) * 1000
+        self._end_detected = None
+        self.transition_gaps.append(gap_ms)
+        print(f"[Gapless] Transición: {gap_ms:.1f} ms ({'precargada' if preloaded else 'sin precarga'})")
+
+    def get_position(self):
+        """Posición (s) en la pista actual, o -1 si no se conoce."""
+        if not self.current_music:
+            return -1
+        return self._music_position()
+
+    def seek(self, seconds):
+        """Salta a seconds (s) de la pista actual; devuelve False si no hay pista o no se puede."""
+        if not self.current_music or not (self.is_playing or self.is_paused):
+            return False
+        end = self._trim_end
+        if end is None:
+            try:
+                end = mix.Mix_MusicDuration(self.current_music) # SDL_mixer >= 2.6
+            except Exception:
+                end = None
+        seconds = max(0.0, seconds)
+        if end is not None and end > 0:
+            seconds = min(seconds, end)
+        return mix.Mix_SetMusicPosition(seconds) == 0
+
+    def enqueue(self, paths):
+        """Añade paths al final de la playlist (y empieza a sonar si no sonaba nada)."""
+        if not paths:
+            return
+        was_empty = not self.playlist
+        self.playlist.extend(paths)
+        if was_empty and not self.is_loading_tree():
+            self.current_track_index = 0
+            self.play_music()
+        elif self.is_playing:
+            # La pista siguiente puede ser una de las recién añadidas
+            self._schedule_preload()
+
     def pause_music(self):
         if self.is_playing:
             mix.Mix_PauseMusic()
@@ -167,9 +719,15 @@ class MusicPlayer:
             self.is_playing = False
 
     def stop_music(self):
-        mix.Mix_HaltMusic()
+        # Mix_HaltMusic llama al hook en este mismo hilo: no es un fin de pista
+        self._halting = True
+        try:
+            mix.Mix_HaltMusic()
+        finally:
+            self._halting = False
         self.is_playing = False
         self.is_paused = False
+        self._trim_end = None
 
     def next_track(self):
         if self.playlist:
@@ -185,6 +743,8 @@ class MusicPlayer:
 
     def toggle_play_pause(self):
         if not self.playlist:
+            if self._walker:
+                self._walker_autoplay = True
             return
             
         if self.is_playing:
@@ -196,29 +756,55 @@ class MusicPlayer:
             
     def set_volume(self, vol_percent):
         # vol_percent is 0.0 to 1.0
-        # Actualizar volumen del sistema
-        percent = int(max(0.0, min(1.0, vol_percent)) * 100)
-        self.volume_control.set_volume(percent)
-        
-        # También actualizar volumen interno de SDL Mixer por si acaso
-        sdl_vol = int(max(0.0, min(1.0, vol_percent)) * 128)
-        self.volume = sdl_vol
-        mix.Mix_VolumeMusic(self.volume)
+        # Solo fija el objetivo: las pulsaciones seguidas se agrupan en una
+        # escritura al sistema y la ganancia de SDL se lleva en rampa (update)
+        percent = int(round(max(0.0, min(1.0, vol_percent)) * 100))
+        if percent == self.volume_target and not self._volume_pending:
+            return
+        self.volume_target = percent
+        self._volume_pending = True
+        self._ramp = (time.perf_counter(), self.volume, percent / 100.0 * 128)
+        self._update_volume()
+
+    def _update_volume(self, force=False):
+        now = time.perf_counter()
+
+        # Rampa de la ganancia de SDL_mixer
+        if self._ramp:
+            start, gain_from, gain_to = self._ramp
+            t = (now - start) / VOLUME_RAMP
+            if t >= 1.0:
+                gain = gain_to
+                self._ramp = None
+            else:
+                gain = gain_from + (gain_to - gain_from) * t
+            if int(gain) != int(self.volume):
+                mix.Mix_VolumeMusic(int(gain))
+            self.volume = gain
+
+        # Escritura agrupada al mixer del sistema
+        if self._volume_pending and (force or now - self._volume_last_write >= VOLUME_WRITE_INTERVAL):
+            self._volume_pending = False
+            self._volume_last_write = now
+            self.volume_control.set_volume(self.volume_target)
         
     def get_volume(self):
-        # Obtener volumen real del sistema (o caché)
-        sys_vol = self.volume_control.get_volume()
-        return sys_vol / 100.0
+        if self.volume_control is None:
+            return None # Antes de start(): el primer frame no muestra volumen
+        # En pantalla manda el objetivo. La lectura del sistema (un cambio hecho
+        # fuera) solo se adopta sin cambios propios recientes: con amixer puede
+        # ser de antes de la última escritura y haría saltar el volumen atrás
+        if not (self._volume_pending or self._ramp) and \
+                time.perf_counter() - self._volume_last_write >= VOLUME_SYNC_HOLD:
+            self.volume_target = self.volume_control.get_volume()
+        return self.volume_target / 100.0
         
     def get_current_track_name(self):
         if self.playlist and 0 <= self.current_track_index < len(self.playlist):
             track_path = self.playlist[self.current_track_index]
-            try:
-                audio = MP3(track_path, ID3=EasyID3)
-                if 'title' in audio:
-                    return audio['title'][0]
-            except Exception:
-                pass
+            meta = self.metadata.get(track_path)
+            if meta:
+                return meta.title
             return os.path.basename(track_path)
         return None
         
@@ -229,17 +815,32 @@ class MusicPlayer:
         """
         if self.playlist and 0 <= self.current_track_index < len(self.playlist):
             track_path = self.playlist[self.current_track_index]
-            try:
-                # Usar MP3 de mutagen para acceder a tags ID3 raw
-                audio = MP3(track_path)
-                # Buscar tags APIC (Attached Picture)
-                for tag in audio.tags.values():
-                    if tag.FrameID == 'APIC':
-                        return tag.data
-            except Exception:
-                pass
+            # Sin portada según la caché: no hace falta abrir el archivo
+            return read_cover_bytes(self.metadata.get(track_path))
+        return None
+
+    def get_current_track_metadata(self):
+        if self.playlist and 0 <= self.current_track_index < len(self.playlist):
+            return self.metadata.get(self.playlist[self.current_track_index])
         return None
 
+    def get_neighbour_paths(self):
+        """Rutas de la pista anterior y siguiente (para prefetch de portadas)."""
+        if len(self.playlist) < 2 or not (0 <= self.current_track_index < len(self.playlist)):
+            return []
+        n = len(self.playlist)
+        next_path = self.playlist[(self.current_track_index + 1) % n]
+        prev_path = self.playlist[(self.current_track_index - 1) % n]
+        return [next_path, prev_path]
+
+    def get_metadata_stats(self):
+        """Contadores de aciertos/fallos de la caché de metadatos."""
+        return self.metadata.stats()
+
+    def get_index_stats(self, verify=False):
+        """Tamaño y antigüedad del índice de la biblioteca."""
+        return self.library.stats(verify=verify)
+
     def get_status_text(self):
         status = "Detenido"
         if self.is_paused:
@@ -252,13 +853,84 @@ class MusicPlayer:
 
     def toggle_repeat_mode(self):
         self.repeat_mode = (self.repeat_mode + 1) % 3
+        # La pista que sigue depende del modo: rehacer la precarga
+        if self.is_playing or self.is_paused:
+            self._schedule_preload()
+
+    def _remaining_time(self):
+        """Segundos hasta el fin de la pista actual (o del audio útil), o None."""
+        end = self._trim_end
+        if end is None:
+            try:
+                end = mix.Mix_MusicDuration(self.current_music) # SDL_mixer >= 2.6
+            except Exception:
+                return None
+        position = self._music_position()
+        if end is None or end <= 0 or position < 0:
+            return None
+        return end - position
+
+    def next_deadline(self, now):
+        """Tick de SDL en el que update() tendrá trabajo (None = solo con eventos)."""
+        deadlines = []
+        if self.changes.pending():
+            deadlines.append(now)
+        if self.scanner.is_busy() or self._preload_discard:
+            deadlines.append(now + SCAN_POLL_MS)
+        if self._walker:
+            # Esperando el primer archivo para empezar: responder en un frame
+            deadlines.append(now + (16 if self._walker_autoplay else SCAN_POLL_MS))
+        if self._ramp:
+            deadlines.append(now + 16)
+        if self._volume_pending:
+            wait = VOLUME_WRITE_INTERVAL - (time.perf_counter() - self._volume_last_write)
+            deadlines.append(now + max(0, int(wait * 1000)))
+        # El fin natural llega por evento (hook); solo el recorte gapless, o
+        # la falta de eventos de usuario, necesita un plazo
+        if self.is_playing and not self.is_paused and self.current_music and \
+                (self._trim_end is not None or self.finished_event_type is None):
+            remaining = self._remaining_time()
+            if remaining is None:
+                deadlines.append(now + TRACK_POLL_MS)
+            else:
+                deadlines.append(now + max(5, min(TRACK_MAX_WAIT_MS, int(remaining * 1000))))
+        return min(deadlines) if deadlines else None
 
     def update(self):
-        # Verificar si la música terminó
+        self.apply_scan_updates()
+        self._apply_tree_walk()
+        self._apply_library_changes()
+        self._update_volume()
+
+        self._free_discarded_preloads()
+
+        # Final del audio útil (recorte gapless); sin hook, sondeo de Mix_PlayingMusic
         if self.is_playing and not self.is_paused:
-            if mix.Mix_PlayingMusic() == 0:
+            if (self._trim_end is not None and self._music_position() >= self._trim_end) or \
+               (self.finished_event_type is None and mix.Mix_PlayingMusic() == 0):
+                self._end_detected = time.perf_counter()
                 self.on_music_finished()
-                
+
+    def _music_finished_hook(self):
+        """Callback de SDL_mixer (hilo de audio): solo publica un evento, sin tocar el mixer."""
+        if self._halting:
+            return
+        self._finished_at = time.perf_counter()
+        event = sdl2.SDL_Event()
+        event.type = self.finished_event_type
+        event.user.code = self._music_gen
+        sdl2.SDL_PushEvent(event)
+
+    def is_music_finished_event(self, event):
+        return self.finished_event_type is not None and event.type == self.finished_event_type
+
+    def handle_music_finished(self, event):
+        """Evento del hook (hilo principal): avanza si el aviso es de la pista que suena."""
+        if event.user.code != self._music_gen or not self.is_playing or self.is_paused:
+            return
+        self._end_detected = self._finished_at or time.perf_counter()
+        self.on_music_finished()
+
     def on_music_finished(self):
         if self.repeat_mode == 2: # Repeat one
             self.play_music()
@@ -270,6 +942,34 @@ class MusicPlayer:
             else:
                 self.stop_music()
 
+    def cleanup(self):
+        with self._preload_cond:
+            self._preload_running = False
+            self._preload_request = None
+            self._preload_gen += 1
+            if self._preload:
+                self._preload_discard.append(self._preload[1])
+                self._preload = None
+            self._preload_cond.notify()
+        if self._preload_thread:
+            # Un Mix_LoadMUS en curso termina en _preload_discard: se libera abajo
+            self._preload_thread.join(timeout=5.0)
+            if self._preload_thread.is_alive():
+                print("[Gapless] La precarga no terminó a tiempo; su Mix_Music no se libera")
+            self._preload_thread = None
+        self._free_discarded_preloads()
+        if self._music_finished_cb:
+            mix.Mix_HookMusicFinished(mix.music_finished())
+        if self.current_music:
+            mix.Mix_FreeMusic(self.current_music)
+            self.current_music = None
+        self.cancel_tree()
+        self.changes.stop()
+        self.scanner.stop()
+        self.library.close()
+        self._update_volume(force=True)
+        self.volume_control.close()
+
 def draw_button(renderer, rect, image_texture, action=None, input_handler=None):
     # Detección simple de clic
     # En SDL2 puro, la detección de colisión de mouse se suele hacer en el bucle de eventos
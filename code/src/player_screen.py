@@ -0,0 +1,306 @@
+import os
+import time
+import ctypes
+import sdl2
+import sdl2.sdlimage as img
+import config
+import render_state
+from animation import Marquee
+from player import draw_button
+from thumbnail_cache import ThumbnailCache
+from cover_cache import CoverTextureCache
+
+# Regiones fijas de la vista player (coordenadas lógicas)
+COVER_RECT = (config.WIDTH // 2 - 180, 30, 360, 360)
+COVER_BORDER = 10
+TITLE_Y = 420
+STATUS_Y = 470
+VOLUME_Y = 510
+TEXT_LINE_HEIGHT = 40
+
+# Animaciones por tiempo (ticks de SDL): el bucle duerme entre plazos
+HIGHLIGHT_MS = 33       # Duración del resaltado de prev/next
+
+
+class PlayerScreen:
+    def __init__(self, renderer, player):
+        self.renderer = renderer
+        self.player = player
+        self.background_tex = None
+        self.default_cover_tex = None
+        self.btn_prev_tex = None
+        self.btn_play_tex = None
+        self.btn_pause_tex = None
+        self.btn_next_tex = None
+
+        # Definir áreas de botones
+        center_x = config.WIDTH // 2
+        y_pos = 610
+        spacing = 110
+        btn_w, btn_h = config.BUTTON_SIZE
+
+        self.rect_prev = (center_x - spacing - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
+        self.rect_play = (center_x - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
+        self.rect_next = (center_x + spacing - btn_w//2, y_pos - btn_h//2, btn_w, btn_h)
+
+        # Variables para marquee (por tiempo, ver animation.py)
+        self.max_title_width = int(config.WIDTH * 0.8)
+        self.marquee = Marquee()
+        self.track_name = ""
+        self.last_track_name = ""
+        self.title_w = 0
+        self.title_h = 0
+
+        # Variables para animación de botones
+        self.btn_highlight_until = 0
+        self.btn_highlight_target = None # "prev" o "next"
+        self.manual_transition = False
+
+        # Tiempo (ms) dedicado a portadas en el último update (para el profiler)
+        self.last_cover_ms = 0.0
+
+        # Portadas reducidas a tamaño de pantalla (disco) y sus texturas (GPU)
+        self.thumbnails = ThumbnailCache(size=COVER_RECT[2:])
+        self.covers = CoverTextureCache(renderer, player.metadata, self.thumbnails)
+
+        self._load_assets()
+        self.current_cover_tex = self.default_cover_tex
+        # Clave de la portada en pantalla (None: la por defecto). Las texturas
+        # expulsadas se liberan y su id() se puede reutilizar: no sirve de clave
+        self.current_cover_key = None
+
+        # Fondo, portada con marco y botones pre-compuestos (ver render_state.StaticLayer)
+        self.layer = render_state.StaticLayer(renderer)
+
+    def _load_assets(self):
+        self.background_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'bk1.jpg'))
+        self.default_cover_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'sl1.jpg'))
+        self.btn_prev_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'b.jpg'))
+        self.btn_play_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'p.jpg'))
+        self.btn_pause_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'pause.jpg'))
+        self.btn_next_tex = self._load_texture(os.path.join(config.ASSETS_DIR, 'f.jpg'))
+
+    def _load_texture(self, path):
+        if not os.path.exists(path):
+            print(f"Error: Archivo no encontrado {path}")
+            return None
+
+        # Cargar superficie
+        surface = img.IMG_Load(path.encode('utf-8'))
+        if not surface:
+            print(f"Error cargando imagen {path}: {img.IMG_GetError()}")
+            return None
+
+        # Crear textura
+        texture = sdl2.SDL_CreateTextureFromSurface(self.renderer, surface)
+        sdl2.SDL_FreeSurface(surface)
+
+        if not texture:
+            print(f"Error creando textura para {path}: {sdl2.SDL_GetError()}")
+            return None
+
+        return texture
+
+    # --- Interacción ---
+
+    def highlight(self, target):
+        """Resalta el botón 'prev' o 'next' tras un cambio manual de pista."""
+        self.btn_highlight_target = target
+        self.btn_highlight_until = sdl2.SDL_GetTicks() + HIGHLIGHT_MS
+        self.manual_transition = True
+
+    def button_at(self, x, y):
+        pt = sdl2.SDL_Point(x, y)
+        for name, rect in (("play", self.rect_play), ("prev", self.rect_prev), ("next", self.rect_next)):
+            if sdl2.SDL_PointInRect(pt, sdl2.SDL_Rect(*rect)):
+                return name
+        return None
+
+    def _highlight_rect(self, target):
+        rect = self.rect_prev if target == "prev" else self.rect_next
+        return (rect[0] - 6, rect[1] - 6, rect[2] + 12, rect[3] + 12)
+
+    def _title_region(self):
+        return ((config.WIDTH - self.max_title_width) // 2, TITLE_Y, self.max_title_width, self.title_h)
+
+    # --- Estado por frame ---
+
+    def update(self, damage):
+        """Avanza animaciones y registra las entradas del frame en el DamageTracker."""
+        cover_ms = 0.0
+        now = sdl2.SDL_GetTicks()
+
+        if self.btn_highlight_target and now >= self.btn_highlight_until:
+            self.btn_highlight_target = None
+
+        # Información de la canción
+        self.track_name = self.player.get_current_track_name() or "No hay musica seleccionada"
+
+        # Actualizar portada y marquee si cambia la canción
+        if self.track_name != self.last_track_name:
+            # Si no hubo acción manual reciente (manual_transition is False), asumir auto-advance (Next)
+            if not self.manual_transition:
+                self.btn_highlight_target = "next"
+                self.btn_highlight_until = now + HIGHLIGHT_MS
+
+            # Resetear flag manual
+            self.manual_transition = False
+
+            self.last_track_name = self.track_name
+            self.marquee.reset(now) # Espera inicial
+            start = time.perf_counter()
+            self._load_cover()
+            cover_ms += (time.perf_counter() - start) * 1000
+
+        self._tick_marquee(now)
+        start = time.perf_counter()
+        self.covers.pump()
+        self.last_cover_ms = cover_ms + (time.perf_counter() - start) * 1000
+
+        damage.update('track', self.track_name)
+        damage.update('cover', self.current_cover_key, (
+            COVER_RECT[0] - COVER_BORDER, COVER_RECT[1] - COVER_BORDER,
+            COVER_RECT[2] + COVER_BORDER * 2, COVER_RECT[3] + COVER_BORDER * 2))
+        damage.update('marquee', self.marquee.offset, self._title_region())
+        damage.update('status', self.player.get_status_text(),
+                      (0, STATUS_Y, config.WIDTH, TEXT_LINE_HEIGHT))
+        volume = self.player.get_volume()
+        damage.update('volume', None if volume is None else int(volume * 100),
+                      (0, VOLUME_Y, config.WIDTH, TEXT_LINE_HEIGHT))
+        damage.update('playing', self.player.is_playing, self.rect_play)
+
+        # Los highlights cubren la fila de botones (prev..next)
+        prev_rect = self._highlight_rect("prev")
+        next_rect = self._highlight_rect("next")
+        damage.update('highlight', self.btn_highlight_target, (
+            prev_rect[0], prev_rect[1], next_rect[0] + next_rect[2] - prev_rect[0], prev_rect[3]))
+
+    def next_deadline(self):
+        """Tick del próximo cambio de animación (marquee o highlight), o None."""
+        deadlines = []
+        if self.btn_highlight_target:
+            deadlines.append(self.btn_highlight_until)
+        if self.marquee.next_tick is not None:
+            deadlines.append(self.marquee.next_tick)
+        return min(deadlines) if deadlines else None
+
+    def _load_cover(self):
+        # Portada del MP3 desde la caché de texturas (miniatura ya escalada)
+        meta = self.player.get_current_track_metadata()
+        texture = self.covers.get(meta)
+        # La textura pertenece a la caché: no se destruye aquí
+        self.current_cover_tex = texture or self.default_cover_tex
+        self.current_cover_key = self.covers.key_for(meta) if texture else None
+
+        # Empieza la reproducción: preparar portadas de la anterior y la siguiente
+        self.covers.prefetch(self.player.get_neighbour_paths())
+
+    def _tick_marquee(self, now):
+        self.title_w, self.title_h = config.TEXT_CACHE.measure(config.FONT_MEDIUM, self.track_name)
+        # Cálculo del overflow (cuánto sobra); el avance depende del tiempo, no de los frames
+        self.marquee.tick(now, self.title_w - self.max_title_width)
+
+    # --- Dibujo ---
+
+    def render(self):
+        renderer = self.renderer
+
+        # Parte estática: solo se repinta al cambiar la portada o play/pausa
+        self.layer.draw((self.current_cover_key, self.player.is_playing), self._paint_static)
+
+        self._draw_title()
+
+        status_text = self.player.get_status_text()
+        volume = self.player.get_volume()
+
+        self._render_text(config.FONT_SMALL, status_text, config.GRAY, config.WIDTH // 2, STATUS_Y, centered=True)
+        if volume is not None:
+            volume_text = f"Volumen: {int(volume * 100)}%"
+            self._render_text(config.FONT_SMALL, volume_text, config.GRAY, config.WIDTH // 2, VOLUME_Y, centered=True)
+
+        # Highlight PREV/NEXT: va detrás del botón, que se vuelve a poner encima
+        if self.btn_highlight_target in ("prev", "next"):
+            self._draw_highlight(self.btn_highlight_target)
+            if self.btn_highlight_target == "prev":
+                draw_button(renderer, self.rect_prev, self.btn_prev_tex)
+            else:
+                draw_button(renderer, self.rect_next, self.btn_next_tex)
+
+    def _paint_static(self, renderer):
+        # Fondo
+        if self.background_tex:
+            sdl2.SDL_RenderCopy(renderer, self.background_tex, None, None)
+        else:
+            sdl2.SDL_SetRenderDrawColor(renderer, 30, 30, 30, 255)
+            sdl2.SDL_RenderFillRect(renderer, None)
+
+        # Portada del álbum
+        if self.current_cover_tex:
+            cover_rect = sdl2.SDL_Rect(*COVER_RECT)
+
+            # Marco
+            border_rect = sdl2.SDL_Rect(
+                cover_rect.x - COVER_BORDER,
+                cover_rect.y - COVER_BORDER,
+                cover_rect.w + (COVER_BORDER * 2),
+                cover_rect.h + (COVER_BORDER * 2)
+            )
+
+            # Color del marco #17031D -> R=23, G=3, B=29
+            sdl2.SDL_SetRenderDrawColor(renderer, 23, 3, 29, 255)
+            sdl2.SDL_RenderFillRect(renderer, ctypes.byref(border_rect))
+
+            sdl2.SDL_RenderCopy(renderer, self.current_cover_tex, None, ctypes.byref(cover_rect))
+        else:
+            # Placeholder portada
+            rect = sdl2.SDL_Rect(config.WIDTH // 2 - 150, 70, 300, 300)
+            sdl2.SDL_SetRenderDrawColor(renderer, 100, 100, 100, 255)
+            sdl2.SDL_RenderFillRect(renderer, ctypes.byref(rect))
+
+        # Botones
+        draw_button(renderer, self.rect_prev, self.btn_prev_tex)
+
+        # Decidir qué textura usar para el botón Play/Pause
+        current_play_tex = self.btn_play_tex
+        if self.player.is_playing:
+            current_play_tex = self.btn_pause_tex
+
+        draw_button(renderer, self.rect_play, current_play_tex)
+        draw_button(renderer, self.rect_next, self.btn_next_tex)
+
+    def _draw_title(self):
+        if not config.FONT_MEDIUM:
+            return
+
+        if self.title_w > self.max_title_width:
+            # Renderizado con Clip
+            # El texto se dibuja en start_visible - marquee.offset
+            # marquee.offset va de 0 a overflow
+            start_visible = (config.WIDTH - self.max_title_width) // 2
+            draw_x = start_visible - self.marquee.offset
+
+            render_state.set_clip(self.renderer, self._title_region())
+            self._render_text(config.FONT_MEDIUM, self.track_name, config.WHITE, draw_x, TITLE_Y, centered=False)
+            render_state.reset_clip(self.renderer) # Quitar clip
+        else:
+            # Renderizado normal centrado
+            self._render_text(config.FONT_MEDIUM, self.track_name, config.WHITE, config.WIDTH // 2, TITLE_Y, centered=True)
+
+    def _draw_highlight(self, target):
+        highlight_rect = sdl2.SDL_Rect(*self._highlight_rect(target))
+        sdl2.SDL_SetRenderDrawColor(self.renderer, 248, 187, 68, 255) # F8BB44
+        sdl2.SDL_RenderFillRect(self.renderer, ctypes.byref(highlight_rect))
+
+    def _render_text(self, font, text, color, x, y, centered=False):
+        if not font or not text:
+            return
+        # Las texturas de texto se reutilizan entre frames (ver text_cache.py)
+        config.TEXT_CACHE.draw(font, text, color, x, y, centered=centered)
+
+    def cleanup(self):
+        self.layer.cleanup()
+        self.covers.cleanup()
+        for tex in (self.background_tex, self.default_cover_tex, self.btn_prev_tex,
+                    self.btn_play_tex, self.btn_pause_tex, self.btn_next_tex):
+            if tex:
+                sdl2.SDL_DestroyTexture(tex)
@@ -1,10 +1,25 @@
 import os
 import ctypes
 import sdl2
-import sdl2.ext
 import sdl2.sdlimage as img
 import sdl2.sdlttf as ttf
 import config
+import render_state
+from animation import Marquee
+from browser_filter import FilterIndex
+
+# Geometría de la lista (coordenadas lógicas)
+START_X = 50
+START_Y = 50
+ITEM_HEIGHT = 70 # 64px icono + padding
+TEXT_X = START_X + 74
+# Ancho máximo disponible para texto
+# start_x (50) + 74 (icono+pad) = 124 inicio texto
+# config.WIDTH - 124 - 50 (margen derecho)
+MAX_TEXT_WIDTH = config.WIDTH - 174
+
+# Selector de letras para filtrar con el gamepad
+FILTER_PICKER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 "
 
 class PlaylistScreen:
     def __init__(self, renderer, player):
@@ -17,14 +32,77 @@ class PlaylistScreen:
         self.selected_index = 0  # Índice del elemento seleccionado
         self.scroll_offset = 0   # Desplazamiento de visualización
         
-        # Variables Marquee
-        self.marquee_offset = 0
-        self.marquee_direction = 1
-        self.marquee_wait = 0
+        # Marquee del seleccionado (por tiempo, ver animation.py)
+        self.marquee = Marquee()
         self.last_selected_index = -1
+
+        # Filtro incremental (None = sin filtro)
+        self.filter_query = None
+        self.picker_index = 0
+        self._filter_index = None
+        self._filter_version = -1
+        self._filtered = []
         
         self._load_assets()
 
+        # Fondo y leyenda pre-compuestos (ver render_state.StaticLayer)
+        self.layer = render_state.StaticLayer(renderer)
+
+    def _items(self):
+        """Elementos mostrados: el listado completo o el resultado del filtro."""
+        if self.filter_query is not None:
+            return self._filtered
+        return self.player.browser_items
+
+    # --- Filtro ---
+
+    def open_filter(self):
+        self.filter_query = ""
+        self._refresh_filter()
+
+    def close_filter(self):
+        """Sale del filtro manteniendo seleccionado el mismo elemento."""
+        if self.filter_query is None:
+            return
+        item = self.get_selected_item()
+        self.filter_query = None
+        self._filter_index = None
+        self._filtered = []
+        self.selected_index = 0
+        self.scroll_offset = 0
+        if item in self.player.browser_items:
+            self.selected_index = self.player.browser_items.index(item)
+            self.scroll_offset = max(0, self.selected_index - self._max_items() + 1)
+
+    def filter_append(self, text):
+        if self.filter_query is not None and text:
+            self.filter_query += text
+            self._refresh_filter()
+
+    def filter_backspace(self):
+        if self.filter_query:
+            self.filter_query = self.filter_query[:-1]
+            self._refresh_filter()
+
+    def picker_move(self, delta):
+        self.picker_index = (self.picker_index + delta) % len(FILTER_PICKER)
+
+    def picker_add(self):
+        self.filter_append(FILTER_PICKER[self.picker_index])
+
+    def _refresh_filter(self):
+        # El índice se construye una vez por listado (sin tocar el disco); los
+        # títulos que llegan después solo renormalizan las filas cambiadas
+        items = self.player.browser_items
+        if self._filter_index is None or self._filter_index.items is not items:
+            self._filter_index = FilterIndex(items)
+        elif self._filter_version != self.player.browser_version:
+            self._filter_index.refresh()
+        self._filter_version = self.player.browser_version
+        self._filtered = self._filter_index.query(self.filter_query)
+        self.selected_index = 0
+        self.scroll_offset = 0
+
     def move_up(self):
         if self.selected_index > 0:
             self.selected_index -= 1
@@ -32,16 +110,28 @@ class PlaylistScreen:
                 self.scroll_offset = self.selected_index
 
     def move_down(self):
-        if self.selected_index < len(self.player.browser_items) - 1:
+        if self.selected_index < len(self._items()) - 1:
             self.selected_index += 1
-            item_height = 70
-            max_items = (config.HEIGHT - 100) // item_height
+            max_items = self._max_items()
             if self.selected_index >= self.scroll_offset + max_items:
                 self.scroll_offset = self.selected_index - max_items + 1
 
+    def restore_position(self, selected_index, scroll_offset):
+        """Selección y scroll guardados (sesión), ajustados al listado actual."""
+        count = len(self._items())
+        max_items = self._max_items()
+        self.selected_index = min(selected_index, max(0, count - 1))
+        # El seleccionado tiene que quedar visible y el scroll no pasar del final
+        lowest = max(0, self.selected_index - max_items + 1)
+        self.scroll_offset = max(lowest, min(scroll_offset, self.selected_index, max(0, count - max_items)))
+
+    def _max_items(self):
+        return (config.HEIGHT - 100) // ITEM_HEIGHT
+
     def get_selected_item(self):
-        if 0 <= self.selected_index < len(self.player.browser_items):
-            return self.player.browser_items[self.selected_index]
+        items = self._items()
+        if 0 <= self.selected_index < len(items):
+            return items[self.selected_index]
         return None
 
     def _load_assets(self):
@@ -60,12 +150,8 @@ class PlaylistScreen:
         self.folder_icon = self._load_texture(fold_path)
         self.file_icon = self._load_texture(file_path)
 
-        # Fuente
-        font_path = os.path.join(config.ASSETS_DIR, 'PublicPixel.ttf')
-        if os.path.exists(font_path):
-            self.font_browser = ttf.TTF_OpenFont(font_path.encode('utf-8'), 18)
-        else:
-            print(f"Fuente no encontrada: {font_path}")
+        # Fuente (config.load_font la registra en la caché de texto)
+        self.font_browser = config.load_font(18)
 
     def _load_texture(self, path):
         if os.path.exists(path):
@@ -76,32 +162,79 @@ class PlaylistScreen:
                 return tex
         return None
 
+    def update(self, damage):
+        """Avanza el marquee del seleccionado y registra el estado en el DamageTracker."""
+        # Las filas visibles se resuelven primero en el escáner de fondo
+        if self.filter_query is None:
+            self.player.scanner.set_viewport(self.scroll_offset, self._max_items())
+            # El listado puede encoger si se borran archivos (FTP/inotify)
+            count = len(self.player.browser_items)
+            if self.selected_index >= count:
+                self.selected_index = max(0, count - 1)
+                self.scroll_offset = max(0, self.selected_index - self._max_items() + 1)
+        elif self._filter_version != self.player.browser_version:
+            # Llegaron títulos nuevos: reconstruir el índice y conservar la selección
+            selected = self.selected_index
+            self._refresh_filter()
+            self.selected_index = min(selected, max(0, len(self._filtered) - 1))
+            self.scroll_offset = max(0, self.selected_index - self._max_items() + 1)
+        now = sdl2.SDL_GetTicks()
+
+        if self.selected_index != self.last_selected_index:
+            self.last_selected_index = self.selected_index
+            self.marquee.reset(now)
+
+        overflow = 0
+        item = self.get_selected_item()
+        if item and self.font_browser:
+            text_w, _ = config.TEXT_CACHE.measure(self.font_browser, item['name'])
+            overflow = text_w - MAX_TEXT_WIDTH
+        self.marquee.tick(now, overflow)
+
+        # Cambios de contenido, selección o scroll: redibujar toda la lista
+        damage.update('browser', (self.player.browser_version, self.selected_index, self.scroll_offset,
+                                  self.filter_query, self.picker_index))
+
+        # El marquee solo daña el área de texto de la fila seleccionada
+        row_y = START_Y + (self.selected_index - self.scroll_offset) * ITEM_HEIGHT
+        damage.update('browser_marquee', self.marquee.offset, (TEXT_X, row_y, MAX_TEXT_WIDTH, 64))
+
+    def next_deadline(self):
+        """Tick del próximo paso del marquee, o None si no hay nada animándose."""
+        return self.marquee.next_tick
+
     def render(self):
+        # Fondo y leyenda: solo se repintan al cambiar el texto de la leyenda
+        # (filtro). La leyenda queda bajo la última fila sin solaparse.
+        legend = self._legend_text()
+        self.layer.draw(legend, lambda renderer: self._paint_static(legend))
+
+        # Dibujar lista de archivos
+        self._draw_browser()
+
+    def _paint_static(self, legend):
         # Dibujar Fondo
         if self.background_tex:
             sdl2.SDL_RenderCopy(self.renderer, self.background_tex, None, None)
         else:
             sdl2.SDL_SetRenderDrawColor(self.renderer, 50, 0, 0, 255)
-            sdl2.SDL_RenderClear(self.renderer)
-
-        # Dibujar lista de archivos
-        self._draw_browser()
+            sdl2.SDL_RenderFillRect(self.renderer, None)
 
         # Dibujar leyenda
-        self._draw_legend()
+        self._draw_legend(legend)
 
     def _draw_browser(self):
         if not self.font_browser:
             return
 
-        start_x = 50
-        start_y = 50
-        item_height = 70 # 64px icono + padding
+        start_x = START_X
+        start_y = START_Y
+        item_height = ITEM_HEIGHT
         
-        max_items = (config.HEIGHT - 100) // item_height
+        max_items = self._max_items()
         
         # Obtener items visibles según scroll
-        visible_items = self.player.browser_items[self.scroll_offset : self.scroll_offset + max_items]
+        visible_items = self._items()[self.scroll_offset : self.scroll_offset + max_items]
         
         for i, item in enumerate(visible_items):
             real_index = self.scroll_offset + i
@@ -131,62 +264,33 @@ class PlaylistScreen:
             draw_offset_x = 0
             use_clip = False
             
-            # Ancho máximo disponible para texto
-            # start_x (50) + 74 (icono+pad) = 124 inicio texto
-            # config.WIDTH - 124 - 50 (margen derecho)
-            max_text_width = config.WIDTH - 174 
+            max_text_width = MAX_TEXT_WIDTH
             
             # Medir texto primero
-            w_ptr = ctypes.c_int()
-            h_ptr = ctypes.c_int()
-            ttf.TTF_SizeUTF8(self.font_browser, item['name'].encode('utf-8'), ctypes.byref(w_ptr), ctypes.byref(h_ptr))
-            text_w = w_ptr.value
-            text_h = h_ptr.value
+            text_w, text_h = config.TEXT_CACHE.measure(self.font_browser, item['name'])
             
-            if is_selected:
-                if self.selected_index != self.last_selected_index:
-                    self.last_selected_index = self.selected_index
-                    self.marquee_offset = 0
-                    self.marquee_direction = 1
-                    self.marquee_wait = 60
-                
-                if text_w > max_text_width:
-                    overflow = text_w - max_text_width
-                    
-                    if self.marquee_wait > 0:
-                        self.marquee_wait -= 1
-                    else:
-                        self.marquee_offset += self.marquee_direction
-                        if self.marquee_offset >= overflow:
-                            self.marquee_offset = overflow
-                            self.marquee_direction = -1
-                            self.marquee_wait = 60
-                        elif self.marquee_offset <= 0:
-                            self.marquee_offset = 0
-                            self.marquee_direction = 1
-                            self.marquee_wait = 60
-                            
-                    draw_offset_x = -self.marquee_offset
-                    use_clip = True
+            # El avance del marquee se calcula en update()
+            if is_selected and text_w > max_text_width:
+                draw_offset_x = -self.marquee.offset
+                use_clip = True
             
-            # Renderizar
-            text_surface = ttf.TTF_RenderUTF8_Blended(self.font_browser, item['name'].encode('utf-8'), config.WHITE)
-            if text_surface:
-                text_tex = sdl2.SDL_CreateTextureFromSurface(self.renderer, text_surface)
+            # Renderizar (textura reutilizada entre frames)
+            entry = config.TEXT_CACHE.get(self.font_browser, item['name'], config.WHITE)
+            if entry:
+                text_tex = entry[0]
                 
                 # Centrar texto verticalmente respecto al icono
                 text_y = y + (64 - text_h) // 2
-                text_x_pos = start_x + 74
+                text_x_pos = TEXT_X
                 
                 if use_clip:
                     # Clip al área de texto disponible
-                    clip_rect = sdl2.SDL_Rect(text_x_pos, text_y, max_text_width, text_h)
-                    sdl2.SDL_RenderSetClipRect(self.renderer, ctypes.byref(clip_rect))
+                    render_state.set_clip(self.renderer, (text_x_pos, text_y, max_text_width, text_h))
                     
                     text_rect = sdl2.SDL_Rect(text_x_pos + draw_offset_x, text_y, text_w, text_h)
                     sdl2.SDL_RenderCopy(self.renderer, text_tex, None, ctypes.byref(text_rect))
                     
-                    sdl2.SDL_RenderSetClipRect(self.renderer, None)
+                    render_state.reset_clip(self.renderer)
                 else:
                     # Si es muy largo pero no seleccionado, o cabe bien, cortar o dibujar normal
                     # Aquí dibujamos normal, pero si excede se cortará visualmente por el borde de pantalla o
@@ -194,22 +298,23 @@ class PlaylistScreen:
                     
                     if text_w > max_text_width and not is_selected:
                          # Opcional: Cortar si es muy largo y no está seleccionado
-                         clip_rect = sdl2.SDL_Rect(text_x_pos, text_y, max_text_width, text_h)
-                         sdl2.SDL_RenderSetClipRect(self.renderer, ctypes.byref(clip_rect))
+                         render_state.set_clip(self.renderer, (text_x_pos, text_y, max_text_width, text_h))
                          
                          text_rect = sdl2.SDL_Rect(text_x_pos, text_y, text_w, text_h)
                          sdl2.SDL_RenderCopy(self.renderer, text_tex, None, ctypes.byref(text_rect))
                          
-                         sdl2.SDL_RenderSetClipRect(self.renderer, None)
+                         render_state.reset_clip(self.renderer)
                     else:
                         text_rect = sdl2.SDL_Rect(text_x_pos, text_y, text_w, text_h)
                         sdl2.SDL_RenderCopy(self.renderer, text_tex, None, ctypes.byref(text_rect))
-                
-                sdl2.SDL_DestroyTexture(text_tex)
-                sdl2.SDL_FreeSurface(text_surface)
 
-    def _draw_legend(self):
-        text = "A: Play current directory"
+    def _legend_text(self):
+        if self.filter_query is not None:
+            letter = FILTER_PICKER[self.picker_index].replace(" ", "_")
+            return f"Filtro: {self.filter_query}_  [{letter}]  ({len(self._filtered)})"
+        return "A: Play current directory"
+
+    def _draw_legend(self, text):
         font = config.FONT_SMALL
         
         if not font:
@@ -217,12 +322,11 @@ class PlaylistScreen:
 
         # Renderizar texto para obtener dimensiones
         # Usamos config.WHITE para el texto
-        surface = ttf.TTF_RenderUTF8_Blended(font, text.encode('utf-8'), config.WHITE)
-        if not surface:
+        entry = config.TEXT_CACHE.get(font, text, config.WHITE)
+        if not entry:
             return
 
-        w = surface.contents.w
-        h = surface.contents.h
+        texture, w, h = entry
 
         # Posición (centrado abajo)
         x = (config.WIDTH - w) // 2
@@ -243,14 +347,11 @@ class PlaylistScreen:
         sdl2.SDL_SetRenderDrawBlendMode(self.renderer, sdl2.SDL_BLENDMODE_NONE)
 
         # Dibujar texto
-        texture = sdl2.SDL_CreateTextureFromSurface(self.renderer, surface)
         text_rect = sdl2.SDL_Rect(x, y, w, h)
         sdl2.SDL_RenderCopy(self.renderer, texture, None, ctypes.byref(text_rect))
-
-        sdl2.SDL_DestroyTexture(texture)
-        sdl2.SDL_FreeSurface(surface)
             
     def cleanup(self):
+        self.layer.cleanup()
         if self.background_tex:
             sdl2.SDL_DestroyTexture(self.background_tex)
         if self.folder_icon:
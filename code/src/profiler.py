@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import deque, OrderedDict
+
+# Fases del bucle principal, en orden de ejecución.
+# "cover" y "text" son sub-fases medidas aparte (incluidas en update/render).
+PHASES = ("events", "update", "cover", "render", "text", "present")
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    """
+    Tiempos por frame del bucle principal en una ventana deslizante.
+    Reporta p50/p95/p99 del tiempo de trabajo por frame, tiempo medio por
+    fase, FPS y frames perdidos (intervalo mayor que 1.5x el presupuesto).
+    """
+    def __init__(self, window=300, target_fps=60):
+        self.window = window
+        self.budget_ms = 1000.0 / target_fps
+        self._lock = threading.Lock()
+        self._work = deque(maxlen=window)      # ms de trabajo por frame
+        self._intervals = deque(maxlen=window) # ms entre inicios de frame
+        self._phases = {name: deque(maxlen=window) for name in PHASES}
+        self._current = {}
+        self._frame_start = None
+        self._last_start = None
+        self._mark = None
+        self.frames = 0
+        self.dropped = 0
+
+    def begin_frame(self, paced=True, budget_ms=None):
+        """
+        paced=False indica un despertar tras dormir sin animaciones: su
+        intervalo no cuenta para FPS ni frames perdidos. budget_ms es el
+        intervalo objetivo de este frame (FramePacer); por defecto 1/target_fps.
+        """
+        now = time.perf_counter()
+        if paced and self._last_start is not None:
+            interval = (now - self._last_start) * 1000
+            with self._lock:
+                self._intervals.append(interval)
+                if interval > (budget_ms or self.budget_ms) * 1.5:
+                    self.dropped += 1
+        self._last_start = now
+        self._frame_start = now
+        self._mark = now
+        self._current = dict.fromkeys(PHASES, 0.0)
+
+    def mark(self, name):
+        """Atribuye a la fase name el tiempo transcurrido desde la marca anterior."""
+        now = time.perf_counter()
+        self._current[name] = self._current.get(name, 0.0) + (now - self._mark) * 1000
+        self._mark = now
+
+    def add(self, name, ms):
+        """Suma tiempo medido fuera del profiler (p.ej. renders de texto)."""
+        self._current[name] = self._current.get(name, 0.0) + ms
+
+    def end_frame(self):
+        """Cierra el frame (antes de dormir: el sueño no cuenta como trabajo)."""
+        if self._frame_start is None:
+            return
+        work = (time.perf_counter() - self._frame_start) * 1000
+        with self._lock:
+            self._work.append(work)
+            for name, ms in self._current.items():
+                if name in self._phases:
+                    self._phases[name].append(ms)
+            self.frames += 1
+        self._frame_start = None
+
+    def snapshot(self):
+        with self._lock:
+            work = sorted(self._work)
+            intervals = list(self._intervals)
+            phases = {name: (sum(v) / len(v) if v else 0.0) for name, v in self._phases.items()}
+            dropped = self.dropped
+            frames = self.frames
+
+        avg_interval = sum(intervals) / len(intervals) if intervals else 0.0
+        return OrderedDict([
+            ('fps', (1000.0 / avg_interval) if avg_interval else 0.0),
+            ('p50_ms', _percentile(work, 50)),
+            ('p95_ms', _percentile(work, 95)),
+            ('p99_ms', _percentile(work, 99)),
+            ('frames', frames),
+            ('dropped', dropped),
+            ('phases_ms', phases),
+        ])
+
+    def overlay_lines(self):
+        s = self.snapshot()
+        phases = " ".join(f"{name[:3]} {ms:.1f}" for name, ms in s['phases_ms'].items())
+        return [
+            f"FPS {s['fps']:.1f} drop {s['dropped']}",
+            f"p50 {s['p50_ms']:.1f} p95 {s['p95_ms']:.1f} p99 {s['p99_ms']:.1f}",
+            phases,
+        ]
+
+
+def format_report(sections):
+    """Texto plano para telnet a partir de {sección: {clave: valor}}."""
+    lines = []
+    for section, values in sections.items():
+        lines.append(f"[{section}]")
+        for key, value in values.items():
+            if isinstance(value, dict):
+                value = " ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                 for k, v in value.items())
+            elif isinstance(value, float):
+                value = f"{value:.2f}"
+            lines.append(f"  {key}: {value}")
+    return "\n".join(lines)
@@ -0,0 +1,178 @@
+import os
+import time
+import queue
+from concurrent.futures import Future
+import sdl2
+from scanner import walk_mp3
+
+# Comando -> descripción de argumentos (ayuda de telnet)
+COMMANDS = {
+    'play': "", 'pause': "", 'toggle': "", 'stop': "",
+    'next': "", 'prev': "",
+    'seek': "<s|+s|-s>",
+    'volume': "<0-100|+n|-n>",
+    'enqueue': "<file|dir>",
+    'status': "",
+}
+
+
+class RemoteError(ValueError):
+    """Comando remoto mal formado (se responde al cliente, no se encola)."""
+
+
+def _relative(arg, name):
+    """'+5' / '-5' -> (5.0, True); '5' -> (5.0, False)."""
+    try:
+        return float(arg), arg[:1] in "+-"
+    except ValueError:
+        raise RemoteError(f"{name}: número no válido: {arg}")
+
+
+class RemoteControl:
+    """
+    Canal de control remoto hacia el bucle principal. Los hilos de los
+    servidores encolan comandos (submit) y reciben un Future; el bucle
+    principal los ejecuta en process(), así SDL_mixer solo se toca desde el
+    hilo principal. Cada submit despierta el bucle con un evento SDL propio,
+    de modo que el comando se ejecuta en el frame siguiente aunque el bucle
+    estuviera dormido.
+
+    El estado para 'status' se publica como un dict nuevo en cada publish();
+    sustituir la referencia es atómico, así que los lectores no toman locks.
+    """
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._wake_pending = False
+        self.event_type = sdl2.SDL_RegisterEvents(1)
+        if self.event_type == 0xFFFFFFFF:
+            self.event_type = None # Sin eventos de usuario libres: se atiende al despertar
+        self.snapshot = {'playing': False, 'paused': False, 'track': None}
+        self.executed = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    # --- Hilos de los servidores ---
+
+    def submit(self, cmd, args=(), cwd=None):
+        """
+        Valida y encola un comando. Devuelve un Future con el resultado (dict).
+        cwd: directorio del cliente para rutas relativas (enqueue). Puede
+        bloquear (enqueue recorre carpetas): los servidores lo llaman desde
+        su executor, no desde el bucle asyncio.
+        """
+        cmd = cmd.lower()
+        future = Future()
+        if cmd == 'status':
+            future.set_result(self.snapshot)
+            return future
+        if cmd not in COMMANDS:
+            raise RemoteError(f"comando desconocido: {cmd}")
+        args = self._parse_args(cmd, list(args), cwd)
+        self._queue.put((cmd, args, future, time.perf_counter()))
+        self.wake()
+        return future
+
+    def _parse_args(self, cmd, args, cwd=None):
+        if cmd == 'seek':
+            if len(args) != 1:
+                raise RemoteError("uso: seek <s|+s|-s>")
+            return _relative(str(args[0]), cmd)
+        if cmd == 'volume':
+            if len(args) != 1:
+                raise RemoteError("uso: volume <0-100|+n|-n>")
+            return _relative(str(args[0]), cmd)
+        if cmd == 'enqueue':
+            if not args:
+                raise RemoteError("uso: enqueue <file|dir>")
+            # El recorrido de carpetas se hace aquí, en el hilo que llama a submit
+            path = os.path.abspath(os.path.join(cwd or os.getcwd(), " ".join(str(a) for a in args)))
+            if os.path.isdir(path):
+                paths = list(walk_mp3(path))
+            elif os.path.isfile(path) and path.lower().endswith('.mp3'):
+                paths = [path]
+            else:
+                raise RemoteError(f"no es un mp3 ni una carpeta: {path}")
+            if not paths:
+                raise RemoteError(f"sin mp3 en: {path}")
+            return paths
+        if args:
+            raise RemoteError(f"uso: {cmd}")
+        return None
+
+    def wake(self):
+        """Despierta el bucle principal (seguro desde cualquier hilo)."""
+        # Un solo evento pendiente basta: process() vacía toda la cola
+        if self._wake_pending or self.event_type is None:
+            return
+        self._wake_pending = True
+        event = sdl2.SDL_Event()
+        event.type = self.event_type
+        if sdl2.SDL_PushEvent(event) < 1:
+            # Cola de eventos llena (o filtrado): el próximo wake() lo reintenta
+            self._wake_pending = False
+
+    # --- Hilo principal ---
+
+    def is_wake_event(self, event):
+        return self.event_type is not None and event.type == self.event_type
+
+    def process(self, handler):
+        """Ejecuta los comandos encolados con handler(cmd, args) -> dict. Devuelve cuántos."""
+        self._wake_pending = False
+        count = 0
+        while True:
+            try:
+                cmd, args, future, queued_at = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = handler(cmd, args)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            latency = (time.perf_counter() - queued_at) * 1000
+            self.last_latency_ms = latency
+            self.max_latency_ms = max(self.max_latency_ms, latency)
+            count += 1
+        self.executed += count
+        return count
+
+    def publish(self, state):
+        """Publica un nuevo estado (dict que ya no se modifica)."""
+        self.snapshot = state
+
+    def stats(self):
+        return {
+            'executed': self.executed,
+            'last_latency_ms': self.last_latency_ms,
+            'max_latency_ms': self.max_latency_ms,
+        }
+
+
+def player_state(player):
+    """Estado del reproductor para publicar en RemoteControl (hilo principal)."""
+    track = None
+    if player.playlist and 0 <= player.current_track_index < len(player.playlist):
+        track = player.playlist[player.current_track_index]
+    position = player.get_position() if track and (player.is_playing or player.is_paused) else None
+    return {
+        'playing': player.is_playing,
+        'paused': player.is_paused,
+        'track': track,
+        'title': player.get_current_track_name(),
+        'index': player.current_track_index,
+        'playlist_length': len(player.playlist),
+        'loading': player.is_loading_tree(),
+        'position': round(position, 2) if position is not None and position >= 0 else None,
+        'volume': player.volume_target,
+        'repeat_mode': player.repeat_mode,
+    }
+
+
+def format_result(result):
+    """Resultado de un comando en texto (telnet)."""
+    if not result:
+        return "OK"
+    return "\n".join(f"{key}: {value}" for key, value in result.items())
+
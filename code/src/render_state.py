@@ -0,0 +1,212 @@
+import ctypes
+import sdl2
+import config
+
+# Clip base del frame actual (región dañada). Los clips locales (marquee,
+# recorte de filas) se intersectan con ella en lugar de reemplazarla.
+_base_clip = None
+
+
+def _intersect(a, b):
+    x1 = max(a[0], b[0])
+    y1 = max(a[1], b[1])
+    x2 = min(a[0] + a[2], b[0] + b[2])
+    y2 = min(a[1] + a[3], b[1] + b[3])
+    return (x1, y1, max(0, x2 - x1), max(0, y2 - y1))
+
+
+def _union(a, b):
+    x1 = min(a[0], b[0])
+    y1 = min(a[1], b[1])
+    x2 = max(a[0] + a[2], b[0] + b[2])
+    y2 = max(a[1] + a[3], b[1] + b[3])
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def set_clip(renderer, rect):
+    """Aplica un clip local (x, y, w, h) dentro de la región dañada del frame."""
+    if _base_clip is not None:
+        rect = _intersect(rect, _base_clip)
+    clip = sdl2.SDL_Rect(*rect)
+    sdl2.SDL_RenderSetClipRect(renderer, ctypes.byref(clip))
+
+
+def reset_clip(renderer):
+    """Quita el clip local (vuelve a la región dañada del frame)."""
+    if _base_clip is not None:
+        clip = sdl2.SDL_Rect(*_base_clip)
+        sdl2.SDL_RenderSetClipRect(renderer, ctypes.byref(clip))
+    else:
+        sdl2.SDL_RenderSetClipRect(renderer, None)
+
+
+class DamageTracker:
+    """
+    Modelo de estado 'sucio' del frame.
+    Cada entrada (vista, pista, estado, volumen, marquee, highlight, portada...)
+    se compara con la del frame anterior; si cambia, marca su región o la
+    pantalla completa. Si nada cambió, el frame se salta (sin Clear/Present).
+    """
+    def __init__(self):
+        self._state = {}
+        self._full = True
+        self._region = None
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+    def update(self, key, value, region=None):
+        """Registra el valor actual de una entrada; region=None daña todo."""
+        if key not in self._state or self._state[key] != value:
+            self._state[key] = value
+            self.mark(region)
+
+    def mark(self, region=None):
+        if region is None:
+            self._full = True
+        elif self._region is None:
+            self._region = tuple(region)
+        else:
+            self._region = _union(self._region, region)
+
+    def mark_all(self):
+        self._full = True
+
+    def is_dirty(self):
+        return self._full or self._region is not None
+
+    def dirty_rect(self):
+        """Región a redibujar, o None si es la pantalla completa."""
+        if self._full:
+            return None
+        return self._region
+
+    def frame_done(self, rendered):
+        self._full = False
+        self._region = None
+        if rendered:
+            self.frames_rendered += 1
+        else:
+            self.frames_skipped += 1
+
+    def stats(self):
+        total = self.frames_rendered + self.frames_skipped
+        return {
+            'frames_rendered': self.frames_rendered,
+            'frames_skipped': self.frames_skipped,
+            'skip_rate': (self.frames_skipped / total) if total else 0.0,
+        }
+
+
+class SceneTarget:
+    """
+    Textura destino persistente con la escena completa (resolución lógica).
+    Permite redibujar solo la región dañada y luego copiar la escena entera
+    a la ventana. Si el renderer no soporta render targets, se redibuja
+    siempre la pantalla completa directamente en el backbuffer.
+    """
+    def __init__(self, renderer, width=None, height=None):
+        self.renderer = renderer
+        self.width = width or config.WIDTH
+        self.height = height or config.HEIGHT
+        self.texture = None
+        if sdl2.SDL_RenderTargetSupported(renderer):
+            self.texture = sdl2.SDL_CreateTexture(renderer, sdl2.SDL_PIXELFORMAT_RGBA8888,
+                                                  sdl2.SDL_TEXTUREACCESS_TARGET,
+                                                  self.width, self.height)
+        if not self.texture:
+            print("Render targets no soportados: se redibuja la escena completa")
+
+    @property
+    def supports_partial(self):
+        return self.texture is not None
+
+    def begin(self, rect):
+        """Prepara el dibujo de la región rect (None = pantalla completa)."""
+        global _base_clip
+        if self.texture:
+            sdl2.SDL_SetRenderTarget(self.renderer, self.texture)
+        else:
+            rect = None
+
+        _base_clip = rect
+        if rect is None:
+            sdl2.SDL_RenderSetClipRect(self.renderer, None)
+            sdl2.SDL_SetRenderDrawColor(self.renderer, 0, 0, 0, 255)
+            sdl2.SDL_RenderClear(self.renderer)
+        else:
+            # RenderClear ignora el clip: rellenar solo la región dañada
+            reset_clip(self.renderer)
+            sdl2.SDL_SetRenderDrawColor(self.renderer, 0, 0, 0, 255)
+            sdl2.SDL_RenderFillRect(self.renderer, ctypes.byref(sdl2.SDL_Rect(*rect)))
+
+    def present(self):
+        global _base_clip
+        _base_clip = None
+        sdl2.SDL_RenderSetClipRect(self.renderer, None)
+        if self.texture:
+            sdl2.SDL_SetRenderTarget(self.renderer, None)
+            sdl2.SDL_RenderCopy(self.renderer, self.texture, None, None)
+        sdl2.SDL_RenderPresent(self.renderer)
+
+    def cleanup(self):
+        if self.texture:
+            sdl2.SDL_DestroyTexture(self.texture)
+            self.texture = None
+
+
+class StaticLayer:
+    """
+    Capa pre-compuesta con la parte estática de una vista (fondo, marcos,
+    botones, leyenda). Solo se vuelve a pintar cuando cambia su clave (p. ej.
+    portada o estado de reproducción) o tras invalidate(); el resto de frames
+    es una única copia opaca, recortada a la región dañada. Lo dinámico
+    (marquee, resaltados, volumen) se dibuja encima.
+
+    Sin render targets se pinta directamente en cada frame, como antes.
+    """
+    def __init__(self, renderer, width=None, height=None):
+        self.renderer = renderer
+        self.texture = None
+        self.key = None
+        self._valid = False
+        self.rebuilds = 0
+        if sdl2.SDL_RenderTargetSupported(renderer):
+            self.texture = sdl2.SDL_CreateTexture(renderer, sdl2.SDL_PIXELFORMAT_RGBA8888,
+                                                  sdl2.SDL_TEXTUREACCESS_TARGET,
+                                                  width or config.WIDTH, height or config.HEIGHT)
+        if self.texture:
+            # Opaca: la copia no mezcla (más barata con el renderer por software)
+            sdl2.SDL_SetTextureBlendMode(self.texture, sdl2.SDL_BLENDMODE_NONE)
+
+    def invalidate(self):
+        """El contenido de la textura se perdió (SDL_RENDER_TARGETS_RESET) o cambió un asset."""
+        self._valid = False
+
+    def draw(self, key, paint):
+        """Copia la capa al destino actual; si key cambió, antes la repinta con paint(renderer)."""
+        renderer = self.renderer
+        if not self.texture:
+            paint(renderer)
+            return
+        if not self._valid or key != self.key:
+            global _base_clip
+            # La capa se pinta entera aunque el frame solo redibuje una región
+            base_clip, _base_clip = _base_clip, None
+            previous = sdl2.SDL_GetRenderTarget(renderer)
+            sdl2.SDL_SetRenderTarget(renderer, self.texture)
+            sdl2.SDL_RenderSetClipRect(renderer, None)
+            sdl2.SDL_SetRenderDrawColor(renderer, 0, 0, 0, 255)
+            sdl2.SDL_RenderClear(renderer)
+            paint(renderer)
+            sdl2.SDL_SetRenderTarget(renderer, previous)
+            _base_clip = base_clip
+            reset_clip(renderer)
+            self.key = key
+            self._valid = True
+            self.rebuilds += 1
+        sdl2.SDL_RenderCopy(renderer, self.texture, None, None)
+
+    def cleanup(self):
+        if self.texture:
+            sdl2.SDL_DestroyTexture(self.texture)
+            self.texture = None
@@ -0,0 +1,211 @@
+import os
+import threading
+from collections import deque
+
+
+def scan_names(path):
+    """
+    Primera fase del listado: solo nombres desde os.scandir (sin stat ni tags).
+    Devuelve (dirs, files) ordenados alfabéticamente.
+    """
+    dirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                elif entry.name.lower().endswith('.mp3'):
+                    files.append(entry.name)
+            except OSError:
+                continue
+    dirs.sort()
+    files.sort()
+    return dirs, files
+
+
+def walk_mp3(root, cancelled=None, lister=None):
+    """
+    Generador recursivo de rutas .mp3 bajo root, en orden estable: primero los
+    archivos de cada directorio y luego sus subdirectorios, ambos alfabéticos.
+    Solo mantiene en memoria el directorio actual y la pila de pendientes.
+    cancelled: callable() que, si devuelve True, corta el recorrido antes del
+    siguiente directorio (aunque no haya dado ningún archivo).
+    lister: callable(path, stat_result) -> (dirs, files) en lugar de
+    scan_names, p. ej. LibraryIndex.walk_entries para no leer del disco los
+    directorios que no cambiaron.
+    """
+    stack = [root]
+    visited = set() # (dev, inode) de directorios ya recorridos (bucles de symlinks)
+    while stack:
+        if cancelled is not None and cancelled():
+            return
+        path = stack.pop()
+        try:
+            st = os.stat(path)
+            key = (st.st_dev, st.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+            dirs, files = lister(path, st) if lister else scan_names(path)
+        except OSError:
+            continue
+        for name in files:
+            yield os.path.join(path, name)
+        stack.extend(os.path.join(path, name) for name in reversed(dirs))
+
+
+class TreeWalker:
+    """
+    Recorre en un hilo uno o varios árboles con walk_mp3 y deja las rutas en
+    una cola que el hilo principal recoge por lotes con drain(), así la
+    reproducción puede empezar con el primer archivo encontrado.
+    """
+    def __init__(self, roots, lister=None):
+        self.roots = list(roots)
+        self.lister = lister
+        self.found = 0
+        self.done = False
+        self._cancelled = False
+        self._results = deque()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # Con varias raíces pueden solaparse: descartar duplicados
+        seen = set() if len(self.roots) > 1 else None
+        try:
+            for root in self.roots:
+                if self._cancelled:
+                    return
+                for path in walk_mp3(root, cancelled=lambda: self._cancelled, lister=self.lister):
+                    if self._cancelled:
+                        return
+                    if seen is not None:
+                        real = os.path.realpath(path)
+                        if real in seen:
+                            continue
+                        seen.add(real)
+                    self._results.append(path)
+                    self.found += 1
+        finally:
+            self.done = True
+
+    def drain(self, limit=None):
+        out = []
+        while self._results and (limit is None or len(out) < limit):
+            out.append(self._results.popleft())
+        return out
+
+    def is_busy(self):
+        return not self.done or bool(self._results)
+
+    def cancel(self):
+        self._cancelled = True
+        self._results.clear()
+
+
+class DirectoryScanner:
+    """
+    Segunda fase del listado: resuelve títulos ID3 en un hilo de trabajo.
+    Primero las filas visibles (viewport de PlaylistScreen), luego el resto.
+    Cada llamada a resolve() cancela el trabajo del directorio anterior.
+    """
+    def __init__(self, metadata, library=None):
+        self.metadata = metadata
+        self.library = library
+        self.generation = 0
+        self._cond = threading.Condition()
+        self._path = None
+        self._jobs = {}          # browser_index -> nombre de archivo en _path (pendientes)
+        self._order = deque()    # orden natural de los índices pendientes
+        self._viewport = (0, 0)  # (primer índice visible, cantidad)
+        self._results = deque()  # (generation, browser_index, title)
+        self._working = False    # El hilo está resolviendo un trabajo ya sacado de _jobs
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def resolve(self, path, jobs):
+        """jobs: lista de (browser_index, nombre de archivo en path) a resolver. Devuelve la generación."""
+        with self._cond:
+            self.generation += 1
+            self._path = path
+            self._jobs = dict(jobs)
+            self._order = deque(i for i, _ in jobs)
+            self._results.clear()
+            self._cond.notify()
+            return self.generation
+
+    def cancel(self):
+        with self._cond:
+            self.generation += 1
+            self._path = None
+            self._jobs = {}
+            self._order.clear()
+            self._results.clear()
+
+    def set_viewport(self, first, count):
+        # Lo llama el hilo principal en cada render; solo es una tupla
+        self._viewport = (first, count)
+
+    def is_busy(self):
+        """Hay trabajos pendientes, en curso o resultados sin aplicar."""
+        return bool(self._jobs) or self._working or bool(self._results)
+
+    def drain(self):
+        """Resultados listos de la generación actual: lista de (browser_index, title)."""
+        out = []
+        while self._results:
+            try:
+                gen, index, title = self._results.popleft()
+            except IndexError:
+                break
+            if gen == self.generation:
+                out.append((index, title))
+        return out
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._jobs = {}
+            self._cond.notify()
+
+    def _next_job(self):
+        # Prioridad: filas del viewport que sigan pendientes
+        first, count = self._viewport
+        for index in range(first, first + count):
+            if index in self._jobs:
+                return index, self._jobs.pop(index)
+        while self._order:
+            index = self._order.popleft()
+            if index in self._jobs:
+                return index, self._jobs.pop(index)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._jobs:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                gen = self.generation
+                path = self._path
+                job = self._next_job()
+                finished = not self._jobs
+                self._working = job is not None
+
+            if job:
+                index, name = job
+                meta = self.metadata.get(os.path.join(path, name))
+                if meta and gen == self.generation:
+                    self._results.append((gen, index, meta.title))
+                self._working = False
+
+            # Directorio completo: registrar su contenido en el índice
+            if finished and self.library and path and gen == self.generation:
+                try:
+                    self.library.list_directory(path)
+                except OSError:
+                    pass
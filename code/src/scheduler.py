@@ -0,0 +1,133 @@
+import heapq
+import itertools
+from collections import deque
+
+
+class TimerScheduler:
+    """
+    Plazos con nombre (en ticks de SDL, ms) para el bucle principal.
+    Cada nombre tiene como mucho un plazo activo; volver a programarlo lo
+    reemplaza. El bucle duerme en SDL_WaitEventTimeout hasta el plazo más
+    cercano, así que sin animaciones ni eventos el proceso no se despierta.
+    También cuenta los despertares (por evento o por plazo) por segundo.
+    """
+    def __init__(self, window_ms=10000):
+        self._heap = []      # (deadline, seq, name), con borrado perezoso
+        self._active = {}    # name -> (deadline, seq)
+        self._seq = itertools.count()
+        self.window_ms = window_ms
+        self._wakeups = deque() # ticks de cada despertar (ventana deslizante)
+        self.total_wakeups = 0
+        self.event_wakeups = 0
+        self.timer_wakeups = 0
+
+    def schedule(self, name, deadline):
+        """Programa (o reprograma) name para el tick absoluto deadline; None lo cancela."""
+        if deadline is None:
+            self.cancel(name)
+            return
+        current = self._active.get(name)
+        if current and current[0] == deadline:
+            return
+        seq = next(self._seq)
+        self._active[name] = (deadline, seq)
+        heapq.heappush(self._heap, (deadline, seq, name))
+
+    def cancel(self, name):
+        self._active.pop(name, None)
+
+    def _prune(self):
+        while self._heap:
+            deadline, seq, name = self._heap[0]
+            if self._active.get(name) == (deadline, seq):
+                return
+            heapq.heappop(self._heap)
+
+    def next_deadline(self):
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def timeout(self, now, max_wait):
+        """Milisegundos a esperar desde now hasta el siguiente plazo (como mucho max_wait)."""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return max_wait
+        return max(0, min(max_wait, deadline - now))
+
+    def pop_due(self, now):
+        """Nombres cuyo plazo ya venció (quedan desprogramados)."""
+        due = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, seq, name = heapq.heappop(self._heap)
+            if self._active.get(name) == (deadline, seq):
+                del self._active[name]
+                due.append(name)
+            self._prune()
+        return due
+
+    def note_wakeup(self, now, by_event):
+        self.total_wakeups += 1
+        if by_event:
+            self.event_wakeups += 1
+        else:
+            self.timer_wakeups += 1
+        self._wakeups.append(now)
+        limit = now - self.window_ms
+        while self._wakeups and self._wakeups[0] < limit:
+            self._wakeups.popleft()
+
+    def wakeups_per_second(self, now):
+        limit = now - self.window_ms
+        while self._wakeups and self._wakeups[0] < limit:
+            self._wakeups.popleft()
+        return len(self._wakeups) * 1000.0 / self.window_ms
+
+    def stats(self, now):
+        return {
+            'wakeups_per_sec': self.wakeups_per_second(now),
+            'wakeups': self.total_wakeups,
+            'event_wakeups': self.event_wakeups,
+            'timer_wakeups': self.timer_wakeups,
+            'timers': sorted(self._active),
+        }
+
+
+class FramePacer:
+    """
+    Cadencia máxima de los frames animados, por vista: alta mientras hay
+    interacción (input en los últimos active_ms) y baja en reposo. Solo
+    retrasa los plazos de las animaciones; como estas avanzan por tiempo
+    transcurrido, bajar los FPS no cambia su velocidad, solo cuántas veces
+    se dibujan. Los eventos siguen despertando el bucle al momento.
+    """
+    def __init__(self, rates, default=(60, 20), active_ms=3000):
+        self.rates = rates       # vista -> (fps con interacción, fps en reposo)
+        self.default = default
+        self.active_ms = active_ms
+        self.last_input = None
+        self.last_frame = None   # Tick del último frame dibujado
+
+    def note_input(self, now):
+        self.last_input = now
+
+    def note_frame(self, now):
+        self.last_frame = now
+
+    def fps(self, view, now):
+        active, idle = self.rates.get(view, self.default)
+        if self.last_input is not None and now - self.last_input < self.active_ms:
+            return active
+        return idle
+
+    def frame_ms(self, view, now):
+        """Intervalo objetivo entre frames de la vista (ms)."""
+        return 1000.0 / max(1, self.fps(view, now))
+
+    def pace(self, view, now, deadline):
+        """Plazo de animación ajustado: no antes del siguiente frame de la cadencia de la vista."""
+        if deadline is None:
+            return None
+        if self.last_frame is None:
+            return deadline
+        return max(deadline, self.last_frame + int(self.frame_ms(view, now)))
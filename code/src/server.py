@@ -1,22 +1,216 @@
 import threading
-import socket
+import asyncio
+import json
+import time
 import os
 import sys
+from collections import deque
+from remote import COMMANDS as REMOTE_COMMANDS, RemoteError, format_result
 
 # FTP Imports
 try:
     from pyftpdlib.authorizers import DummyAuthorizer
-    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.handlers import FTPHandler, DTPHandler, ThrottledDTPHandler
     from pyftpdlib.servers import ThreadedFTPServer
     HAS_FTP_LIB = True
 except ImportError:
     HAS_FTP_LIB = False
     print("pyftpdlib no está instalado. El servidor FTP no funcionará.")
 
+def _kbps_env(name, default):
+    """Límite en bytes/s desde una variable en KB/s (0 = sin límite)."""
+    try:
+        return max(0, int(os.environ.get(name, default))) * 1024
+    except ValueError:
+        return default * 1024
+
+# Límites de ancho de banda del FTP (0 = sin límite). Con música sonando se
+# reducen para que la SD no deje sin datos a SDL_mixer.
+FTP_IDLE_READ_LIMIT = _kbps_env("PARASYTE_FTP_IDLE_UP_KBPS", 0)          # Subidas (escritura en la SD)
+FTP_IDLE_WRITE_LIMIT = _kbps_env("PARASYTE_FTP_IDLE_DOWN_KBPS", 0)       # Descargas (lectura de la SD)
+FTP_PLAYING_READ_LIMIT = _kbps_env("PARASYTE_FTP_PLAYING_UP_KBPS", 512)
+FTP_PLAYING_WRITE_LIMIT = _kbps_env("PARASYTE_FTP_PLAYING_DOWN_KBPS", 1024)
+
+
+class FTPThrottle:
+    """
+    Límites del FTP según haya o no reproducción, y contadores de tráfico.
+    El hilo principal solo escribe playing (un bool); las sesiones FTP leen
+    los límites en cada bloque, así el cambio se aplica sin reconectar.
+    """
+    WINDOW = 10 # s de la ventana de throughput
+
+    def __init__(self, idle=(FTP_IDLE_READ_LIMIT, FTP_IDLE_WRITE_LIMIT),
+                 playing=(FTP_PLAYING_READ_LIMIT, FTP_PLAYING_WRITE_LIMIT)):
+        self.idle = idle
+        self.playing_limits = playing
+        self.playing = False
+        self._lock = threading.Lock() # Cada sesión FTP va en su propio hilo
+        self._seconds = deque()       # (segundo, bytes recibidos, bytes enviados)
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.throttled = 0            # Veces que una sesión tuvo que esperar
+        self.throttled_playing = 0
+        self.downloads = 0
+        self.sendfile_downloads = 0
+
+    def limits(self):
+        """(read_limit, write_limit) vigentes."""
+        return self.playing_limits if self.playing else self.idle
+
+    def count(self, received=0, sent=0):
+        second = int(time.monotonic())
+        with self._lock:
+            self.bytes_received += received
+            self.bytes_sent += sent
+            if self._seconds and self._seconds[-1][0] == second:
+                _, r, w = self._seconds[-1]
+                self._seconds[-1] = (second, r + received, w + sent)
+            else:
+                self._seconds.append((second, received, sent))
+            while self._seconds and self._seconds[0][0] <= second - self.WINDOW:
+                self._seconds.popleft()
+
+    def note_throttled(self):
+        with self._lock:
+            self.throttled += 1
+            if self.playing:
+                self.throttled_playing += 1
+
+    def note_download(self, sendfile):
+        with self._lock:
+            self.downloads += 1
+            if sendfile:
+                self.sendfile_downloads += 1
+
+    def stats(self):
+        second = int(time.monotonic())
+        with self._lock:
+            recent = [(r, w) for t, r, w in self._seconds if t > second - self.WINDOW]
+            read_limit, write_limit = self.limits()
+            return {
+                'playing': self.playing,
+                'read_limit_kbps': read_limit // 1024,
+                'write_limit_kbps': write_limit // 1024,
+                'recv_kbps': sum(r for r, _ in recent) / 1024 / self.WINDOW,
+                'sent_kbps': sum(w for _, w in recent) / 1024 / self.WINDOW,
+                'bytes_received': self.bytes_received,
+                'bytes_sent': self.bytes_sent,
+                'throttled': self.throttled,
+                'throttled_playing': self.throttled_playing,
+                'downloads': self.downloads,
+                'sendfile_downloads': self.sendfile_downloads,
+            }
+
+
+if HAS_FTP_LIB:
+    class PlaybackAwareDTPHandler(ThrottledDTPHandler):
+        """
+        Canal de datos con límites dinámicos (FTPThrottle). A diferencia de
+        ThrottledDTPHandler no renuncia a sendfile(): las descargas binarias lo
+        siguen usando y se limitan contando lo que envía cada llamada.
+        """
+        throttle = None
+        auto_sized_buffers = False # Los límites cambian durante la transferencia
+
+        @property
+        def read_limit(self):
+            return self.throttle.limits()[0] if self.throttle else 0
+
+        @property
+        def write_limit(self):
+            return self.throttle.limits()[1] if self.throttle else 0
+
+        def use_sendfile(self):
+            return DTPHandler.use_sendfile(self)
+
+        def push_with_producer(self, producer):
+            super().push_with_producer(producer)
+            if self.throttle and self.file_obj is not None: # No cuenta LIST/NLST
+                self.throttle.note_download(self.initiate_send == self.initiate_sendfile)
+
+        def initiate_sendfile(self):
+            before = self.tot_bytes_sent
+            super().initiate_sendfile()
+            sent = self.tot_bytes_sent - before
+            if sent > 0:
+                if self.throttle:
+                    self.throttle.count(sent=sent)
+                if self.write_limit and self.connected:
+                    self._throttle_bandwidth(sent, self.write_limit)
+
+        def recv(self, buffer_size):
+            chunk = super().recv(buffer_size)
+            if self.throttle:
+                self.throttle.count(received=len(chunk))
+            return chunk
+
+        def send(self, data):
+            num_sent = super().send(data)
+            if self.throttle:
+                self.throttle.count(sent=num_sent)
+            return num_sent
+
+        def _throttle_bandwidth(self, len_chunk, max_speed):
+            throttler = self._throttler
+            super()._throttle_bandwidth(len_chunk, max_speed)
+            if self._throttler is not throttler and self.throttle:
+                self.throttle.note_throttled()
+
+    class LibraryFTPHandler(FTPHandler):
+        """
+        FTPHandler que avisa de cada subida, borrado, renombrado o carpeta
+        nueva a LibraryChanges (en el hilo de la sesión FTP), para actualizar
+        solo las rutas afectadas sin re-escanear la biblioteca.
+        """
+        owner = None # SimpleFTPServer; su atributo changes se lee en cada evento
+
+        def _changes(self):
+            return self.owner.changes if self.owner else None
+
+        def _notify(self, method, *args):
+            changes = self._changes()
+            if changes:
+                try:
+                    getattr(changes, method)(*args)
+                except Exception as e:
+                    print(f"[FTP] Error actualizando la biblioteca: {e}")
+
+        def on_file_received(self, file):
+            self._notify('file_changed', file)
+
+        def ftp_DELE(self, path):
+            result = super().ftp_DELE(path)
+            if result:
+                self._notify('removed', path)
+            return result
+
+        def ftp_RMD(self, path):
+            result = super().ftp_RMD(path)
+            # Según la versión de pyftpdlib no devuelve nada aunque funcione
+            if not os.path.lexists(path):
+                self._notify('removed', path)
+            return result
+
+        def ftp_MKD(self, path):
+            result = super().ftp_MKD(path)
+            if result:
+                self._notify('dir_created', path, True)
+            return result
+
+        def ftp_RNTO(self, path):
+            result = super().ftp_RNTO(path)
+            if result:
+                self._notify('moved', *result)
+            return result
+
+
 class SimpleFTPServer:
-    def __init__(self, port=2121, root_dir='.'):
+    def __init__(self, port=2121, root_dir='.', changes=None, throttle=None):
         self.port = port
         self.root_dir = os.path.abspath(root_dir)
+        self.changes = changes # LibraryChanges (subidas/borrados -> biblioteca)
+        self.throttle = throttle or FTPThrottle()
         self.server = None
         self.thread = None
         self.running = False
@@ -42,9 +236,12 @@ class SimpleFTPServer:
             # ¡ADVERTENCIA! Sin seguridad.
             authorizer.add_anonymous(self.root_dir, perm='elradfmwMT')
 
-            handler = FTPHandler
+            handler = LibraryFTPHandler
+            handler.owner = self
             handler.authorizer = authorizer
             handler.banner = "r36tmax FTP Server Ready."
+            handler.dtp_handler = PlaybackAwareDTPHandler
+            handler.dtp_handler.throttle = self.throttle
 
             address = ('0.0.0.0', self.port)
             self.server = ThreadedFTPServer(address, handler)
@@ -56,6 +253,13 @@ class SimpleFTPServer:
             print(f"[FTP] Error inesperado: {e}")
             self.running = False
 
+    def set_playing(self, playing):
+        """Lo llama el bucle principal: con música sonando se aplican los límites de reproducción."""
+        self.throttle.playing = playing
+
+    def stats(self):
+        return self.throttle.stats()
+
     def stop(self):
         if self.server:
             self.server.close_all()
@@ -63,12 +267,30 @@ class SimpleFTPServer:
             print("[FTP] Detenido.")
 
 class SimpleTelnetServer:
-    def __init__(self, port=2323):
+    """
+    Servidor telnet de comandos sobre un único bucle asyncio en su propio hilo
+    (sin un hilo por cliente). Entrada por líneas (CR/LF, se descartan las
+    negociaciones IAC), límite de clientes simultáneos, desconexión por
+    inactividad y salida en bloques esperando a que el socket drene, para que
+    ls/cat grandes no acumulen memoria con clientes lentos.
+    """
+    MAX_CLIENTS = 4
+    IDLE_TIMEOUT = 300.0   # s sin recibir una línea completa
+    WRITE_TIMEOUT = 30.0   # s esperando a que un cliente lento lea
+    MAX_LINE = 1024        # bytes por línea de comando
+    CAT_MAX_BYTES = 256 * 1024
+    CHUNK_SIZE = 4096
+    REMOTE_TIMEOUT = 2.0   # s esperando a que el bucle principal ejecute un comando
+
+    def __init__(self, port=2323, stats_provider=None, remote=None):
         self.port = port
-        self.server_socket = None
+        self.stats_provider = stats_provider # callable() -> str (comando 'stats')
+        self.remote = remote                 # RemoteControl (play, next, volume...)
         self.thread = None
         self.running = False
-        self.clients = []
+        self.clients = set() # StreamWriter; solo se toca desde el hilo del bucle
+        self._loop = None
+        self._server = None
 
     def start(self):
         if self.running:
@@ -81,67 +303,146 @@ class SimpleTelnetServer:
         print(f"[Telnet] Iniciado en puerto {self.port}")
 
     def _run_server(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(5)
-
-            while self.running:
-                try:
-                    client, addr = self.server_socket.accept()
-                    print(f"[Telnet] Conexión desde {addr}")
-                    client_thread = threading.Thread(target=self._handle_client, args=(client,))
-                    client_thread.daemon = True
-                    client_thread.start()
-                    self.clients.append(client)
-                except OSError:
-                    # Socket cerrado
-                    break
-                except Exception as e:
-                    print(f"[Telnet] Error aceptando conexión: {e}")
-
+            asyncio.set_event_loop(loop)
+            self._server = loop.run_until_complete(asyncio.start_server(
+                self._handle_client, '0.0.0.0', self.port,
+                limit=self.MAX_LINE, reuse_address=True))
+            if self.running:
+                loop.run_forever()
         except OSError as e:
             print(f"[Telnet] Error de red/puerto (bind falló): {e}. El servidor Telnet no estará disponible.")
         except Exception as e:
             print(f"[Telnet] Error fatal: {e}")
         finally:
             self.running = False
+            try:
+                self._shutdown_tasks(loop)
+            finally:
+                loop.close()
+                self._loop = None
+
+    def _shutdown_tasks(self, loop):
+        # Primero los clientes: wait_closed() espera a que cierren sus conexiones
+        if self._server:
+            self._server.close()
+        for writer in list(self.clients):
+            writer.close()
+        tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        if self._server:
+            loop.run_until_complete(self._server.wait_closed())
+            self._server = None
 
-    def _handle_client(self, client_socket):
+    async def _handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        if len(self.clients) >= self.MAX_CLIENTS:
+            print(f"[Telnet] Conexión rechazada desde {addr}: máximo de {self.MAX_CLIENTS} clientes")
+            try:
+                writer.write(b"Too many connections, try again later.\r\n")
+                await asyncio.wait_for(writer.drain(), self.WRITE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                pass
+            writer.close()
+            return
+
+        print(f"[Telnet] Conexión desde {addr}")
+        self.clients.add(writer)
         # Contexto del cliente (directorio actual)
         cwd = os.getcwd()
-        
+
         try:
-            client_socket.send(b"Welcome to r36tmax Telnet Server\r\n")
-            client_socket.send(b"Type 'help' for commands, 'exit' to disconnect.\r\n> ")
+            await self._send(writer, "Welcome to r36tmax Telnet Server\r\n"
+                                     "Type 'help' for commands, 'exit' to disconnect.\r\n> ")
 
             while True:
-                data = client_socket.recv(1024)
-                if not data:
+                try:
+                    line = await asyncio.wait_for(_read_line(reader), self.IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await self._send(writer, "\r\nIdle timeout, bye.\r\n")
                     break
-                
-                # Procesar comando simple
-                text = data.decode('utf-8', errors='ignore').strip()
+                if line is None:
+                    # Línea más larga que MAX_LINE: ya se descartó entera
+                    await self._send(writer, "Line too long.\r\n> ")
+                    continue
+                if not line:
+                    break
+
+                text = _strip_telnet(line).decode('utf-8', errors='ignore').strip()
                 if not text:
-                    client_socket.send(b"> ")
+                    await self._send(writer, "> ")
                     continue
 
-                response, cwd = self._process_command(text, cwd)
-                client_socket.send(response.encode('utf-8') + b"\r\n> ")
-                
+                parts = text.split()
+                if self.remote and parts[0].lower() in REMOTE_COMMANDS:
+                    args = parts[1:]
+                    if parts[0].lower() == 'enqueue':
+                        # La ruta es el resto de la línea tal cual (espacios repetidos incluidos)
+                        rest = text[len(parts[0]):].strip()
+                        args = [rest] if rest else []
+                    response = await self._remote_command(parts[0], args, cwd)
+                else:
+                    response, cwd = self._process_command(text, cwd)
+                if isinstance(response, str):
+                    await self._send(writer, response)
+                else:
+                    await self._send_chunks(writer, response)
+                await self._send(writer, "\r\n> ")
+
                 if text.lower() == 'exit':
                     break
 
-        except Exception as e:
+        except asyncio.CancelledError:
+            pass
+        except (OSError, asyncio.TimeoutError) as e:
             print(f"[Telnet] Cliente desconectado por error: {e}")
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def _remote_command(self, cmd, args, cwd):
+        # El comando se ejecuta en el hilo principal; aquí solo se espera el Future.
+        # submit() va al executor: enqueue de una carpeta la recorre en la SD
+        try:
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(None, self.remote.submit, cmd, args, cwd)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.REMOTE_TIMEOUT)
+            return format_result(result)
+        except RemoteError as e:
+            return f"Error: {e}"
+        except asyncio.TimeoutError:
+            return "Error: player did not respond"
+        except Exception as e:
+            return f"Error: {e}"
+
+    async def _send_chunks(self, writer, chunks):
+        # Cada bloque (lectura de la SD en 'cat' y 'ls') se produce en el
+        # executor: una lectura lenta no frena el bucle ni a los demás clientes
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                await self._send(writer, chunk)
         finally:
             try:
-                client_socket.close()
-            except:
+                chunks.close()
+            except ValueError:
+                # Tarea cancelada con next() aún en el executor ("generator already
+                # executing"): al terminar nadie lo referencia y se cierra al recolectarse
                 pass
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
+
+    async def _send(self, writer, text):
+        # drain() bloquea la corrutina (no el bucle) mientras el buffer de
+        # salida esté por encima de la marca alta: backpressure por cliente
+        writer.write(text.replace("\r\n", "\n").replace("\n", "\r\n").encode('utf-8'))
+        await asyncio.wait_for(writer.drain(), self.WRITE_TIMEOUT)
 
     def _process_command(self, cmd_line, cwd):
         parts = cmd_line.split()
@@ -152,15 +453,27 @@ class SimpleTelnetServer:
         args = parts[1:]
         
         if cmd == 'help':
-            return "Commands: hello, status, ls, cd <dir>, cat <file>, exit", cwd
+            text = "Commands: hello, status, stats, ls, cd <dir>, cat <file>, exit"
+            if self.remote:
+                player_cmds = ", ".join(f"{name} {usage}".strip() for name, usage in REMOTE_COMMANDS.items()
+                                        if name != 'status')
+                text += "\nPlayer: " + player_cmds
+            return text, cwd
         elif cmd == 'hello':
             return "Hello there!", cwd
         elif cmd == 'status':
             return "Server is running smoothly.", cwd
+        elif cmd == 'stats':
+            if not self.stats_provider:
+                return "Stats not available.", cwd
+            try:
+                return self.stats_provider(), cwd
+            except Exception as e:
+                return f"Error collecting stats: {e}", cwd
         elif cmd == 'ls':
             try:
-                files = os.listdir(cwd)
-                return "\n".join(files), cwd
+                # El iterador se abre aquí para informar del error enseguida
+                return _stream_listing(os.scandir(cwd)), cwd
             except Exception as e:
                 return f"Error listing directory: {e}", cwd
         elif cmd == 'cd':
@@ -185,12 +498,9 @@ class SimpleTelnetServer:
             try:
                 file_path = os.path.join(cwd, target)
                 if os.path.isfile(file_path):
-                    # Limitar tamaño de lectura por seguridad
-                    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                        content = f.read(2048) # Leer máx 2KB
-                        if len(content) == 2048:
-                            content += "\n... (truncated)"
-                        return content, cwd
+                    # Se envía por bloques; el límite evita volcar archivos enormes
+                    f = open(file_path, 'r', encoding='utf-8', errors='replace')
+                    return _stream_file(f, self.CAT_MAX_BYTES, self.CHUNK_SIZE), cwd
                 else:
                     return f"File not found: {target}", cwd
             except Exception as e:
@@ -202,25 +512,201 @@ class SimpleTelnetServer:
 
     def stop(self):
         self.running = False
-        if self.server_socket:
+        loop = self._loop
+        if loop:
+            # El cierre de clientes y del socket lo hace el propio hilo del bucle
             try:
-                self.server_socket.close()
-            except:
-                pass
-        
-        # Cerrar clientes
-        for client in self.clients:
+                loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:
+                pass # El bucle ya se cerró
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        print("[Telnet] Detenido.")
+
+
+def _strip_telnet(data):
+    """Quita las secuencias IAC de negociación telnet de una línea recibida."""
+    if b"\xff" not in data:
+        return data
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != 0xFF:
+            out.append(byte)
+            i += 1
+        elif i + 1 < len(data) and data[i + 1] == 0xFF:
+            out.append(0xFF) # IAC IAC = 0xFF literal
+            i += 2
+        elif i + 1 < len(data) and 0xFB <= data[i + 1] <= 0xFE:
+            i += 3 # WILL/WONT/DO/DONT + opción
+        else:
+            i += 2
+    return bytes(out)
+
+
+async def _read_line(reader):
+    """
+    Siguiente línea del cliente (b"" en EOF), o None si superaba el límite
+    del reader. A diferencia de readline(), la línea larga se descarta
+    entera: también lo que llegue después, hasta el salto de línea.
+    """
+    overrun = False
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            return b"" if overrun else e.partial
+        except asyncio.LimitOverrunError as e:
+            # Se tira lo que hay en el buffer (hasta el salto de línea si ya llegó) y se sigue
+            overrun = True
+            await reader.readexactly(e.consumed)
+            continue
+        return None if overrun else line
+
+
+def _stream_listing(entries, batch=64):
+    """Salida de 'ls' en bloques de batch nombres."""
+    with entries:
+        names = []
+        first = True
+        for entry in entries:
+            names.append(entry.name)
+            if len(names) >= batch:
+                yield ("" if first else "\n") + "\n".join(names)
+                first = False
+                names = []
+        if names:
+            yield ("" if first else "\n") + "\n".join(names)
+
+
+def _stream_file(f, max_bytes, chunk_size):
+    """Salida de 'cat' en bloques, truncada a max_bytes caracteres."""
+    with f:
+        sent = 0
+        while sent < max_bytes:
+            chunk = f.read(min(chunk_size, max_bytes - sent))
+            if not chunk:
+                return
+            sent += len(chunk)
+            yield chunk
+        if f.read(1):
+            yield "\n... (truncated)"
+
+class RemoteJSONServer:
+    """
+    Socket opcional de control con JSON por líneas, sobre su propio bucle
+    asyncio. Petición: {"cmd": "volume", "args": ["+5"], "id": 1}; respuesta:
+    {"id": 1, "ok": true, "result": {...}} o {"id": 1, "ok": false, "error": "..."}.
+    """
+    MAX_CLIENTS = 4
+    MAX_LINE = 4096
+    REPLY_TIMEOUT = 2.0
+
+    def __init__(self, remote, port):
+        self.remote = remote
+        self.port = port
+        self.thread = None
+        self.running = False
+        self.clients = set()
+        self._loop = None
+        self._server = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run_server, daemon=True)
+        self.thread.start()
+        print(f"[Remote] Control JSON en puerto {self.port}")
+
+    def _run_server(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            asyncio.set_event_loop(loop)
+            self._server = loop.run_until_complete(asyncio.start_server(
+                self._handle_client, '0.0.0.0', self.port,
+                limit=self.MAX_LINE, reuse_address=True))
+            if self.running:
+                loop.run_forever()
+        except OSError as e:
+            print(f"[Remote] Error de red/puerto (bind falló): {e}. El control remoto no estará disponible.")
+        finally:
+            self.running = False
+            if self._server:
+                self._server.close()
+            for writer in list(self.clients):
+                writer.close()
+            tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+            self._loop = None
+
+    async def _handle_client(self, reader, writer):
+        if len(self.clients) >= self.MAX_CLIENTS:
+            writer.close()
+            return
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await _read_line(reader)
+                if line is None:
+                    await self._reply(writer, {'ok': False, 'error': "línea demasiado larga"})
+                    continue
+                if not line:
+                    break
+                if line.strip():
+                    await self._reply(writer, await self._execute(line))
+        except (asyncio.CancelledError, OSError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def _execute(self, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RemoteError("se esperaba un objeto JSON")
+            request_id = request.get('id')
+            args = request.get('args', [])
+            if not isinstance(args, list):
+                args = [args]
+            # En el executor: enqueue de una carpeta la recorre en la SD
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(None, self.remote.submit, str(request.get('cmd', '')), args)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.REPLY_TIMEOUT)
+            return {'id': request_id, 'ok': True, 'result': result}
+        except asyncio.TimeoutError:
+            return {'id': request_id, 'ok': False, 'error': "sin respuesta del bucle principal"}
+        except Exception as e:
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+
+    async def _reply(self, writer, message):
+        writer.write(json.dumps(message).encode('utf-8') + b"\n")
+        await writer.drain()
+
+    def stop(self):
+        self.running = False
+        loop = self._loop
+        if loop:
             try:
-                client.close()
-            except:
+                loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:
                 pass
-        self.clients = []
-        print("[Telnet] Detenido.")
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        print("[Remote] Detenido.")
 
 # Función de utilidad para iniciar ambos
-def start_servers(ftp_port=2121, telnet_port=2323, root_dir='.'):
-    ftp = SimpleFTPServer(port=ftp_port, root_dir=root_dir)
-    telnet = SimpleTelnetServer(port=telnet_port)
+def start_servers(ftp_port=2121, telnet_port=2323, root_dir='.', stats_provider=None, remote=None, ftp_throttle=None):
+    ftp = SimpleFTPServer(port=ftp_port, root_dir=root_dir, throttle=ftp_throttle)
+    telnet = SimpleTelnetServer(port=telnet_port, stats_provider=stats_provider, remote=remote)
     
     ftp.start()
     telnet.start()
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import threading
+from library_index import default_cache_dir
+
+SESSION_VERSION = 1
+SAVE_INTERVAL = 5.0 # s mínimos entre escrituras (cuida la SD)
+
+
+def default_session_path():
+    return os.path.join(default_cache_dir(), "session.json")
+
+
+def session_key(player):
+    """
+    Lo que dispara un guardado al cambiar: pista, pausa, repeat, playlist y
+    carpeta del browser. La posición no entra: se guarda con lo demás.
+    """
+    return (player.current_track_index, player.is_playing, player.is_paused,
+            player.repeat_mode, id(player.playlist), len(player.playlist),
+            player.current_path)
+
+
+def capture(player, playlist_screen=None):
+    """
+    Estado de la sesión (hilo principal), o None mientras la playlist se está
+    recorriendo: a medias no sirve para reanudar. La playlist se copia para
+    que el hilo escritor la serialice sin carreras.
+    """
+    if player.is_loading_tree():
+        return None
+    state = {
+        'playlist': list(player.playlist),
+        'index': player.current_track_index,
+        'position': round(max(0.0, player.session_position()), 2),
+        'playing': player.is_playing,
+        'repeat_mode': player.repeat_mode,
+        'browser_path': player.current_path,
+        'selected_index': 0,
+        'scroll_offset': 0,
+    }
+    if playlist_screen is not None and playlist_screen.filter_query is None:
+        state['selected_index'] = playlist_screen.selected_index
+        state['scroll_offset'] = playlist_screen.scroll_offset
+    return state
+
+
+def _encode(state):
+    """JSON compacto: las rutas de la playlist relativas a su prefijo común."""
+    playlist = state['playlist']
+    root = ""
+    if playlist:
+        try:
+            root = os.path.commonpath(playlist)
+        except ValueError:
+            root = "" # Unidades distintas (Windows)
+        if root in playlist: # Playlist de un solo archivo
+            root = os.path.dirname(root)
+    cut = len(os.path.join(root, "")) if root else 0
+    data = dict(state, version=SESSION_VERSION, root=root,
+                playlist=[path[cut:] for path in playlist])
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(raw):
+    data = json.loads(raw)
+    if not isinstance(data, dict) or data.get('version') != SESSION_VERSION:
+        return None
+    root = data.pop('root', "")
+    data['playlist'] = [os.path.join(root, path) if root else path for path in data['playlist']]
+    # Posición en el browser: si se editó a mano o no es válida, el principio
+    for key in ('selected_index', 'scroll_offset'):
+        value = data.get(key)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            data[key] = 0
+    return data
+
+
+class SessionStore:
+    """
+    Sesión guardada en disco para reanudar al arrancar. save() solo deja el
+    último estado pendiente; un hilo lo escribe como mucho cada SAVE_INTERVAL
+    segundos, y nada si no cambió respecto a lo último escrito. La escritura
+    es atómica (archivo temporal + fsync + os.replace): un apagado a mitad
+    deja la sesión anterior, nunca un JSON cortado.
+    """
+    def __init__(self, path=None, interval=SAVE_INTERVAL):
+        self.path = path or default_session_path()
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock() # Un solo escritor del .tmp a la vez (hilo o flush)
+        self._closed = False                # flush() ya escribió el estado final
+        self._pending = None
+        self._last_data = None
+        self._last_write = 0.0
+        self._thread = None
+        self._running = True
+        self.writes = 0
+        self.coalesced = 0   # Estados sustituidos por uno más nuevo antes de escribirse
+        self.unchanged = 0   # Estados iguales a lo ya escrito
+        self.last_write_ms = 0.0
+
+    def load(self):
+        """Sesión guardada (dict) o None si no hay o no se puede leer."""
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            state = _decode(raw)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"[Session] No se pudo leer {self.path}: {e}")
+            return None
+        self._last_data = raw
+        return state
+
+    def save(self, state):
+        """Encola state para escribirlo en segundo plano (el último gana)."""
+        if state is None:
+            return
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = state
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Esperar el intervalo; lo que llegue mientras sustituye a lo pendiente
+                delay = self._last_write + self.interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                state, self._pending = self._pending, None
+            self._write(state)
+
+    def _write(self, state, final=False):
+        with self._write_lock:
+            # Un estado del hilo que llega después del flush es más viejo: no pisa el final
+            if self._closed and not final:
+                return
+            self._closed = final
+            self._write_locked(state)
+
+    def _write_locked(self, state):
+        start = time.perf_counter()
+        try:
+            data = _encode(state)
+            self._last_write = time.monotonic()
+            if data == self._last_data:
+                self.unchanged += 1
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_data = data
+            self.writes += 1
+            self.last_write_ms = (time.perf_counter() - start) * 1000
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[Session] Error guardando la sesión: {e}")
+
+    def flush(self, state=None):
+        """Al salir: detiene el hilo y escribe ya state (o lo pendiente)."""
+        with self._cond:
+            self._running = False
+            pending, self._pending = self._pending, None
+            self._cond.notify()
+        if self._thread:
+            # Si el hilo sigue escribiendo tras el timeout, _write_lock ordena ambas escrituras
+            self._thread.join(timeout=2.0)
+        state = state if state is not None else pending
+        if state is not None:
+            self._write(state, final=True)
+
+    def stats(self):
+        return {
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'unchanged': self.unchanged,
+            'last_write_ms': self.last_write_ms,
+            'bytes': len(self._last_data) if self._last_data else 0,
+        }
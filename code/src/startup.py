@@ -0,0 +1,77 @@
+import os
+import time
+
+
+def process_age():
+    """
+    Segundos desde que el kernel creó el proceso (Linux), o None. Incluye lo
+    que pasa antes de main.py: arranque del intérprete y, en el binario de
+    PyInstaller, la descompresión del bundle desde la SD.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # El nombre del proceso va entre paréntesis y puede contener espacios
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimer:
+    """
+    Fases del arranque y tiempos hasta el primer frame (TTFF) y el primer
+    audio (TTFA), contados desde el inicio del proceso si se conoce y si no
+    desde t0 (la primera línea de main.py). Se escriben en el log en cada
+    arranque y quedan en 'stats' por telnet.
+    """
+    def __init__(self, t0=None):
+        now = time.perf_counter()
+        t0 = now if t0 is None else t0
+        age = process_age()
+        # Origen: inicio del proceso (resolución de un tick del kernel)
+        self.origin = now - age if age is not None and age >= now - t0 else t0
+        self.pre_main_ms = (t0 - self.origin) * 1000
+        self.phases = [('pre_main', self.pre_main_ms)] if self.pre_main_ms > 0 else []
+        self._last = t0
+        self.first_frame_ms = None
+        self.first_audio_ms = None
+
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def mark(self, name):
+        """Atribuye a la fase name el tiempo desde la marca anterior."""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    def first_frame(self):
+        """Registra el primer present. Devuelve True solo la primera vez."""
+        if self.first_frame_ms is not None:
+            return False
+        self.first_frame_ms = self._elapsed_ms()
+        detail = ", ".join(f"{name} {ms:.0f}" for name, ms in self.phases)
+        print(f"[Startup] Primer frame en {self.first_frame_ms:.0f} ms ({detail})")
+        return True
+
+    def first_audio(self):
+        if self.first_audio_ms is not None:
+            return False
+        self.first_audio_ms = self._elapsed_ms()
+        print(f"[Startup] Primer audio en {self.first_audio_ms:.0f} ms")
+        return True
+
+    def report(self, label):
+        """Escribe en el log las fases marcadas desde el primer frame (trabajo diferido)."""
+        names = [name for name, _ in self.phases]
+        start = names.index('first_frame') + 1 if 'first_frame' in names else 0
+        detail = ", ".join(f"{name} {ms:.0f}" for name, ms in self.phases[start:])
+        print(f"[Startup] {label} en {self._elapsed_ms():.0f} ms ({detail})")
+
+    def stats(self):
+        stats = {name + '_ms': ms for name, ms in self.phases}
+        stats['ttff_ms'] = self.first_frame_ms
+        stats['ttfa_ms'] = self.first_audio_ms
+        return stats
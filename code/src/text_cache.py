@@ -0,0 +1,148 @@
+import time
+import ctypes
+from collections import OrderedDict
+import sdl2
+import sdl2.sdlttf as ttf
+
+
+def _font_id(font):
+    return ctypes.cast(font, ctypes.c_void_p).value
+
+
+class TextTextureCache:
+    """
+    Caché compartida de texturas de texto, con clave (fuente, tamaño, texto, color).
+    Guarda ancho/alto medidos y expulsa por LRU cuando se supera max_bytes.
+    Lleva la cuenta por frame de renders de glifos vs aciertos de caché.
+    """
+    def __init__(self, renderer, max_bytes=8 * 1024 * 1024):
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self.font_sizes = {}          # id de fuente -> tamaño en puntos
+        self._entries = OrderedDict() # clave -> (texture, w, h, bytes)
+        self._sizes = OrderedDict()   # (fuente, texto) -> (w, h), solo medidas
+        self.bytes_used = 0
+
+        # Contadores (frame actual, último frame y totales)
+        self.frame_renders = 0
+        self.frame_hits = 0
+        self.frame_render_ms = 0.0
+        self.last_frame_renders = 0
+        self.last_frame_hits = 0
+        self.last_frame_render_ms = 0.0
+        self.total_renders = 0
+        self.total_hits = 0
+        self.evictions = 0
+
+    def register_font(self, font, size):
+        if font:
+            self.font_sizes[_font_id(font)] = size
+
+    def _key(self, font, text, color):
+        fid = _font_id(font)
+        size = self.font_sizes.get(fid)
+        if size is None:
+            size = ttf.TTF_FontHeight(font)
+            self.font_sizes[fid] = size
+        return (fid, size, text, (color.r, color.g, color.b, color.a))
+
+    def begin_frame(self):
+        self.last_frame_renders = self.frame_renders
+        self.last_frame_hits = self.frame_hits
+        self.last_frame_render_ms = self.frame_render_ms
+        self.frame_renders = 0
+        self.frame_hits = 0
+        self.frame_render_ms = 0.0
+
+    def get(self, font, text, color):
+        """Devuelve (texture, w, h) o None si no se pudo renderizar."""
+        if not font or not text:
+            return None
+
+        key = self._key(font, text, color)
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            self.frame_hits += 1
+            self.total_hits += 1
+            return entry[0], entry[1], entry[2]
+
+        start = time.perf_counter()
+        surface = ttf.TTF_RenderUTF8_Blended(font, text.encode('utf-8'), color)
+        if not surface:
+            return None
+        w = surface.contents.w
+        h = surface.contents.h
+        texture = sdl2.SDL_CreateTextureFromSurface(self.renderer, surface)
+        sdl2.SDL_FreeSurface(surface)
+        self.frame_render_ms += (time.perf_counter() - start) * 1000
+        if not texture:
+            return None
+
+        self.frame_renders += 1
+        self.total_renders += 1
+
+        size = w * h * 4
+        self._entries[key] = (texture, w, h, size)
+        self._sizes[(key[0], text)] = (w, h)
+        self.bytes_used += size
+        self._evict()
+        return texture, w, h
+
+    def measure(self, font, text):
+        """Ancho/alto del texto sin crear textura (TTF_SizeUTF8 solo la primera vez)."""
+        if not font or not text:
+            return 0, 0
+        key = (_font_id(font), text)
+        size = self._sizes.get(key)
+        if size:
+            self._sizes.move_to_end(key)
+            return size
+
+        w_ptr = ctypes.c_int()
+        h_ptr = ctypes.c_int()
+        ttf.TTF_SizeUTF8(font, text.encode('utf-8'), ctypes.byref(w_ptr), ctypes.byref(h_ptr))
+        size = (w_ptr.value, h_ptr.value)
+        self._sizes[key] = size
+        while len(self._sizes) > 4096:
+            self._sizes.popitem(last=False)
+        return size
+
+    def draw(self, font, text, color, x, y, centered=False):
+        """Dibuja el texto en (x, y). Devuelve (w, h) dibujado."""
+        entry = self.get(font, text, color)
+        if not entry:
+            return 0, 0
+        texture, w, h = entry
+        if centered:
+            x = x - (w // 2)
+        dest_rect = sdl2.SDL_Rect(x, y, w, h)
+        sdl2.SDL_RenderCopy(self.renderer, texture, None, ctypes.byref(dest_rect))
+        return w, h
+
+    def _evict(self):
+        # Nunca expulsar la última entrada (la que se acaba de pedir)
+        while self.bytes_used > self.max_bytes and len(self._entries) > 1:
+            _, (texture, _, _, size) = self._entries.popitem(last=False)
+            sdl2.SDL_DestroyTexture(texture)
+            self.bytes_used -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'frame_renders': self.last_frame_renders,
+            'frame_hits': self.last_frame_hits,
+            'total_renders': self.total_renders,
+            'total_hits': self.total_hits,
+            'evictions': self.evictions,
+        }
+
+    def cleanup(self):
+        for texture, _, _, _ in self._entries.values():
+            sdl2.SDL_DestroyTexture(texture)
+        self._entries.clear()
+        self._sizes.clear()
+        self.bytes_used = 0
@@ -0,0 +1,166 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import sdl2
+import sdl2.sdlimage as img
+from library_index import default_cache_dir
+
+
+class ThumbnailCache:
+    """
+    Caché en disco de portadas reducidas al tamaño de pantalla.
+    La clave es el hash del contenido de la portada (el mismo que guarda el
+    índice), así que álbumes con la misma imagen comparten miniatura.
+    Las miniaturas se guardan como BMP (carga sin decodificar) y se expulsan
+    por LRU cuando el directorio supera max_bytes.
+    """
+    def __init__(self, cache_dir=None, size=(360, 360), max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(default_cache_dir(), "thumbs")
+        self.size = size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = OrderedDict() # nombre -> bytes (orden LRU)
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def _scan(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.bmp'):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name, st.st_size))
+        except OSError as e:
+            print(f"[Thumbs] No se pudo usar {self.cache_dir}: {e}")
+            return
+        # Más antiguos primero: son los primeros candidatos a expulsar
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.bytes_used += size
+
+    def _path(self, cover_hash):
+        return os.path.join(self.cache_dir, f"{cover_hash}_{self.size[0]}x{self.size[1]}.bmp")
+
+    def load(self, cover_hash, loader):
+        """
+        Devuelve un SDL_Surface con la miniatura (el llamador lo libera), o None.
+        loader() debe devolver los bytes originales de la portada; solo se
+        llama si la miniatura no está en disco.
+        """
+        data = None
+        if not cover_hash:
+            data = loader()
+            if not data:
+                return None
+            cover_hash = hashlib.sha1(data).hexdigest()
+
+        path = self._path(cover_hash)
+        name = os.path.basename(path)
+
+        with self._lock:
+            cached = name in self._files
+        if cached:
+            surface = sdl2.SDL_LoadBMP(path.encode('utf-8'))
+            if surface:
+                with self._lock:
+                    self.hits += 1
+                    if name in self._files:
+                        self._files.move_to_end(name)
+                try:
+                    os.utime(path) # mtime = último uso (para el LRU entre sesiones)
+                except OSError:
+                    pass
+                return surface
+            with self._lock:
+                self.bytes_used -= self._files.pop(name, 0)
+
+        with self._lock:
+            self.misses += 1
+
+        if data is None:
+            data = loader()
+        if not data:
+            return None
+
+        surface = self._decode_scaled(data)
+        if surface:
+            self._save(surface, path, name)
+        return surface
+
+    def _decode_scaled(self, data):
+        rw = sdl2.SDL_RWFromConstMem(data, len(data))
+        src = img.IMG_Load_RW(rw, 1) # 1 = auto-close RWops
+        if not src:
+            return None
+
+        # Escalar en ARGB8888 (requisito de SoftStretchLinear)
+        argb = sdl2.SDL_ConvertSurfaceFormat(src, sdl2.SDL_PIXELFORMAT_ARGB8888, 0)
+        sdl2.SDL_FreeSurface(src)
+        if not argb:
+            return None
+
+        w, h = self.size
+        dst = sdl2.SDL_CreateRGBSurfaceWithFormat(0, w, h, 32, sdl2.SDL_PIXELFORMAT_ARGB8888)
+        if not dst:
+            sdl2.SDL_FreeSurface(argb)
+            return None
+
+        scaled = False
+        try:
+            # Filtrado bilineal (SDL >= 2.0.16)
+            scaled = sdl2.SDL_SoftStretchLinear(argb, None, dst, None) == 0
+        except Exception:
+            pass
+        if not scaled:
+            sdl2.SDL_BlitScaled(argb, None, dst, None)
+        sdl2.SDL_FreeSurface(argb)
+
+        # RGB24 en disco: 3/4 del tamaño y no necesitamos alfa
+        rgb = sdl2.SDL_ConvertSurfaceFormat(dst, sdl2.SDL_PIXELFORMAT_RGB24, 0)
+        if rgb:
+            sdl2.SDL_FreeSurface(dst)
+            return rgb
+        return dst
+
+    def _save(self, surface, path, name):
+        tmp_path = path + ".tmp"
+        try:
+            if sdl2.SDL_SaveBMP(surface, tmp_path.encode('utf-8')) != 0:
+                return
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[Thumbs] Error guardando miniatura: {e}")
+            return
+
+        with self._lock:
+            self.bytes_used += size - self._files.pop(name, 0)
+            self._files[name] = size
+            victims = []
+            while self.bytes_used > self.max_bytes and len(self._files) > 1:
+                victim, victim_size = self._files.popitem(last=False)
+                self.bytes_used -= victim_size
+                victims.append(victim)
+
+        for victim in victims:
+            try:
+                os.remove(os.path.join(self.cache_dir, victim))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'files': len(self._files),
+                'bytes': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
@@ -4,9 +4,10 @@ import time
 import threading
 
 class VolumeControl:
-    def __init__(self):
+    def __init__(self, mixer=None):
         self.os_name = platform.system()
         self.interface = None
+        self.mixer = mixer # Backend ALSA en proceso (ver alsa_mixer.py)
         self.current_volume = 50
         self.last_check = 0
         self.check_interval = 2.0 # Chequear cada 2 segundos
@@ -33,8 +34,25 @@ class VolumeControl:
                 self.os_name = "Generic" # Fallback
 
         elif self.os_name == "Linux":
-            self._find_linux_control()
-            self._update_linux_volume()
+            if not self.mixer:
+                self.mixer = self._open_alsa_mixer()
+            if self.mixer:
+                self.active_control_linux = self.mixer.control
+                self.current_volume = self.mixer.get_volume()
+            else:
+                # Fallback: amixer por subprocess
+                self._find_linux_control()
+                self._update_linux_volume()
+
+    def _open_alsa_mixer(self):
+        try:
+            from alsa_mixer import AlsaMixer
+            mixer = AlsaMixer(controls=self.controls_linux)
+            print(f"Control de volumen ALSA (libasound): {mixer.control}")
+            return mixer
+        except Exception as e:
+            print(f"libasound no disponible, se usa amixer: {e}")
+            return None
 
     def _find_linux_control(self):
         for control in self.controls_linux:
@@ -61,6 +79,11 @@ class VolumeControl:
             pass
 
     def get_volume(self):
+        if self.mixer:
+            # El hilo del mixer lo mantiene al día con los eventos de ALSA
+            self.current_volume = self.mixer.get_volume()
+            return self.current_volume
+
         # Rate limiting para no bloquear el loop principal con llamadas al sistema
         now = time.time()
         if now - self.last_check > self.check_interval:
@@ -91,9 +114,19 @@ class VolumeControl:
                 self.interface.SetMasterVolumeLevelScalar(scalar, None)
             except:
                 pass
+        elif self.os_name == "Linux" and self.mixer:
+            try:
+                self.mixer.set_volume(percent)
+            except Exception as e:
+                print(f"Error ajustando volumen ALSA: {e}")
         elif self.os_name == "Linux" and self.active_control_linux:
             try:
                 subprocess.Popen(["amixer", "set", self.active_control_linux, f"{percent}%"], 
                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             except:
                 pass
+
+    def close(self):
+        if self.mixer:
+            self.mixer.close()
+            self.mixer = None
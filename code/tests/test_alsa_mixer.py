@@ -0,0 +1,169 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import alsa_mixer
+import volume_control
+from alsa_mixer import AlsaMixer
+from volume_control import VolumeControl
+
+
+class FakeAsound:
+    """
+    Sustituto de libasound con las funciones snd_mixer_* que usa AlsaMixer.
+    Los punteros de salida llegan como byref(): se escribe en ref._obj.
+    fail: nombre de la función que devuelve error.
+    """
+    def __init__(self, controls=("PCM",), vmin=0, vmax=255, raw=128, fail=None):
+        self.controls = controls
+        self.vmin = vmin
+        self.vmax = vmax
+        self.raw = raw
+        self.fail = fail
+        self.closed = 0
+        self._name = None
+
+    def _ret(self, name):
+        return -5 if self.fail == name else 0
+
+    def snd_mixer_open(self, handle, mode):
+        handle._obj.value = 1
+        return self._ret("snd_mixer_open")
+
+    def snd_mixer_attach(self, handle, card):
+        return self._ret("snd_mixer_attach")
+
+    def snd_mixer_selem_register(self, handle, options, classp):
+        return self._ret("snd_mixer_selem_register")
+
+    def snd_mixer_load(self, handle):
+        return self._ret("snd_mixer_load")
+
+    def snd_mixer_close(self, handle):
+        self.closed += 1
+        return 0
+
+    def snd_mixer_selem_id_malloc(self, sid):
+        sid._obj.value = 2
+        return 0
+
+    def snd_mixer_selem_id_free(self, sid):
+        pass
+
+    def snd_mixer_selem_id_set_index(self, sid, index):
+        pass
+
+    def snd_mixer_selem_id_set_name(self, sid, name):
+        self._name = name.decode()
+
+    def snd_mixer_find_selem(self, handle, sid):
+        return 3 if self._name in self.controls else None
+
+    def snd_mixer_selem_has_playback_volume(self, elem):
+        return 1
+
+    def snd_mixer_selem_get_playback_volume_range(self, elem, vmin, vmax):
+        vmin._obj.value = self.vmin
+        vmax._obj.value = self.vmax
+        return 0
+
+    def snd_mixer_selem_get_playback_volume(self, elem, channel, value):
+        value._obj.value = self.raw
+        return 0
+
+    def snd_mixer_selem_set_playback_volume_all(self, elem, value):
+        self.raw = value
+        return 0
+
+
+class AlsaMixerTest(unittest.TestCase):
+    def test_reads_percent_from_raw_range(self):
+        mixer = AlsaMixer(lib=FakeAsound(raw=128), watch=False)
+        self.assertEqual(mixer.control, "PCM")
+        self.assertEqual(mixer.get_volume(), 50)
+
+    def test_picks_first_available_control(self):
+        mixer = AlsaMixer(lib=FakeAsound(controls=("Speaker", "Headphone")), watch=False)
+        self.assertEqual(mixer.control, "Headphone")
+
+    def test_set_volume_maps_to_raw_range(self):
+        lib = FakeAsound(vmin=-100, vmax=100)
+        mixer = AlsaMixer(lib=lib, watch=False)
+        mixer.set_volume(25)
+        self.assertEqual(lib.raw, -50)
+        self.assertEqual(mixer.get_volume(), 25)
+        mixer.set_volume(150)
+        self.assertEqual(lib.raw, 100)
+        self.assertEqual(mixer.get_volume(), 100)
+        mixer.set_volume(-5)
+        self.assertEqual(lib.raw, -100)
+        self.assertEqual(mixer.get_volume(), 0)
+
+    def test_empty_range_reads_zero(self):
+        mixer = AlsaMixer(lib=FakeAsound(vmin=0, vmax=0, raw=0), watch=False)
+        self.assertEqual(mixer.get_volume(), 0)
+
+    def test_close_releases_handle_once(self):
+        lib = FakeAsound()
+        mixer = AlsaMixer(lib=lib, watch=False)
+        mixer.close()
+        mixer.close()
+        self.assertEqual(lib.closed, 1)
+        mixer.set_volume(80) # Sin handle: no hace nada
+        self.assertEqual(lib.raw, 128)
+
+    def test_open_error_raises_and_closes(self):
+        lib = FakeAsound(fail="snd_mixer_load")
+        with self.assertRaises(OSError):
+            AlsaMixer(lib=lib, watch=False)
+        self.assertEqual(lib.closed, 1)
+
+    def test_no_control_raises(self):
+        lib = FakeAsound(controls=())
+        with self.assertRaises(OSError):
+            AlsaMixer(lib=lib, watch=False)
+        self.assertEqual(lib.closed, 1)
+
+
+@mock.patch.object(volume_control.platform, "system", return_value="Linux")
+class VolumeControlTest(unittest.TestCase):
+    def test_uses_alsa_mixer(self, _system):
+        lib = FakeAsound(controls=("Master",), raw=64)
+        with mock.patch.object(alsa_mixer, "load_libasound", return_value=lib), \
+             mock.patch.object(volume_control.subprocess, "Popen") as popen:
+            volume = VolumeControl()
+            self.assertEqual(volume.active_control_linux, "Master")
+            self.assertEqual(volume.get_volume(), 25)
+            volume.set_volume(100)
+            self.assertEqual(lib.raw, 255)
+            volume.close()
+        popen.assert_not_called()
+
+    def test_falls_back_to_amixer_when_alsa_fails(self, _system):
+        lib = FakeAsound(fail="snd_mixer_attach")
+        with mock.patch.object(alsa_mixer, "load_libasound", return_value=lib), \
+             mock.patch.object(volume_control.subprocess, "check_output",
+                               return_value=b"  Mono: Playback 27 [42%] [on]\n") as check_output, \
+             mock.patch.object(volume_control.subprocess, "Popen") as popen:
+            volume = VolumeControl()
+            self.assertIsNone(volume.mixer)
+            self.assertEqual(volume.active_control_linux, "Master")
+            self.assertEqual(volume.current_volume, 42)
+            volume.set_volume(60)
+        self.assertEqual(lib.closed, 1)
+        check_output.assert_any_call(["amixer", "get", "Master"], stderr=volume_control.subprocess.DEVNULL)
+        self.assertEqual(popen.call_args[0][0], ["amixer", "set", "Master", "60%"])
+
+    def test_falls_back_to_amixer_without_libasound(self, _system):
+        with mock.patch.object(alsa_mixer, "load_libasound", side_effect=OSError("no libasound")), \
+             mock.patch.object(volume_control.subprocess, "check_output", return_value=b"[10%]"):
+            volume = VolumeControl()
+        self.assertIsNone(volume.mixer)
+        self.assertEqual(volume.current_volume, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
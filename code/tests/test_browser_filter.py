@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from browser_filter import FilterIndex, normalize
+from browser_listing import BrowserListing, KIND_DIR, KIND_FILE
+
+
+def make_listing(dirs=(), files=(), parent="/"):
+    listing = BrowserListing("/music", parent=parent)
+    for name in dirs:
+        listing.add(name, KIND_DIR)
+    for name in files:
+        listing.add(name, KIND_FILE)
+    return listing
+
+
+def names(items):
+    return [item['name'] for item in items]
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_ignores_case_and_accents(self):
+        self.assertEqual(normalize("Canción ÁRBOL"), "cancion arbol")
+        self.assertEqual(normalize("ASCII"), "ascii")
+
+
+class FilterIndexTest(unittest.TestCase):
+    def test_prefix_matches_first_then_substring(self):
+        listing = make_listing(dirs=["Best Of", "Rock"],
+                               files=["Hard Rock.mp3", "rock and roll.mp3", "Slow.mp3"])
+        result = FilterIndex(listing).query("rock")
+        self.assertEqual(names(result), ["Rock", "rock and roll.mp3", "Hard Rock.mp3"])
+
+    def test_keeps_listing_order_within_each_group(self):
+        listing = make_listing(dirs=["Zeta", "ab"], files=["b-a.mp3", "a2.mp3", "a1.mp3", "xa.mp3"])
+        result = FilterIndex(listing).query("a")
+        self.assertEqual(names(result), ["ab", "a2.mp3", "a1.mp3", "Zeta", "b-a.mp3", "xa.mp3"])
+
+    def test_accent_insensitive(self):
+        listing = make_listing(files=["Canción.mp3", "cancion vieja.mp3", "Mi canción.mp3"])
+        result = FilterIndex(listing).query("CANCIÓN")
+        self.assertEqual(names(result), ["Canción.mp3", "cancion vieja.mp3", "Mi canción.mp3"])
+
+    def test_parent_entry_never_matches(self):
+        listing = make_listing(files=["...and more.mp3"])
+        index = FilterIndex(listing)
+        self.assertEqual(names(index.query(".")), ["...and more.mp3"])
+        self.assertEqual(names(index.query("")), ["...and more.mp3"])
+
+    def test_extending_query_matches_fresh_search(self):
+        listing = make_listing(files=["abc.mp3", "xabc.mp3", "ab.mp3", "zz.mp3", "cab.mp3"])
+        index = FilterIndex(listing)
+        for text in ("a", "ab", "abc"):
+            incremental = names(index.query(text))
+            self.assertEqual(incremental, names(FilterIndex(listing).query(text)), text)
+        self.assertEqual(incremental, ["abc.mp3", "xabc.mp3"])
+        # Borrar una letra vuelve a buscar en todo el listado
+        self.assertEqual(names(index.query("ab")), ["abc.mp3", "ab.mp3", "xabc.mp3", "cab.mp3"])
+
+    def test_refresh_picks_up_new_titles(self):
+        listing = make_listing(files=["01.mp3", "02.mp3"])
+        index = FilterIndex(listing)
+        self.assertEqual(index.query("yellow"), [])
+        listing.set_title(2, "Yellow Submarine")
+        self.assertTrue(index.refresh())
+        self.assertEqual(names(index.query("yellow")), ["Yellow Submarine"])
+        self.assertFalse(index.refresh())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from library_index import LibraryIndex, TrackMetadata
+
+
+def fake_extractor(path, st):
+    """Metadatos sin leer tags: el título es el nombre del archivo."""
+    title = os.path.splitext(os.path.basename(path))[0]
+    return TrackMetadata(path, st.st_mtime_ns, st.st_size, title, None, None, 0.0, False)
+
+
+def write(path, data=b"mp3"):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.music = os.path.join(self.tmp, "music")
+        os.makedirs(os.path.join(self.music, "album"))
+        write(os.path.join(self.music, "a.mp3"))
+        write(os.path.join(self.music, "notes.txt"))
+        self.extracted = []
+        self.index = LibraryIndex(os.path.join(self.tmp, "library.db"), extractor=self._extract)
+        self.index.list_directory(self.music)
+        self.extracted.clear()
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp)
+
+    def _extract(self, path, st):
+        self.extracted.append(path)
+        return fake_extractor(path, st)
+
+    def _bump_mtime(self, path):
+        # El mtime de un directorio puede no moverse entre dos cambios seguidos
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def _names(self, listing):
+        dirs, files = listing
+        return dirs, [os.path.basename(m.path) for m in files]
+
+    def test_cached_listing_after_scan(self):
+        listing = self.index.cached_listing(self.music)
+        self.assertEqual(self._names(listing), (["album"], ["a.mp3"]))
+        self.assertEqual(self.extracted, [])
+
+    def test_dir_mtime_change_invalidates(self):
+        write(os.path.join(self.music, "b.mp3"))
+        self._bump_mtime(self.music)
+        self.assertIsNone(self.index.cached_listing(self.music))
+        self.assertEqual(self._names(self.index.list_directory(self.music)), (["album"], ["a.mp3", "b.mp3"]))
+        self.assertEqual(self.extracted, [os.path.join(self.music, "b.mp3")])
+
+    def test_file_rewritten_in_place_invalidates(self):
+        # Tags reescritos: cambia el archivo pero no el mtime del directorio
+        st = os.stat(self.music)
+        write(os.path.join(self.music, "a.mp3"), b"mp3 con otros tags")
+        os.utime(self.music, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertIsNone(self.index.cached_listing(self.music))
+        self.index.list_directory(self.music)
+        self.assertEqual(self.extracted, [os.path.join(self.music, "a.mp3")])
+
+    def test_deleted_file_invalidates(self):
+        st = os.stat(self.music)
+        os.remove(os.path.join(self.music, "a.mp3"))
+        os.utime(self.music, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertIsNone(self.index.cached_listing(self.music))
+
+    def test_notified_file_keeps_listing_cached(self):
+        path = os.path.join(self.music, "b.mp3")
+        write(path)
+        self._bump_mtime(self.music)
+        self.index.file_changed(path)
+        self.assertEqual(self._names(self.index.cached_listing(self.music)), (["album"], ["a.mp3", "b.mp3"]))
+
+    def test_event_does_not_hide_unnotified_file(self):
+        # Una copia sin aviso y después una subida notificada en el mismo directorio:
+        # el evento no puede sellar el mtime nuevo sobre un listado incompleto
+        write(os.path.join(self.music, "offline.mp3"))
+        self._bump_mtime(self.music)
+        uploaded = os.path.join(self.music, "ftp.mp3")
+        write(uploaded)
+        self.index.file_changed(uploaded)
+        self.assertIsNone(self.index.cached_listing(self.music))
+        self.assertEqual(self._names(self.index.list_directory(self.music)),
+                         (["album"], ["a.mp3", "ftp.mp3", "offline.mp3"]))
+
+    def test_removed_file_keeps_listing_cached(self):
+        path = os.path.join(self.music, "a.mp3")
+        os.remove(path)
+        self._bump_mtime(self.music)
+        self.index.removed(path)
+        self.assertEqual(self._names(self.index.cached_listing(self.music)), (["album"], []))
+
+    def test_walk_entries_reads_disk_only_when_mtime_changes(self):
+        album = os.path.join(self.music, "album")
+        write(os.path.join(album, "t1.mp3"))
+        self.assertEqual(self.index.walk_entries(album, os.stat(album)), ([], ["t1.mp3"]))
+        self.assertEqual(self.index.walk_entries(album, os.stat(album)), ([], ["t1.mp3"]))
+        self.assertEqual((self.index.walk_scans, self.index.walk_hits), (1, 1))
+        # Sin pistas indexadas el listado del browser aún no sale del índice
+        self.assertIsNone(self.index.cached_listing(album))
+
+        write(os.path.join(album, "t2.mp3"))
+        self._bump_mtime(album)
+        self.assertEqual(self.index.walk_entries(album, os.stat(album)), ([], ["t1.mp3", "t2.mp3"]))
+        self.assertEqual(self.index.walk_scans, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import session
+from session import SessionStore
+
+try:
+    import playlist # Necesita PySDL2
+except ImportError:
+    playlist = None
+
+
+def make_state(**changes):
+    state = {
+        'playlist': ["/music/album/01.mp3", "/music/album/02.mp3", "/music/single.mp3"],
+        'index': 1,
+        'position': 42.5,
+        'playing': True,
+        'repeat_mode': 0,
+        'browser_path': "/music/album",
+        'selected_index': 3,
+        'scroll_offset': 1,
+    }
+    state.update(changes)
+    return state
+
+
+def decoded(state):
+    """Lo que devuelve _decode(): el estado más su versión."""
+    return dict(state, version=session.SESSION_VERSION)
+
+
+class SessionEncodingTest(unittest.TestCase):
+    def test_round_trip(self):
+        state = make_state()
+        self.assertEqual(session._decode(session._encode(state)), decoded(state))
+
+    def test_playlist_relative_to_common_root(self):
+        data = json.loads(session._encode(make_state()))
+        self.assertEqual(data['root'], "/music")
+        self.assertEqual(data['playlist'], ["album/01.mp3", "album/02.mp3", "single.mp3"])
+
+    def test_single_file_playlist(self):
+        state = make_state(playlist=["/music/single.mp3"], index=0)
+        self.assertEqual(json.loads(session._encode(state))['root'], "/music")
+        self.assertEqual(session._decode(session._encode(state)), decoded(state))
+
+    def test_empty_playlist(self):
+        state = make_state(playlist=[], index=0)
+        self.assertEqual(session._decode(session._encode(state)), decoded(state))
+
+    def test_other_version_is_ignored(self):
+        data = json.loads(session._encode(make_state()))
+        data['version'] = session.SESSION_VERSION + 1
+        self.assertIsNone(session._decode(json.dumps(data)))
+
+    def test_invalid_browser_position_resets_to_start(self):
+        for bad in (-1, "3", 2.5, True, None):
+            data = json.loads(session._encode(make_state()))
+            data['selected_index'] = bad
+            data['scroll_offset'] = bad
+            state = session._decode(json.dumps(data))
+            self.assertEqual((state['selected_index'], state['scroll_offset']), (0, 0), bad)
+
+    def test_missing_browser_position_resets_to_start(self):
+        data = json.loads(session._encode(make_state()))
+        del data['selected_index'], data['scroll_offset']
+        state = session._decode(json.dumps(data))
+        self.assertEqual((state['selected_index'], state['scroll_offset']), (0, 0))
+
+
+@unittest.skipIf(playlist is None, "PySDL2 no disponible")
+class RestorePositionTest(unittest.TestCase):
+    def make_screen(self, count):
+        # Sin SDL: restore_position solo usa el listado y la altura de la pantalla
+        screen = playlist.PlaylistScreen.__new__(playlist.PlaylistScreen)
+        screen.filter_query = None
+        screen.player = type("Player", (), {'browser_items': list(range(count))})()
+        screen.selected_index = screen.scroll_offset = 0
+        return screen
+
+    def test_keeps_valid_position(self):
+        screen = self.make_screen(100)
+        screen.restore_position(20, 15)
+        self.assertEqual((screen.selected_index, screen.scroll_offset), (20, 15))
+
+    def test_selection_clamped_to_listing(self):
+        # La carpeta tiene menos filas que al guardar
+        screen = self.make_screen(5)
+        screen.restore_position(40, 30)
+        self.assertEqual((screen.selected_index, screen.scroll_offset), (4, 0))
+
+    def test_selected_row_stays_visible(self):
+        screen = self.make_screen(100)
+        visible = screen._max_items()
+        screen.restore_position(50, 0)
+        self.assertEqual(screen.scroll_offset, 50 - visible + 1)
+        screen.restore_position(10, 40)
+        self.assertEqual(screen.scroll_offset, 10)
+
+    def test_empty_listing(self):
+        screen = self.make_screen(0)
+        screen.restore_position(3, 2)
+        self.assertEqual((screen.selected_index, screen.scroll_offset), (0, 0))
+
+
+class SessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "session.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_flush_writes_and_load_restores(self):
+        store = SessionStore(self.path)
+        store.flush(make_state())
+        self.assertEqual(store.writes, 1)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+        self.assertEqual(SessionStore(self.path).load(), decoded(make_state()))
+
+    def test_flush_writes_pending_state(self):
+        store = SessionStore(self.path, interval=60.0)
+        store.save(make_state(index=0))
+        store.save(make_state(index=2)) # Sustituye al anterior o espera al intervalo
+        store.flush()
+        self.assertEqual(SessionStore(self.path).load()['index'], 2)
+
+    def test_write_after_flush_is_dropped(self):
+        store = SessionStore(self.path)
+        store.flush(make_state(index=2))
+        store._write(make_state(index=0)) # Un estado viejo del hilo llega tarde
+        self.assertEqual(SessionStore(self.path).load()['index'], 2)
+
+    def test_unchanged_state_is_not_rewritten(self):
+        store = SessionStore(self.path)
+        store.flush(make_state())
+        store = SessionStore(self.path)
+        store.load()
+        store.flush(make_state())
+        self.assertEqual((store.writes, store.unchanged), (0, 1))
+
+    def test_corrupt_file_loads_nothing(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{"version": 1, "playl')
+        self.assertIsNone(SessionStore(self.path).load())
+
+
+if __name__ == "__main__":
+    unittest.main()